@@ -1,17 +1,118 @@
-from fastapi import FastAPI, HTTPException, Body
+import json
+import os
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+from fastapi import FastAPI, HTTPException, Body, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from pymongo import MongoClient
 from bson import ObjectId
-import requests
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import List
+import asyncio
+
+# Proje kökü (helpers/) ve repo kökü (common/) için import yolu
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(BASE_DIR), str(BASE_DIR.parent)]
+
+from common.http_cache import cache_headers, is_not_modified, make_etag, not_modified_response
+from common.metrics import install_metrics
+from common.mongo import AsyncMongo
+from common.ollama import OllamaError, ollama_client, select_model
+from common.pagination import build_projection, decode_cursor, keyset_query, next_cursor
+from common.scheduler import QueueFullError, install_scheduler, set_priority
+from helpers.changes import (
+    TombstoneCompactor,
+    change_cursor_state,
+    change_seq,
+    changes_query,
+    committed_seq,
+    encode_change_cursor,
+    live,
+    next_change_state,
+    serialize_change,
+    snapshot_state,
+)
+from helpers.chunked_summary import estimate_tokens, map_reduce_summarize, split_into_chunks, summarize_chunks
+from helpers.embeddings import EmbeddingService
+from helpers.llm_cache import LLMCache
+from helpers.quiz import QUIZ_SCHEMA, QuizService, QuizValidationError, quiz_markdown, validate_quiz
+from helpers.search import make_snippet, text_index_spec
+
+# MongoDB ve Ollama bağlantı havuzları uygulama ömrü boyunca açık kalır
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await mongo.connect()
+    await notes_collection.create_index([("timestamp", -1), ("_id", -1)])
+    await notes_collection.create_index([("change_seq", 1), ("_id", 1)])
+    await notes_collection.create_index("deleted_at", partialFilterExpression={"deleted": True})
+    # Değişiklik akışından önce eklenmiş notlar, ilk senkronda görünsün diye 0 sırasını alır
+    await notes_collection.update_many({"change_seq": {"$exists": False}}, {"$set": {"change_seq": 0}})
+    index_spec = text_index_spec()
+    await notes_collection.create_index(index_spec.pop("keys"), **index_spec)
+    await llm_cache.ensure_indexes()
+    await notes_meta_collection.update_one(
+        {"_id": "notes"}, {"$setOnInsert": {"version": 0, "updated_at": datetime.now(timezone.utc)}}, upsert=True
+    )
+    await ollama_client.start()
+    await embedding_service.start()
+    await tombstone_compactor.start()
+    await quiz_service.start()
+    yield
+    await quiz_service.stop()
+    await tombstone_compactor.stop()
+    await embedding_service.stop()
+    await ollama_client.close()
+    await mongo.close()
 
 # FastAPI uygulamasını başlat
-app = FastAPI(title="LLM Destekli Not Defteri API")
+app = FastAPI(title="LLM Destekli Not Defteri API", lifespan=lifespan)
+install_metrics(app)
+install_scheduler(app, ollama_client.scheduler, ollama_client.router)
+
+# MongoDB bağlantısı (bağlantı lifespan'de açılır, çağrılar thread havuzunda çalışır)
+mongo = AsyncMongo.from_env('llm_notes')  # Veritabanı
+notes_collection = mongo.collection('notes')  # Koleksiyon
+# Not listesinin sürümü (her yazma tamamlandığında artar, /notes ETag'i buradan üretilir)
+# ve değişiklik akışının sıra sayacı
+notes_meta_collection = mongo.collection('notes_meta')
+
+# Silinen notların tombstone'ları saklama süresi dolunca periyodik olarak temizlenir
+tombstone_compactor = TombstoneCompactor(
+    notes_collection,
+    notes_meta_collection,
+    retention_seconds=int(os.getenv("TOMBSTONE_RETENTION_SECONDS", str(7 * 24 * 3600))),
+    interval_seconds=int(os.getenv("TOMBSTONE_COMPACTION_INTERVAL_SECONDS", "3600")),
+)
 
-# MongoDB bağlantısı
-client = MongoClient("mongodb://localhost:27017")
-db = client['llm_notes']  # Veritabanı
-notes_collection = db['notes']  # Koleksiyon
+# LLM sonuç önbelleği (özet, quiz, çeviri)
+llm_cache = LLMCache(mongo.collection('llm_cache'))
+
+# Anlamsal arama: not gömmeleri arka planda toplu hesaplanır, sorgular bellek içi matristen yanıtlanır
+embedding_service = EmbeddingService(
+    notes_collection,
+    mongo.collection('note_embeddings'),
+    ollama_client.embed,
+    batch_size=int(os.getenv("EMBED_BATCH_SIZE", "16")),
+    snapshot_path=os.getenv("VECTOR_SNAPSHOT_PATH"),  # Örn. ./data/note_vectors (opsiyonel)
+)
+
+# Prompt şablonları değiştiğinde sürüm artırılır; eski önbellek kayıtları kendiliğinden geçersiz olur
+SUMMARY_PROMPT_VERSION = "v1"
+TRANSLATION_PROMPT_VERSION = "v1"
+QUIZ_PROMPT_VERSION = "v2"
+
+# Görev başına model (çeviride girdi boyutuna göre ayrıca seçilir); önbellek anahtarlarına da girer
+SUMMARY_MODEL = select_model("summary")
+QUIZ_MODEL = select_model("quiz")
+
+# Uzun notlar için parçalı (map-reduce) özetleme ayarları
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "1500"))
+SUMMARY_PARALLELISM = int(os.getenv("SUMMARY_PARALLELISM", "3"))
+
+# Toplu çeviri ayarları
+TRANSLATE_BATCH_PARALLELISM = int(os.getenv("TRANSLATE_BATCH_PARALLELISM", "4"))
+TRANSLATE_BATCH_MAX_ITEMS = int(os.getenv("TRANSLATE_BATCH_MAX_ITEMS", "200"))
 
 # Not modeli
 class Note(BaseModel):
@@ -19,48 +120,167 @@ class Note(BaseModel):
     content: str
     timestamp: str = None
 
+# GET /notes'ta projection ile istenebilecek alanlar
+NOTE_FIELDS = {"title", "content", "timestamp"}
+
 # Çeviri isteği için Pydantic modeli
 class TranslationRequest(BaseModel):
     text: str
     target_language: str
 
-# Ollama'nın çalıştığı URL (varsayılan olarak localhost:11434)
-OLLAMA_URL = "http://localhost:11434"
+# Toplu çeviri isteği: her metin her hedef dile çevrilir
+class BatchTranslationRequest(BaseModel):
+    texts: List[str]
+    target_languages: List[str]
 
 # --- Not CRUD Endpoint'leri ---
 
+async def notes_version():
+    meta = await notes_meta_collection.find_one({"_id": "notes"}) or {}
+    return meta.get("version", 0), meta.get("updated_at")
+
 # Yeni not oluşturma
 @app.post("/notes")
 async def create_note(note: Note):
     try:
         note_dict = note.dict()
         note_dict["timestamp"] = datetime.now().isoformat()
-        result = notes_collection.insert_one(note_dict)
+        note_dict["updated_at"] = datetime.now(timezone.utc)
+        async with change_seq(notes_meta_collection) as seq:
+            note_dict["change_seq"] = seq
+            result = await notes_collection.insert_one(note_dict)
         # MongoDB tarafından oluşturulan _id'yi string'e çevirip "id" olarak ekle
         note_dict["id"] = str(result.inserted_id)
         note_dict.pop("_id", None)
+        note_dict.pop("change_seq", None)
+        embedding_service.enqueue(result.inserted_id)
+        quiz_service.enqueue(result.inserted_id)
         return note_dict
     except Exception as e:
         print("Not kaydedilirken hata oluştu:", e)
         raise HTTPException(status_code=500, detail="Not kaydedilemedi")
 
-# Tüm notları getirme
+# Notları sayfa sayfa getirme (keyset/imleç sayfalama).
+# ETag liste sürümü + sorgu parametrelerinden üretilir; değişiklik yoksa koleksiyon hiç okunmaz.
 @app.get("/notes")
-async def get_notes():
+async def get_notes(
+    request: Request,
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str = None,
+    fields: str = None,  # Örn. "title,timestamp" (liste görünümleri için)
+    sort: str = Query("_id", pattern="^(_id|timestamp)$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+):
+    version, last_modified = await notes_version()
+    etag = make_etag("notes", version, limit, cursor, fields, sort, order)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+
+    projection = build_projection(fields, allowed=NOTE_FIELDS, required=[sort])
+    query, sort_spec = keyset_query(live(), sort, order, cursor)
+    docs = await notes_collection.find(query, projection, sort=sort_spec, limit=limit)
+    cursor_out = next_cursor(docs, sort, limit)
+
     notes = []
-    for note in notes_collection.find():
+    for note in docs:
         note["id"] = str(note["_id"])
         note.pop("_id", None)
+        note.pop("change_seq", None)
         notes.append(note)
-    return notes
+    response.headers.update(cache_headers(etag, last_modified))
+    return {"notes": notes, "next_cursor": cursor_out}
+
+# Başlık ve içerikte tam metin arama (Mongo text index, Türkçe kök bulma).
+# Sonuçlar alaka skoruna göre sıralanır; /notes/{note_id}'den önce tanımlanmalı.
+@app.get("/notes/search")
+async def search_notes(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000),
+):
+    docs = await notes_collection.find(
+        {"$text": {"$search": q}},
+        {"title": 1, "content": 1, "timestamp": 1, "score": {"$meta": "textScore"}},
+        sort=[("score", {"$meta": "textScore"})],
+        skip=offset,
+        limit=limit + 1,  # Sonraki sayfa olup olmadığını anlamak için bir fazlası
+    )
+    results = [
+        {
+            "id": str(doc["_id"]),
+            "title": doc.get("title", ""),
+            "timestamp": doc.get("timestamp"),
+            "score": doc["score"],
+            "snippet": make_snippet(doc.get("content", ""), q),
+        }
+        for doc in docs[:limit]
+    ]
+    next_offset = offset + limit if len(docs) > limit else None
+    return {"results": results, "next_offset": next_offset}
+
+# Benzerlik sonuçlarını not başlıklarıyla birleştirir (skor sırası korunur)
+async def with_note_titles(hits):
+    docs = await notes_collection.find(
+        live({"_id": {"$in": [ObjectId(note_id) for note_id, _ in hits]}}),
+        {"title": 1, "timestamp": 1},
+    )
+    by_id = {str(doc["_id"]): doc for doc in docs}
+    return [
+        {"id": note_id, "title": by_id[note_id].get("title", ""), "timestamp": by_id[note_id].get("timestamp"), "score": score}
+        for note_id, score in hits
+        if note_id in by_id
+    ]
+
+# Anlamsal arama: sorgu için tek bir embedding çağrısı, ardından bellek içi kosinüs top-k
+@app.get("/notes/semantic_search")
+async def semantic_search(q: str = Query(..., min_length=1), k: int = Query(10, ge=1, le=100)):
+    try:
+        query_vector = (await ollama_client.embed([q]))[0]
+    except OllamaError as e:
+        print(e)
+        raise HTTPException(status_code=500, detail="Ollama'ya bağlanılamadı")
+    hits = embedding_service.index.search(query_vector, k)
+    return {"results": await with_note_titles(hits)}
+
+# Delta senkron: imleçten sonra oluşturulan/güncellenen notlar ve silmeler (tombstone).
+# since verilmezse ilk senkron (snapshot) başlar; yanıt boş olsa da istemci dönen imleçle
+# sorgulamaya devam eder. Yalnızca yazması tamamlanmış sıra numaraları gösterilir.
+@app.get("/notes/changes")
+async def note_changes(since: str = None, limit: int = Query(100, ge=1, le=1000)):
+    high_water = await committed_seq(notes_meta_collection)
+    if since:
+        try:
+            state = change_cursor_state(decode_cursor(since))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Geçersiz imleç (cursor)")
+        # Sıkıştırma yalnızca artımlı imleçleri geçersiz kılar; ilk senkron sayfaları etkilenmez
+        if state["mode"] == "delta" and state["seq"] < await tombstone_compactor.compacted_seq():
+            raise HTTPException(status_code=410, detail="İmleç çok eski; tam senkronizasyon gerekli")
+    else:
+        state = snapshot_state(high_water)
+
+    query, sort_spec = changes_query(state, high_water)
+    docs = await notes_collection.find(query, sort=sort_spec, limit=limit)
+    next_state, has_more = next_change_state(state, docs, limit)
+    return {
+        "changes": [serialize_change(doc) for doc in docs],
+        "next_cursor": encode_change_cursor(next_state),
+        "has_more": has_more,
+    }
 
 # Belirli bir notu getirme
 @app.get("/notes/{note_id}")
-async def get_note(note_id: str):
-    note = notes_collection.find_one({"_id": ObjectId(note_id)})
+async def get_note(note_id: str, request: Request, response: Response):
+    note = await notes_collection.find_one(live({"_id": ObjectId(note_id)}), {"change_seq": 0})
     if note:
         note["id"] = str(note["_id"])
         note.pop("_id", None)
+        etag = make_etag("note", note)
+        last_modified = note.get("updated_at")
+        if is_not_modified(request, etag, last_modified):
+            return not_modified_response(etag, last_modified)
+        response.headers.update(cache_headers(etag, last_modified))
         return note
     else:
         raise HTTPException(status_code=404, detail="Not bulunamadı")
@@ -68,117 +288,302 @@ async def get_note(note_id: str):
 # Not güncelleme
 @app.put("/notes/{note_id}")
 async def update_note(note_id: str, updated_note: Note):
-    update_result = notes_collection.update_one(
-        {"_id": ObjectId(note_id)},
-        {"$set": updated_note.dict()}
-    )
+    async with change_seq(notes_meta_collection) as seq:
+        update_result = await notes_collection.update_one(
+            live({"_id": ObjectId(note_id)}),
+            {"$set": {**updated_note.dict(), "updated_at": datetime.now(timezone.utc), "change_seq": seq}}
+        )
     if update_result.modified_count == 1:
+        await llm_cache.invalidate_note(note_id)
+        embedding_service.enqueue(note_id)
+        quiz_service.enqueue(note_id)
         return {"message": "Not güncellendi"}
     else:
         raise HTTPException(status_code=404, detail="Not bulunamadı veya güncellenemedi")
 
-# Not silme
+# Not silme: içerik kaldırılır, delta senkron için tombstone bırakılır
 @app.delete("/notes/{note_id}")
 async def delete_note(note_id: str):
-    delete_result = notes_collection.delete_one({"_id": ObjectId(note_id)})
-    if delete_result.deleted_count == 1:
+    now = datetime.now(timezone.utc)
+    async with change_seq(notes_meta_collection) as seq:
+        delete_result = await notes_collection.update_one(
+            live({"_id": ObjectId(note_id)}),
+            {
+                "$set": {"deleted": True, "deleted_at": now, "updated_at": now, "change_seq": seq},
+                "$unset": {"title": "", "content": "", "timestamp": ""},
+            },
+        )
+    if delete_result.modified_count == 1:
+        await llm_cache.invalidate_note(note_id)
+        await embedding_service.remove(note_id)
+        await quiz_service.remove(note_id)
         return {"message": "Not silindi"}
     else:
         raise HTTPException(status_code=404, detail="Not bulunamadı")
 
+# Nota anlamca en yakın notlar (embedding çağrısı yok; kayıtlı vektör kullanılır)
+@app.get("/notes/{note_id}/related")
+async def related_notes(note_id: str, k: int = Query(5, ge=1, le=50)):
+    vector = embedding_service.index.vector(note_id)
+    if vector is None:
+        raise HTTPException(status_code=404, detail="Notun gömmesi henüz hazır değil veya not bulunamadı")
+    hits = embedding_service.index.search(vector, k, exclude=note_id)
+    return {"results": await with_note_titles(hits)}
+
 # --- LLM Entegrasyonu Endpoint'leri ---
 
-# Notu özetleme
-@app.post("/notes/{note_id}/summarize")
-async def summarize_note(note_id: str):
-    note = notes_collection.find_one({"_id": ObjectId(note_id)})
+# İçeriği boş olmayan notu getirir; yoksa 404/400 fırlatır
+async def get_note_content(note_id: str) -> str:
+    note = await notes_collection.find_one(live({"_id": ObjectId(note_id)}))
     if not note:
         raise HTTPException(status_code=404, detail="Not bulunamadı")
-    
+
     content = note.get("content", "")
     if not content:
         raise HTTPException(status_code=400, detail="Not içeriği boş.")
-    
-    prompt = f"Bu metni çok kısa Türkçe özetle: {content}"
+    return content
+
+def build_summary_prompt(content: str) -> str:
+    return f"Bu metni çok kısa Türkçe özetle: {content}"
+
+def build_reduce_prompt(partial_summaries) -> str:
+    parts = "\n".join(f"- {summary}" for summary in partial_summaries)
+    return f"Aşağıdaki bölüm özetlerini tek bir çok kısa Türkçe özette birleştir:\n{parts}"
+
+def build_translation_prompt(text: str, target_language: str) -> str:
+    return f"Bu metni {target_language} diline çevir: {text}"
+
+def build_quiz_prompt(content: str) -> str:
+    return (
+        "Aşağıdaki ders notu içeriğine dayalı olarak bir quiz oluştur. "
+        "Oluşturduğun Quiz 'Türkçe' olsun.\n"
+        "Oluşturduğun Quiz 5 soru olsun."
+        "Her soru için 4 seçenek ve doğru cevabı belirt.\n"
+        "Yanıtı yalnızca JSON olarak ver: {\"questions\": [{\"question\": \"...\", "
+        "\"options\": [\"...\", \"...\", \"...\", \"...\"], \"answer\": \"A\"}]}. "
+        "Seçeneklerin başına harf koyma; \"answer\" doğru seçeneğin harfi (A, B, C veya D) olsun.\n"
+        f"Ders Notu: {content}"
+    )
+
+# Quiz, Ollama'nın JSON format moduyla şemaya zorlanarak üretilir ve doğrulanır;
+# model şemaya uymayan bir çıktı verirse üretim bir kez daha denenir.
+QUIZ_GENERATION_ATTEMPTS = 2
+
+async def generate_structured_quiz(content: str):
+    error = None
+    for _ in range(QUIZ_GENERATION_ATTEMPTS):
+        result = await ollama_client.generate(build_quiz_prompt(content), model=QUIZ_MODEL, format=QUIZ_SCHEMA)
+        try:
+            return validate_quiz(json.loads(result.get("response", "")))
+        except (json.JSONDecodeError, QuizValidationError) as e:
+            error = e
+    raise QuizValidationError(f"Model geçerli bir quiz üretemedi: {error}")
+
+# Quizler not içeriğinin hash'iyle quizzes koleksiyonunda tutulur; not yazıldığında arka planda hazırlanır
+quiz_service = QuizService(
+    notes_collection, mongo.collection('quizzes'), generate_structured_quiz, QUIZ_MODEL, QUIZ_PROMPT_VERSION
+)
+
+# Önbellekte varsa sonucu döndürür, yoksa Ollama'ya üretim yaptırıp önbelleğe yazar
+async def cached_generate(prompt: str, cache_key: str, model: str, note_id: str = None):
+    cached = await llm_cache.get(cache_key)
+    if cached is not None:
+        return cached, "hit"
+    result = await ollama_client.generate(prompt, model=model)
+    text = result.get("response", "").strip()
+    await llm_cache.set(cache_key, text, note_id=note_id)
+    return text, "miss"
+
+# Ollama'nın NDJSON parçalarını istemciye olduğu gibi (satır satır) aktarır.
+# Önbellekte sonuç varsa tek parça olarak döner; yoksa akış bitince sonuç önbelleğe yazılır.
+def ndjson_hit(cached: str) -> StreamingResponse:
+    line = json.dumps({"response": cached, "done": True, "cache": "hit"}, ensure_ascii=False) + "\n"
+    return StreamingResponse(iter([line]), media_type="application/x-ndjson")
+
+async def ndjson_stream(prompt: str, cache_key: str, model: str, note_id: str = None) -> StreamingResponse:
+    cached = await llm_cache.get(cache_key)
+    if cached is not None:
+        return ndjson_hit(cached)
+    return ndjson_generate(prompt, cache_key, model, note_id)
+
+def ndjson_generate(prompt: str, cache_key: str, model: str, note_id: str = None) -> StreamingResponse:
+    """Önbellek kontrolü yapılmış bir prompt'u akıtır ve tamamlanan yanıtı önbelleğe yazar."""
+    # Kuyruk doluysa akış başlamadan 429 döner (QueueFullError handler'ı)
+    ollama_client.scheduler.check_admission()
+
+    async def relay():
+        parts = []
+        try:
+            async for chunk in ollama_client.generate_stream(prompt, model=model):
+                parts.append(chunk.get("response", ""))
+                if chunk.get("done"):
+                    chunk["cache"] = "miss"
+                    await llm_cache.set(cache_key, "".join(parts).strip(), note_id=note_id)
+                yield json.dumps(chunk, ensure_ascii=False) + "\n"
+        except (OllamaError, QueueFullError) as e:
+            print(e)
+            yield json.dumps({"error": str(e), "done": True}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(relay(), media_type="application/x-ndjson")
+
+def summary_cache_key(content: str) -> str:
+    return LLMCache.make_key("summary", SUMMARY_MODEL, SUMMARY_PROMPT_VERSION, content)
+
+def chunked_summary_cache_key(content: str) -> str:
+    return LLMCache.make_key("summary_chunked", SUMMARY_MODEL, SUMMARY_PROMPT_VERSION, content)
+
+def translation_cache_key(text: str, target_language: str) -> str:
+    return LLMCache.make_key("translate", select_model("translate", text), TRANSLATION_PROMPT_VERSION, text, target_language)
+
+# Parça özetleri note_id'ye bağlanmaz, yalnızca parça içeriğiyle anahtarlanır;
+# böylece not düzenlendiğinde sadece değişen parçalar yeniden özetlenir.
+async def summarize_chunk(chunk: str) -> str:
+    key = LLMCache.make_key("summary_chunk", SUMMARY_MODEL, SUMMARY_PROMPT_VERSION, chunk)
+    summary, _ = await cached_generate(build_summary_prompt(chunk), key, SUMMARY_MODEL)
+    return summary
+
+async def reduce_summaries(partial_summaries) -> str:
+    result = await ollama_client.generate(build_reduce_prompt(partial_summaries), model=SUMMARY_MODEL)
+    return result.get("response", "").strip()
+
+def use_chunked_summary(content: str, mode: str) -> bool:
+    return mode == "chunked" or (mode == "auto" and estimate_tokens(content) > SUMMARY_CHUNK_TOKENS)
+
+async def chunked_summary(content: str, note_id: str):
+    cache_key = chunked_summary_cache_key(content)
+    cached = await llm_cache.get(cache_key)
+    if cached is not None:
+        return cached, "hit"
+    chunks = split_into_chunks(content, SUMMARY_CHUNK_TOKENS)
+    summary = await map_reduce_summarize(chunks, summarize_chunk, reduce_summaries, SUMMARY_PARALLELISM)
+    await llm_cache.set(cache_key, summary, note_id=note_id)
+    return summary, "miss"
+
+# Notu özetleme; uzun notlar (veya mode=chunked) parça parça özetlenip birleştirilir
+@app.post("/notes/{note_id}/summarize")
+async def summarize_note(note_id: str, mode: str = Query("auto", pattern="^(auto|single|chunked)$")):
+    content = await get_note_content(note_id)
+    prompt = build_summary_prompt(content)
     
     try:
-        response = requests.post(
-            f"{OLLAMA_URL}/api/generate",
-            json={
-                "model": "llama3:8b",
-                "prompt": prompt,
-                "stream": False
-            }
-        )
-        if response.status_code == 200:
-            summary = response.json().get("response", "").strip()
-            return {"summary": summary}
+        if use_chunked_summary(content, mode):
+            summary, cache_status = await chunked_summary(content, note_id)
         else:
-            print(f"Ollama API hatası: {response.status_code} - {response.text}")
-            raise HTTPException(status_code=500, detail="Özetleme sırasında hata oluştu")
-    except requests.exceptions.RequestException as e:
-        print(f"Ollama'ya bağlanılamadı: {e}")
-        raise HTTPException(status_code=500, detail="Ollama'ya bağlanılamadı")
+            summary, cache_status = await cached_generate(prompt, summary_cache_key(content), SUMMARY_MODEL, note_id)
+    except OllamaError as e:
+        print(e)
+        if e.status_code is None:
+            raise HTTPException(status_code=500, detail="Ollama'ya bağlanılamadı")
+        raise HTTPException(status_code=500, detail="Özetleme sırasında hata oluştu")
+    return {"summary": summary, "cache": cache_status}
+
+# Notu özetleme (token akışı)
+@app.post("/notes/{note_id}/summarize/stream")
+async def summarize_note_stream(note_id: str, mode: str = Query("auto", pattern="^(auto|single|chunked)$")):
+    content = await get_note_content(note_id)
+    if not use_chunked_summary(content, mode):
+        return await ndjson_stream(build_summary_prompt(content), summary_cache_key(content), SUMMARY_MODEL, note_id)
+
+    # Parçalı modda map adımı önce tamamlanır, yalnızca reduce adımı akıtılır
+    # Önbellek tek kez okunur: arada silinse bile boş prompt akıtılmaz
+    cache_key = chunked_summary_cache_key(content)
+    cached = await llm_cache.get(cache_key)
+    if cached is not None:
+        return ndjson_hit(cached)
+    chunks = split_into_chunks(content, SUMMARY_CHUNK_TOKENS)
+    try:
+        partial_summaries = await summarize_chunks(chunks, summarize_chunk, SUMMARY_PARALLELISM)
+    except OllamaError as e:
+        print(e)
+        raise HTTPException(status_code=500, detail="Özetleme sırasında hata oluştu")
+    return ndjson_generate(build_reduce_prompt(partial_summaries), cache_key, SUMMARY_MODEL, note_id)
 
 # Çeviri endpoint'i
 @app.post("/translate")
 async def translate_text(request: TranslationRequest):
-    prompt = f"Bu metni {request.target_language} diline çevir: {request.text}"
+    prompt = build_translation_prompt(request.text, request.target_language)
     
+    cache_key = translation_cache_key(request.text, request.target_language)
     try:
-        response = requests.post(
-            f"{OLLAMA_URL}/api/generate",
-            json={
-                "model": "llama3:8b",
-                "prompt": prompt,
-                "stream": False
-            }
+        translated_text, cache_status = await cached_generate(
+            prompt, cache_key, select_model("translate", request.text)
         )
-        if response.status_code == 200:
-            translated_text = response.json().get("response", "").strip()
-            return {"translated_text": translated_text}
-        else:
-            print(f"Ollama API hatası: {response.text}")
-            raise HTTPException(status_code=500, detail="Çeviri başarısız oldu")
-    except requests.exceptions.RequestException as e:
-        print(f"Ollama'ya bağlanılamadı: {e}")
-        raise HTTPException(status_code=500, detail="Ollama'ya bağlantı hatası")
+    except OllamaError as e:
+        print(e)
+        if e.status_code is None:
+            raise HTTPException(status_code=500, detail="Ollama'ya bağlantı hatası")
+        raise HTTPException(status_code=500, detail="Çeviri başarısız oldu")
+    return {"translated_text": translated_text, "cache": cache_status}
+
+# Çeviri (token akışı)
+@app.post("/translate/stream")
+async def translate_text_stream(request: TranslationRequest):
+    return await ndjson_stream(
+        build_translation_prompt(request.text, request.target_language),
+        translation_cache_key(request.text, request.target_language),
+        select_model("translate", request.text),
+    )
+
+# Toplu çeviri: metinler x diller. Aynı (metin, dil) çifti yalnızca bir kez çevrilir,
+# çağrılar eşzamanlılık sınırı altında yürütülür, sonuçlar giriş sırasıyla döner.
+@app.post("/translate/batch")
+async def translate_batch(request: BatchTranslationRequest):
+    set_priority("batch")
+    pairs = [(i, text, lang) for i, text in enumerate(request.texts) for lang in request.target_languages]
+    if len(pairs) > TRANSLATE_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"En fazla {TRANSLATE_BATCH_MAX_ITEMS} çeviri isteği gönderilebilir")
+
+    semaphore = asyncio.Semaphore(TRANSLATE_BATCH_PARALLELISM)
+
+    async def translate_one(text, lang):
+        async with semaphore:
+            try:
+                translated, cache_status = await cached_generate(
+                    build_translation_prompt(text, lang), translation_cache_key(text, lang), select_model("translate", text)
+                )
+                return {"translated_text": translated, "cache": cache_status}
+            except (OllamaError, QueueFullError) as e:
+                print(e)
+                return {"error": "Çeviri başarısız oldu"}
+
+    unique = list(dict.fromkeys((text, lang) for _, text, lang in pairs))
+    outcomes = await asyncio.gather(*(translate_one(text, lang) for text, lang in unique))
+    by_pair = dict(zip(unique, outcomes))
+
+    results = [
+        {"index": i, "target_language": lang, **by_pair[(text, lang)]}
+        for i, text, lang in pairs
+    ]
+    return {"results": results}
     
     # ★ Yeni: Otomatik Quiz Oluşturma Endpoint'i ★
-@app.post("/notes/{note_id}/quiz")
-async def generate_quiz(note_id: str):
+# Quiz çoğunlukla not kaydedilirken arka planda hazırlanmıştır; o durumda bu yalnızca bir okumadır.
+async def load_quiz(note_id: str):
+    set_priority("batch")
     # İlgili notu MongoDB'den çekiyoruz.
-    note = notes_collection.find_one({"_id": ObjectId(note_id)})
-    if not note:
-        raise HTTPException(status_code=404, detail="Not bulunamadı")
-    
-    content = note.get("content", "")
-    if not content:
-        raise HTTPException(status_code=400, detail="Not içeriği boş.")
-    
-    # LLM'ye gönderilecek prompt'u oluşturuyoruz.
-    prompt = (
-        "Aşağıdaki ders notu içeriğine dayalı olarak bir quiz oluştur. "
-        "Oluşturduğun Quiz 'Türkçe' olsun.\n"
-        "Oluşturduğun Quiz 5 soru olsun."
-        "Her soru için 4 seçenek ve doğru cevabı belirt.\n"
-        "Lütfen quiz çıktısını markdown formatında oluştur; her soruyu 'Soru {n}: Aşağıdakilerden hangisi doğrudur? veya xxx nedir?' şeklinde başlat, seçenekleri alt alta sıralı (her biri yeni satırda olacak şekilde) listele ve en altta 'Doğru Cevap:' kısmında doğru seçeneği belirt. Seçenekleri A), B), C), D) şeklinde yaz.\n"
-        f"Ders Notu: {content}"
-    )
+    content = await get_note_content(note_id)
     try:
-        response = requests.post(
-            f"{OLLAMA_URL}/api/generate",
-            json={
-                "model": "llama3:8b",
-                "prompt": prompt,
-                "stream": False
-            }
-        )
-        if response.status_code == 200:
-            # LLM'nin ürettiği quiz yanıtını alıyoruz.
-            quiz_response = response.json().get("response", "").strip()
-            return {"quiz": quiz_response}
-        else:
-            raise HTTPException(status_code=500, detail=f"Quiz oluşturulurken hata oluştu: {response.text}")
-    except requests.exceptions.RequestException as e:
-        raise HTTPException(status_code=500, detail=f"Ollama'ya bağlanılamadı: {e}")
+        # Kayıtlı (veya henüz üretilen) yapılandırılmış quizi alıyoruz.
+        quiz, cache_status = await quiz_service.get_or_create(note_id, content)
+    except OllamaError as e:
+        if e.status_code is None:
+            raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=f"Quiz oluşturulurken hata oluştu: {e.text}")
+    except QuizValidationError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return quiz, cache_status
+
+@app.post("/notes/{note_id}/quiz")
+async def generate_quiz(note_id: str):
+    quiz, cache_status = await load_quiz(note_id)
+    return {"quiz": quiz_markdown(quiz["questions"]), "questions": quiz["questions"], "cache": cache_status}
+
+# Eski istemciler için NDJSON biçimi: JSON modunda token akışı anlamsız olduğundan quiz tek parça döner
+@app.post("/notes/{note_id}/quiz/stream")
+async def generate_quiz_stream(note_id: str):
+    quiz, cache_status = await load_quiz(note_id)
+    line = json.dumps(
+        {"response": quiz_markdown(quiz["questions"]), "questions": quiz["questions"], "done": True, "cache": cache_status},
+        ensure_ascii=False,
+    ) + "\n"
+    return StreamingResponse(iter([line]), media_type="application/x-ndjson")
@@ -1,10 +1,66 @@
+import json
 import streamlit as st
 import requests
+import uuid
 from datetime import datetime
+from requests.adapters import HTTPAdapter
 
 # FastAPI backend URL
 API_URL = "http://127.0.0.1:8000"
 
+# Her istekte yüklenecek not sayısı
+PAGE_SIZE = 20
+
+# Streamlit her etkileşimde betiği baştan çalıştırır; bağlantılar yeniden kurulmasın diye
+# tek bir havuzlu Session tüm yeniden çalıştırmalar boyunca paylaşılır
+@st.cache_resource
+def get_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+# Backend'in Ollama kuyruğu istemci başına adil sıralama yapar; paylaşılan Session'ın
+# başlığı değiştirilemeyeceği için her tarayıcı oturumu kimliğini her istekte ayrıca gönderir
+class SessionClient:
+    def __init__(self, session, client_id):
+        self.session = session
+        self.client_id = client_id
+
+    def request(self, method, url, headers=None, **kwargs):
+        return self.session.request(method, url, headers={"X-Client-Id": self.client_id, **(headers or {})}, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+http = SessionClient(get_session(), st.session_state.setdefault("client_id", uuid.uuid4().hex))
+
+# Backend'in NDJSON akışını okuyup gelen token'ları anında ekrana yazar; tam metni döndürür
+def render_stream(path, payload=None):
+    placeholder = st.empty()
+    text = ""
+    with http.post(f"{API_URL}{path}", json=payload, stream=True) as response:
+        if response.status_code != 200:
+            return None
+        for line in response.iter_lines(decode_unicode=True):
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if "error" in chunk:
+                st.error(chunk["error"])
+                return None
+            text += chunk.get("response", "")
+            placeholder.markdown(text + "▌")
+    placeholder.markdown(text)
+    return text
+
 st.title("LLM Destekli Not Defteri")
 
 # Sidebar - Yeni not ekleme
@@ -12,19 +68,105 @@ st.sidebar.header("Yeni Not Ekle")
 title = st.sidebar.text_input("Başlık")
 content = st.sidebar.text_area("İçerik")
 
+# Notları sayfa sayfa yükler; yüklenenler session_state'te tutulur
+def load_notes_page(cursor=None):
+    params = {"limit": PAGE_SIZE}
+    if cursor:
+        params["cursor"] = cursor
+    response = http.get(f"{API_URL}/notes", params=params)
+    if response.status_code != 200:
+        st.session_state["notes_error"] = True
+        return
+    page = response.json()
+    if cursor is None:
+        st.session_state["notes_etag"] = response.headers.get("ETag")
+    st.session_state["notes"].extend(page["notes"])
+    st.session_state["notes_cursor"] = page["next_cursor"]
+    st.session_state["notes_error"] = False
+
+# Not listesi ilk sayfadan yeniden yüklenir (kayıt/silme sonrası)
+def reset_notes():
+    st.session_state["notes"] = []
+    st.session_state["notes_cursor"] = None
+    load_notes_page()
+
+# Önbellekteki liste hâlâ güncel mi? İlk sayfa ETag'iyle koşullu istek atılır;
+# değişiklik yoksa sunucu gövdesiz 304 döner ve eldeki kopya kullanılmaya devam eder.
+def revalidate_notes():
+    etag = st.session_state.get("notes_etag")
+    if not etag:
+        reset_notes()
+        return
+    response = http.get(f"{API_URL}/notes", params={"limit": PAGE_SIZE}, headers={"If-None-Match": etag})
+    if response.status_code == 304:
+        return
+    if response.status_code != 200:
+        st.session_state["notes_error"] = True
+        return
+    # Liste değişmiş: önceden yüklenen sonraki sayfalar bırakılıp yeni ilk sayfa kullanılır
+    page = response.json()
+    st.session_state["notes"] = page["notes"]
+    st.session_state["notes_cursor"] = page["next_cursor"]
+    st.session_state["notes_etag"] = response.headers.get("ETag")
+    st.session_state["notes_error"] = False
+
+if "notes" not in st.session_state:
+    reset_notes()
+else:
+    revalidate_notes()
+
 if st.sidebar.button("Notu Kaydet"):
     new_note = {"title": title, "content": content, "timestamp": datetime.now().isoformat()}
-    response = requests.post(f"{API_URL}/notes", json=new_note)
+    response = http.post(f"{API_URL}/notes", json=new_note)
     if response.status_code == 200:
         st.sidebar.success("Not başarıyla kaydedildi!")
+        reset_notes()
     else:
         st.sidebar.error("Not kaydedilemedi!")
 
+# Sidebar - Yüklenen notları seçilen dillere tek istekte çevirme
+st.sidebar.header("Toplu Çeviri")
+batch_languages = st.sidebar.multiselect("Hedef Diller", ["İngilizce", "İspanyolca", "Japonca"])
+if st.sidebar.button("Yüklenen Notları Çevir") and batch_languages and st.session_state["notes"]:
+    batch_notes = st.session_state["notes"]
+    batch_response = http.post(
+        f"{API_URL}/translate/batch",
+        json={"texts": [n["content"] for n in batch_notes], "target_languages": batch_languages}
+    )
+    if batch_response.status_code == 200:
+        for item in batch_response.json()["results"]:
+            note_title = batch_notes[item["index"]]["title"]
+            st.sidebar.markdown(f"**{note_title} ➡️ {item['target_language']}**")
+            if "error" in item:
+                st.sidebar.error(item["error"])
+            else:
+                st.sidebar.write(item["translated_text"])
+    else:
+        st.sidebar.error("Toplu çeviri hatası!")
+
+# Ana ekran - Not arama (sunucu tarafında, index üzerinden)
+search_query = st.text_input("🔍 Notlarda Ara")
+semantic = st.checkbox("Anlamsal arama (kelime yerine anlam benzerliği)")
+if search_query:
+    search_path = "/notes/semantic_search" if semantic else "/notes/search"
+    search_response = http.get(f"{API_URL}{search_path}", params={"q": search_query})
+    if search_response.status_code == 200:
+        results = search_response.json()["results"]
+        if results:
+            for result in results:
+                st.markdown(f"**{result['title']}**")
+                if "snippet" in result:
+                    st.caption(result["snippet"])
+        else:
+            st.write("Eşleşen not bulunamadı.")
+    else:
+        st.error("Arama hatası!")
+    st.markdown("---")
+
 # Ana ekran - Not listesi
 st.header("Not Listesi")
-response = requests.get(f"{API_URL}/notes")
-if response.status_code == 200:
-    notes = response.json()
+if not st.session_state["notes_error"]:
+    notes = st.session_state["notes"]
     if notes:
         for note in notes:
             st.subheader(note['title'])
@@ -36,10 +178,8 @@ if response.status_code == 200:
             
             # Özetleme Butonu
             if st.button(f"Özetle: {note['title']}", key=f"summarize_{note['id']}"):
-                summary_response = requests.post(f"{API_URL}/notes/{note['id']}/summarize")
-                if summary_response.status_code == 200:
-                    st.write("Özet:", summary_response.json()["summary"])
-                else:
+                st.write("Özet:")
+                if render_stream(f"/notes/{note['id']}/summarize/stream") is None:
                     st.error("Özetleme hatası!")
             
             # Çeviri Butonu
@@ -49,37 +189,46 @@ if response.status_code == 200:
                 key=f"lang_{note['id']}"
             )
             if st.button(f"Çevir ➡️ {target_language}", key=f"translate_{note['id']}"):
-                translate_response = requests.post(
-                    f"{API_URL}/translate",
-                    json={"text": note['content'], "target_language": target_language}
+                st.success("Çeviri:")
+                translated = render_stream(
+                    "/translate/stream",
+                    {"text": note['content'], "target_language": target_language}
                 )
-                if translate_response.status_code == 200:
-                    st.success("Çeviri:")
-                    st.write(translate_response.json()["translated_text"])
-                else:
+                if translated is None:
                     st.error("Çeviri hatası!")
             
 # ★ Yeni: Quiz Oluşturma Butonu ★
             if st.button(f"Quiz Oluştur: {note['title']}", key=f"quiz_{note['id']}"):
-                quiz_response = requests.post(f"{API_URL}/notes/{note['id']}/quiz")
-                if quiz_response.status_code == 200:
-                    quiz_data = quiz_response.json()
-                    st.subheader("Oluşturulan Quiz")
-                    # Burada LLM'den gelen quiz metnini gösteriyoruz.
-                    st.write(quiz_data.get("quiz", "Quiz verisi boş."))
-                else:
+                st.subheader("Oluşturulan Quiz")
+                # LLM'den gelen quiz metni üretildikçe gösteriliyor.
+                if render_stream(f"/notes/{note['id']}/quiz/stream") is None:
                     st.error("Quiz oluşturulurken hata!")
 
+            # Benzer Notlar Butonu
+            if st.button(f"Benzer Notlar: {note['title']}", key=f"related_{note['id']}"):
+                related_response = http.get(f"{API_URL}/notes/{note['id']}/related")
+                if related_response.status_code == 200:
+                    for related in related_response.json()["results"]:
+                        st.write(f"- {related['title']} ({related['score']:.2f})")
+                else:
+                    st.info("Bu not için benzerlik bilgisi henüz hazır değil.")
+
             # Silme Butonu
             if st.button(f"Sil: {note['title']}", key=f"delete_{note['id']}"):
-                delete_response = requests.delete(f"{API_URL}/notes/{note['id']}")
+                delete_response = http.delete(f"{API_URL}/notes/{note['id']}")
                 if delete_response.status_code == 200:
                     st.success("Not silindi!")
+                    reset_notes()
                     st.experimental_rerun()  # Sayfayı yenile
                 else:
                     st.error("Silme hatası!")
             
             st.markdown("---")
+
+        # Sonraki sayfa yalnızca istendiğinde yüklenir
+        if st.session_state["notes_cursor"] and st.button("Daha Fazla Not Yükle"):
+            load_notes_page(st.session_state["notes_cursor"])
+            st.experimental_rerun()
     else:
         st.write("Henüz not eklenmedi.")
 else:
@@ -0,0 +1,209 @@
+import asyncio
+import base64
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+from bson import json_util
+from pymongo import ReturnDocument
+
+# Silinen notlar tombstone olarak kalır; okuma sorguları bu filtreyle canlı notları seçer
+LIVE_NOTES = {"deleted": {"$ne": True}}
+
+
+def live(query=None):
+    return {**(query or {}), **LIVE_NOTES}
+
+
+# Ayrılmış ama yazması henüz bitmemiş sıra numaraları bu süreden sonra terk edilmiş sayılır
+# (ör. yazma sırasında süreç öldü); yoksa değişiklik akışı sonsuza kadar bu numarada takılırdı.
+PENDING_SEQ_TTL = timedelta(seconds=30)
+
+
+async def reserve_change_seq(meta):
+    """Yeni bir değişiklik sıra numarası ayırır ve yazma bitene kadar "bekleyen" olarak işaretler.
+
+    Sayaç artışı ve bekleyenler listesine ekleme tek bir atomik güncellemedir.
+    """
+    doc = await meta.find_one_and_update(
+        {"_id": "notes"},
+        [
+            # seq alanı olmayan eski kayıtlarda sayaç, eskiden sıra olarak kullanılan version'dan devam eder
+            {"$set": {"seq": {"$add": [{"$ifNull": ["$seq", {"$ifNull": ["$version", 0]}]}, 1]}}},
+            {"$set": {"pending": {"$concatArrays": [
+                {"$ifNull": ["$pending", []]},
+                [{"seq": "$seq", "at": datetime.now(timezone.utc)}],
+            ]}}},
+        ],
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return doc["seq"]
+
+
+async def release_change_seq(meta, seq):
+    """Yazma tamamlandı (veya başarısız oldu): sıra numarası bekleyenlerden çıkar.
+
+    /notes ETag'inin sürümü de ancak burada, yazma görünür olduktan sonra artar;
+    böylece yazmadan önce okunan eski liste yeni ETag ile önbelleğe alınamaz.
+    """
+    await meta.update_one(
+        {"_id": "notes"},
+        {"$pull": {"pending": {"seq": seq}}, "$inc": {"version": 1}, "$set": {"updated_at": datetime.now(timezone.utc)}},
+    )
+
+
+@asynccontextmanager
+async def change_seq(meta):
+    """Yazma işlemini bir sıra numarasıyla sarar: ayırır, yazmaya verir, sonunda bırakır."""
+    seq = await reserve_change_seq(meta)
+    try:
+        yield seq
+    finally:
+        await release_change_seq(meta, seq)
+
+
+def _as_utc(value):
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def high_water_mark(meta_doc, now=None):
+    """İstemcilere gösterilebilecek en büyük sıra numarası.
+
+    Sıra numarası yazmadan önce ayrıldığı için yazmalar sırasız tamamlanabilir:
+    6 görünürken 5 hâlâ yazılıyor olabilir. Bu yüzden en küçük bekleyen numaranın
+    bir altı döndürülür; ondan küçük tüm numaraların yazması bitmiştir.
+    """
+    meta_doc = meta_doc or {}
+    cutoff = (now or datetime.now(timezone.utc)) - PENDING_SEQ_TTL
+    pending = [p["seq"] for p in meta_doc.get("pending", []) if _as_utc(p["at"]) >= cutoff]
+    if pending:
+        return min(pending) - 1
+    return meta_doc.get("seq", 0)
+
+
+async def committed_seq(meta):
+    return high_water_mark(await meta.find_one({"_id": "notes"}, {"seq": 1, "pending": 1}))
+
+
+# Değişiklik imleci iki türlüdür:
+# - snapshot: ilk (tam) senkron. Başladığı andaki high-water mark'a ("upto") kadar canlı
+#   notları gezer; tombstone içermez ve sıkıştırmadan etkilenmez (410 almaz).
+# - delta: artımlı senkron. Konumundan sonraki tüm değişiklikleri (silmeler dahil) verir;
+#   konumu sıkıştırılmış tombstone'ların gerisinde kalmışsa 410 alır.
+# Snapshot bittiğinde imleç "upto" konumundan başlayan bir delta imlecine dönüşür;
+# snapshot sürerken yapılan yazmalar böylece kaçırılmaz.
+def encode_change_cursor(state):
+    raw = json_util.dumps(state).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def change_cursor_state(values):
+    """Çözülmüş imleci {"mode", "seq", "id", "upto"} sözlüğüne çevirir.
+
+    Eski sürümün [change_seq, _id] biçimindeki imleçleri delta imleci sayılır.
+    """
+    if isinstance(values, list) and len(values) == 2 and isinstance(values[0], int):
+        return {"mode": "delta", "seq": values[0], "id": values[1]}
+    if not isinstance(values, dict) or "id" not in values:
+        raise ValueError("Geçersiz değişiklik imleci")
+    seq = values.get("seq")
+    if values.get("mode") == "snapshot" and isinstance(values.get("upto"), int) and (seq is None or isinstance(seq, int)):
+        return values
+    if values.get("mode") == "delta" and isinstance(seq, int):
+        return values
+    raise ValueError("Geçersiz değişiklik imleci")
+
+
+def snapshot_state(high_water):
+    return {"mode": "snapshot", "upto": high_water, "seq": None, "id": None}
+
+
+def changes_query(state, high_water):
+    """İmleç durumu için Mongo filtresi ve (change_seq, _id) sıralamasını döndürür."""
+    if state["mode"] == "snapshot":
+        query = live({"change_seq": {"$lte": state["upto"]}})
+    else:
+        query = {"change_seq": {"$lte": high_water}}
+    seq, last_id = state.get("seq"), state.get("id")
+    if seq is not None:
+        if last_id is None:
+            query["change_seq"]["$gt"] = seq
+        else:
+            query["$or"] = [
+                {"change_seq": {"$gt": seq}},
+                {"change_seq": seq, "_id": {"$gt": last_id}},
+            ]
+    return query, [("change_seq", 1), ("_id", 1)]
+
+
+def next_change_state(state, docs, limit):
+    """Sayfadan sonraki imleç durumunu ve devamı olup olmadığını döndürür."""
+    if len(docs) == limit:
+        return {**state, "seq": docs[-1]["change_seq"], "id": docs[-1]["_id"]}, True
+    if state["mode"] == "snapshot":
+        # Snapshot bitti; snapshot sırasında yapılan yazmalar delta olarak hemen istenebilir
+        return {"mode": "delta", "seq": state["upto"], "id": None}, True
+    if docs:
+        return {**state, "seq": docs[-1]["change_seq"], "id": docs[-1]["_id"]}, False
+    return state, False
+
+
+def serialize_change(doc):
+    if doc.get("deleted"):
+        return {"id": str(doc["_id"]), "deleted": True, "deleted_at": doc.get("deleted_at")}
+    change = {key: value for key, value in doc.items() if key not in ("_id", "change_seq")}
+    change["id"] = str(doc["_id"])
+    return change
+
+
+class TombstoneCompactor:
+    """Saklama süresini aşan tombstone'ları periyodik olarak kalıcı siler.
+
+    Silinenlerin en büyük sıra numarası notes_meta.compacted_seq'e yazılır;
+    imleci bundan eski olan istemciler silmeleri kaçıracağı için tam senkron yapmalıdır.
+    """
+
+    def __init__(self, notes, meta, retention_seconds, interval_seconds):
+        self.notes = notes
+        self.meta = meta
+        self.retention = timedelta(seconds=retention_seconds)
+        self.interval = interval_seconds
+        self._task = None
+
+    async def compacted_seq(self):
+        meta = await self.meta.find_one({"_id": "notes"}, {"compacted_seq": 1}) or {}
+        return meta.get("compacted_seq", 0)
+
+    async def compact(self):
+        # Süresi dolmuş (terk edilmiş) bekleyen sıra numaraları da temizlenir
+        await self.meta.update_one(
+            {"_id": "notes"}, {"$pull": {"pending": {"at": {"$lt": datetime.now(timezone.utc) - PENDING_SEQ_TTL}}}}
+        )
+        cutoff = datetime.now(timezone.utc) - self.retention
+        tombstones = await self.notes.find({"deleted": True, "deleted_at": {"$lt": cutoff}}, {"change_seq": 1})
+        if not tombstones:
+            return 0
+        # Sınır, silmeden önce yazılır; böylece hiçbir istemci silmeyi fark etmeden atlayamaz
+        max_seq = max(doc.get("change_seq", 0) for doc in tombstones)
+        await self.meta.update_one({"_id": "notes"}, {"$max": {"compacted_seq": max_seq}}, upsert=True)
+        result = await self.notes.delete_many({"_id": {"$in": [doc["_id"] for doc in tombstones]}, "deleted": True})
+        return result.deleted_count
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                removed = await self.compact()
+                if removed:
+                    print(f"{removed} tombstone kalıcı olarak silindi")
+            except Exception as e:
+                print("Tombstone sıkıştırma hatası:", e)
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,75 @@
+import asyncio
+import re
+
+# Cümle sonları (. ! ? …) ve paragraf boşlukları bölme noktası kabul edilir
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?…])\s+|\n\s*\n")
+
+
+def estimate_tokens(text: str) -> int:
+    # Tokenizer'a bağımlı olmamak için kaba tahmin: ~4 karakter = 1 token
+    return max(1, len(text) // 4)
+
+
+def _split_long_sentence(sentence: str, max_tokens: int):
+    # Bütçeyi tek başına aşan cümle kelime sınırlarından bölünür
+    max_chars = max_tokens * 4
+    words = []
+    for word in sentence.split():
+        # Boşluksuz çok uzun diziler (URL, base64 vb.) karakter bazında kesilir
+        words.extend(word[i:i + max_chars] for i in range(0, len(word), max_chars))
+    piece = []
+    for word in words:
+        if piece and estimate_tokens(" ".join(piece + [word])) > max_tokens:
+            yield " ".join(piece)
+            piece = []
+        piece.append(word)
+    if piece:
+        yield " ".join(piece)
+
+
+def split_into_chunks(text: str, max_tokens: int):
+    """Metni cümle sınırlarına hizalı, her biri token bütçesini aşmayan parçalara böler."""
+    chunks = []
+    current = []
+    current_tokens = 0
+    for sentence in SENTENCE_SPLIT.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        pieces = [sentence]
+        if estimate_tokens(sentence) > max_tokens:
+            pieces = list(_split_long_sentence(sentence, max_tokens))
+        for piece in pieces:
+            tokens = estimate_tokens(piece)
+            if current and current_tokens + tokens > max_tokens:
+                chunks.append(" ".join(current))
+                current = []
+                current_tokens = 0
+            current.append(piece)
+            current_tokens += tokens
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+async def summarize_chunks(chunks, summarize_chunk, parallelism=3):
+    """Parçaları en fazla `parallelism` eşzamanlı çağrıyla özetler (map adımı); sırayı korur."""
+    semaphore = asyncio.Semaphore(parallelism)
+
+    async def run(chunk):
+        async with semaphore:
+            return await summarize_chunk(chunk)
+
+    return await asyncio.gather(*(run(chunk) for chunk in chunks))
+
+
+async def map_reduce_summarize(chunks, summarize_chunk, reduce, parallelism=3):
+    """Map adımının ardından parça özetleri üzerinde tek bir reduce adımı çalıştırır.
+
+    summarize_chunk(chunk) ve reduce(partial_summaries) async fonksiyonlardır;
+    parça özetlerinin önbelleğe alınması summarize_chunk'ın sorumluluğundadır.
+    """
+    partial_summaries = await summarize_chunks(chunks, summarize_chunk, parallelism)
+    if len(partial_summaries) == 1:
+        return partial_summaries[0]
+    return await reduce(partial_summaries)
@@ -0,0 +1,121 @@
+import asyncio
+from datetime import datetime, timezone
+
+import numpy as np
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from common.scheduler import set_priority
+from helpers.vector_index import VectorIndex
+
+
+def embedding_text(note):
+    return f"{note.get('title', '')}\n{note.get('content', '')}".strip()
+
+
+class EmbeddingService:
+    """Not gömmelerini istek yolunun dışında, toplu halde hesaplayan servis.
+
+    create/update handler'ları yalnızca not id'sini kuyruğa atar. Arka plandaki
+    görev kısa bir süre bekleyip biriken notları tek bir /api/embed çağrısıyla
+    vektöre çevirir, sonucu note_embeddings koleksiyonuna ve bellek içi index'e yazar.
+    """
+
+    def __init__(self, notes, embeddings, embed, batch_size=16, batch_wait=0.05, snapshot_path=None):
+        self.notes = notes
+        self.embeddings = embeddings
+        self.embed = embed  # async embed(texts) -> list[list[float]]
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.snapshot_path = snapshot_path
+        self.index = VectorIndex()
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    def enqueue(self, note_id):
+        self._queue.put_nowait(str(note_id))
+
+    async def remove(self, note_id):
+        self.index.remove(str(note_id))
+        await self.embeddings.delete_one({"_id": str(note_id)})
+
+    async def start(self):
+        await self.embeddings.create_index("updated_at")
+        await self._load()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.snapshot_path:
+            await asyncio.to_thread(self.index.save, self.snapshot_path)
+
+    async def _load(self):
+        # Varsa disk anlık görüntüsünden başlanır, sonrasındaki değişiklikler Mongo'dan uygulanır
+        since = None
+        if self.snapshot_path:
+            index, saved_at = await asyncio.to_thread(VectorIndex.load, self.snapshot_path)
+            if index is not None:
+                self.index = index
+                since = datetime.fromtimestamp(saved_at, timezone.utc)
+
+        query = {"updated_at": {"$gt": since}} if since else {}
+        for doc in await self.embeddings.find(query, {"vector": 1}):
+            self.index.upsert(doc["_id"], doc["vector"])
+
+        live_ids = {doc["_id"] for doc in await self.embeddings.find({}, {"_id": 1})}
+        for stale_id in [item_id for item_id in self.index.ids if item_id not in live_ids]:
+            self.index.remove(stale_id)
+
+        # Henüz gömmesi olmayan notlar arka planda tamamlanır
+        for note in await self.notes.find({"deleted": {"$ne": True}}, {"_id": 1}):
+            if str(note["_id"]) not in self.index:
+                self.enqueue(note["_id"])
+
+    async def _next_batch(self):
+        batch = {await self._queue.get()}
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.add(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return list(batch)
+
+    async def _run(self):
+        # Gömme hesapları etkileşimli isteklerin önüne geçmesin diye en düşük sınıfta çalışır
+        set_priority("background")
+        while True:
+            note_ids = await self._next_batch()
+            try:
+                await self._embed_batch(note_ids)
+            except Exception as e:
+                print("Not gömmeleri hesaplanamadı:", e)
+
+    async def _embed_batch(self, note_ids):
+        notes = await self.notes.find(
+            {"_id": {"$in": [ObjectId(note_id) for note_id in note_ids]}},
+            {"title": 1, "content": 1},
+        )
+        notes = [note for note in notes if embedding_text(note)]
+        if not notes:
+            return
+        vectors = await self.embed([embedding_text(note) for note in notes])
+        now = datetime.now(timezone.utc)
+        operations = []
+        for note, vector in zip(notes, vectors):
+            note_id = str(note["_id"])
+            vector = np.asarray(vector, dtype=np.float32)
+            self.index.upsert(note_id, vector)
+            operations.append(UpdateOne(
+                {"_id": note_id},
+                {"$set": {"vector": vector.tolist(), "updated_at": now}},
+                upsert=True,
+            ))
+        await self.embeddings.bulk_write(operations, ordered=False)
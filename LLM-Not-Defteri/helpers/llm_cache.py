@@ -0,0 +1,72 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Özet, quiz ve çeviri sonuçları için iki katmanlı önbellek.
+
+    Önde süreç içi bir LRU, arkada TTL index'li bir Mongo koleksiyonu bulunur.
+    Anahtar; işlem türü, model, prompt şablon sürümü ve içerik hash'inden üretilir.
+    Not'a bağlı kayıtlar note_id ile işaretlenir ki güncelleme/silmede temizlenebilsin.
+    """
+
+    def __init__(self, collection, maxsize=512, ttl_seconds=7 * 24 * 3600):
+        self.collection = collection
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._lru = OrderedDict()  # key -> (value, note_id)
+        self._lock = threading.Lock()
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("created_at", expireAfterSeconds=self.ttl_seconds)
+        await self.collection.create_index("note_id")
+
+    @staticmethod
+    def make_key(kind: str, model: str, template_version: str, text: str, *extra: str) -> str:
+        parts = [kind, model, template_version, *extra, content_hash(text)]
+        return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+    def _remember(self, key, value, note_id):
+        with self._lock:
+            self._lru[key] = (value, note_id)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.maxsize:
+                self._lru.popitem(last=False)
+
+    async def get(self, key):
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None:
+                self._lru.move_to_end(key)
+                return entry[0]
+
+        doc = await self.collection.find_one({"_id": key})
+        if doc is None:
+            return None
+        self._remember(key, doc["value"], doc.get("note_id"))
+        return doc["value"]
+
+    async def set(self, key, value, note_id=None):
+        self._remember(key, value, note_id)
+        await self.collection.update_one(
+            {"_id": key},
+            {"$set": {
+                "value": value,
+                "note_id": note_id,
+                "created_at": datetime.now(timezone.utc),
+            }},
+            upsert=True,
+        )
+
+    async def invalidate_note(self, note_id: str):
+        with self._lock:
+            stale = [key for key, (_, owner) in self._lru.items() if owner == note_id]
+            for key in stale:
+                del self._lru[key]
+        await self.collection.delete_many({"note_id": note_id})
@@ -0,0 +1,184 @@
+import asyncio
+import hashlib
+import re
+from datetime import datetime, timezone
+
+from bson import ObjectId
+
+from common.scheduler import set_priority
+from helpers.changes import live
+
+QUIZ_QUESTION_COUNT = 5
+OPTION_LETTERS = ("A", "B", "C", "D")
+
+# Ollama'nın "format" parametresine verilen JSON şeması; model çıktısı bu yapıya zorlanır
+QUIZ_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "questions": {
+            "type": "array",
+            "minItems": QUIZ_QUESTION_COUNT,
+            "items": {
+                "type": "object",
+                "properties": {
+                    "question": {"type": "string"},
+                    "options": {"type": "array", "items": {"type": "string"}, "minItems": 4, "maxItems": 4},
+                    "answer": {"type": "string", "enum": list(OPTION_LETTERS)},
+                },
+                "required": ["question", "options", "answer"],
+            },
+        },
+    },
+    "required": ["questions"],
+}
+
+# Modelin seçeneklerin başına koyabildiği "A) ", "B. " gibi ön ekler
+_OPTION_PREFIX = re.compile(r"^\s*[A-Da-d]\s*[\)\.:\-]\s*")
+
+
+class QuizValidationError(ValueError):
+    """Model çıktısı quiz şemasına uymadığında fırlatılır."""
+
+
+def validate_quiz(data):
+    """Ollama'nın JSON çıktısını doğrulayıp normalleştirilmiş soru listesine çevirir."""
+    questions = data.get("questions") if isinstance(data, dict) else None
+    if not isinstance(questions, list) or not questions:
+        raise QuizValidationError("Quiz soru listesi içermiyor")
+    if len(questions) < QUIZ_QUESTION_COUNT:
+        raise QuizValidationError(f"Quiz {QUIZ_QUESTION_COUNT} soru yerine {len(questions)} soru içeriyor")
+
+    normalized = []
+    for i, item in enumerate(questions[:QUIZ_QUESTION_COUNT], start=1):
+        if not isinstance(item, dict):
+            raise QuizValidationError(f"Soru {i} bir nesne değil")
+        question = str(item.get("question", "")).strip()
+        options = item.get("options")
+        answer = str(item.get("answer", "")).strip().upper()[:1]
+        if not question:
+            raise QuizValidationError(f"Soru {i} boş")
+        if not isinstance(options, list) or len(options) != len(OPTION_LETTERS):
+            raise QuizValidationError(f"Soru {i} için tam {len(OPTION_LETTERS)} seçenek olmalı")
+        options = [_OPTION_PREFIX.sub("", str(option)).strip() for option in options]
+        if not all(options):
+            raise QuizValidationError(f"Soru {i} boş seçenek içeriyor")
+        if answer not in OPTION_LETTERS:
+            raise QuizValidationError(f"Soru {i} için doğru cevap A-D olmalı")
+        normalized.append({"question": question, "options": options, "answer": answer})
+    return normalized
+
+
+def quiz_markdown(questions):
+    """Yapılandırılmış quizi eski istemcilerin beklediği markdown metnine çevirir."""
+    blocks = []
+    for n, q in enumerate(questions, start=1):
+        lines = [f"**Soru {n}:** {q['question']}", ""]
+        lines += [f"{letter}) {option}  " for letter, option in zip(OPTION_LETTERS, q["options"])]
+        lines += ["", f"Doğru Cevap: {q['answer']}"]
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+
+class QuizService:
+    """Not quizlerini not id'si ve içerik hash'ine göre quizzes koleksiyonunda tutan servis.
+
+    create/update handler'ları yalnızca not id'sini kuyruğa atar; arka plan
+    görevi quiz yoksa üretip kaydeder. Aynı not ve içerik için eşzamanlı üretimler
+    (arka plan + kullanıcı isteği) tek bir göreve bağlanır. Anahtar not id'sini
+    içerir; aynı içerikli iki notun quizi ayrıdır, birinin silinmesi diğerini etkilemez.
+    """
+
+    def __init__(self, notes, quizzes, generate, model, version):
+        self.notes = notes
+        self.quizzes = quizzes
+        self.generate = generate  # async generate(content) -> doğrulanmış soru listesi
+        self.model = model
+        self.version = version
+        self._queue = asyncio.Queue()
+        self._in_flight = {}
+        self._task = None
+
+    def quiz_id(self, note_id, content):
+        raw = "|".join([self.model, self.version, str(note_id), content])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def enqueue(self, note_id):
+        self._queue.put_nowait(str(note_id))
+
+    async def get(self, note_id, content):
+        return await self.quizzes.find_one({"_id": self.quiz_id(note_id, content)})
+
+    async def get_or_create(self, note_id, content):
+        """Kayıtlı quizi döndürür; yoksa üretir. (quiz dokümanı, "hit"/"miss") döner."""
+        doc = await self.get(note_id, content)
+        if doc is not None:
+            return doc, "hit"
+        return await self._ensure(note_id, content), "miss"
+
+    async def remove(self, note_id):
+        await self.quizzes.delete_many({"note_id": str(note_id)})
+
+    async def _ensure(self, note_id, content):
+        quiz_id = self.quiz_id(note_id, content)
+        task = self._in_flight.get(quiz_id)
+        if task is None:
+            task = asyncio.create_task(self._create(quiz_id, str(note_id), content))
+            self._in_flight[quiz_id] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(quiz_id, None))
+        # Bekleyen istemci koparsa ortak üretim iptal edilmez
+        return await asyncio.shield(task)
+
+    async def _create(self, quiz_id, note_id, content):
+        questions = await self.generate(content)
+        fields = {
+            "note_id": note_id,
+            "model": self.model,
+            "version": self.version,
+            "questions": questions,
+            "created_at": datetime.now(timezone.utc),
+        }
+        quiz = {"_id": quiz_id, **fields}
+        # Not üretim sürerken silindiyse remove() çoktan çalışmıştır; quiz kaydedilmez
+        note_filter = live({"_id": ObjectId(note_id)})
+        if await self.notes.find_one(note_filter, {"_id": 1}) is None:
+            return quiz
+        await self.quizzes.update_one({"_id": quiz_id}, {"$set": fields}, upsert=True)
+        # Notun eski içeriklerine ait quizler silinir. Not üretim sürerken güncellendiyse yeni
+        # içeriğin quizi de hazırlanmış olabilir; silme notun güncel içeriğine göre yapılır.
+        # Not kontrolle kayıt arasında silindiyse yazılan quiz de silinir (yetim kalmaz).
+        note = await self.notes.find_one(note_filter, {"content": 1})
+        if note is None:
+            await self.quizzes.delete_one({"_id": quiz_id})
+            return quiz
+        keep = {quiz_id}
+        if note.get("content"):
+            keep.add(self.quiz_id(note_id, note["content"]))
+        await self.quizzes.delete_many({"note_id": note_id, "_id": {"$nin": list(keep)}})
+        return quiz
+
+    async def start(self):
+        await self.quizzes.create_index("note_id")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # shield'lı üretimler bekleyen iptal edilse de sürer; Ollama istemcisi kapanmadan durdurulur
+        in_flight = list(self._in_flight.values())
+        for task in in_flight:
+            task.cancel()
+        await asyncio.gather(*in_flight, return_exceptions=True)
+
+    async def _run(self):
+        # Ön hesaplama etkileşimli isteklerin önüne geçmesin diye en düşük sınıfta çalışır
+        set_priority("background")
+        while True:
+            note_id = await self._queue.get()
+            try:
+                note = await self.notes.find_one(live({"_id": ObjectId(note_id)}), {"content": 1})
+                if note and note.get("content"):
+                    await self.get_or_create(note_id, note["content"])
+            except Exception as e:
+                print(f"Quiz ön hesaplanamadı ({note_id}):", e)
@@ -0,0 +1,41 @@
+import re
+
+# Başlık eşleşmeleri içerik eşleşmelerinden daha değerli sayılır
+TEXT_INDEX_WEIGHTS = {"title": 5, "content": 1}
+TEXT_INDEX_NAME = "notes_text"
+
+
+def text_index_spec():
+    # Türkçe kök bulma (stemming) ve stop-word listesi ile metin index'i
+    return {
+        "keys": [("title", "text"), ("content", "text")],
+        "weights": TEXT_INDEX_WEIGHTS,
+        "default_language": "turkish",
+        "name": TEXT_INDEX_NAME,
+    }
+
+
+def make_snippet(content: str, query: str, width: int = 160) -> str:
+    """İçerikte sorgu kelimelerinden birinin geçtiği yerin çevresinden kısa bir parça döndürür.
+
+    Mongo kök bulma yaptığı için tam kelime bulunamayabilir; bu yüzden
+    kelimelerin ilk birkaç harfi (kaba kök) ile de aranır.
+    """
+    lowered = content.casefold()
+    position = -1
+    for term in re.findall(r"\w+", query.casefold()):
+        for probe in (term, term[:5]):
+            position = lowered.find(probe)
+            if position != -1:
+                break
+        if position != -1:
+            break
+
+    if position == -1:
+        snippet = content[:width]
+        return snippet + ("…" if len(content) > width else "")
+
+    start = max(0, position - width // 2)
+    end = min(len(content), start + width)
+    snippet = content[start:end].strip()
+    return ("…" if start > 0 else "") + snippet + ("…" if end < len(content) else "")
@@ -0,0 +1,110 @@
+import json
+import os
+import time
+
+import numpy as np
+
+
+class VectorIndex:
+    """Not gömmeleri için bellek içi float32 matris üzerinde kosinüs benzerliği index'i.
+
+    Satırlar eklenirken L2 normuna bölünür; böylece benzerlik tek bir
+    matris-vektör çarpımıdır. Kapasite doldukça matris iki katına büyütülür,
+    silinen satırın yerine son satır taşınır (boşluk kalmaz).
+    """
+
+    def __init__(self, dim=None, capacity=1024):
+        self.dim = dim
+        self.capacity = capacity
+        self.matrix = None
+        self.ids = []
+        self.rows = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, item_id):
+        return item_id in self.rows
+
+    def _ensure_capacity(self, dim):
+        if self.matrix is None:
+            self.dim = dim
+            self.matrix = np.zeros((self.capacity, dim), dtype=np.float32)
+        elif len(self.ids) >= self.matrix.shape[0]:
+            grown = np.zeros((self.matrix.shape[0] * 2, self.dim), dtype=np.float32)
+            grown[: len(self.ids)] = self.matrix[: len(self.ids)]
+            self.matrix = grown
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def upsert(self, item_id, vector):
+        vector = self._normalize(vector)
+        if self.dim is not None and vector.shape[0] != self.dim:
+            raise ValueError(f"Vektör boyutu {vector.shape[0]}, index boyutu {self.dim}")
+        row = self.rows.get(item_id)
+        if row is None:
+            self._ensure_capacity(vector.shape[0])
+            row = len(self.ids)
+            self.ids.append(item_id)
+            self.rows[item_id] = row
+        self.matrix[row] = vector
+
+    def remove(self, item_id):
+        row = self.rows.pop(item_id, None)
+        if row is None:
+            return
+        last = len(self.ids) - 1
+        if row != last:
+            moved_id = self.ids[last]
+            self.matrix[row] = self.matrix[last]
+            self.ids[row] = moved_id
+            self.rows[moved_id] = row
+        self.ids.pop()
+
+    def vector(self, item_id):
+        row = self.rows.get(item_id)
+        return None if row is None else self.matrix[row]
+
+    def search(self, query, k=10, exclude=None):
+        """En benzer k kaydı (id, skor) listesi olarak döndürür."""
+        if not self.ids:
+            return []
+        scores = self.matrix[: len(self.ids)] @ self._normalize(query)
+        if exclude in self.rows:
+            scores[self.rows[exclude]] = -np.inf
+        k = min(k, len(self.ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[i], float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+    # --- Disk anlık görüntüsü (opsiyonel) ---
+
+    def save(self, path):
+        """Matrisi .npy, id listesini .json olarak yazar; dönen değer kayıt zamanıdır."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        saved_at = time.time()
+        matrix = self.matrix[: len(self.ids)] if self.matrix is not None else np.zeros((0, 0), np.float32)
+        np.save(f"{path}.npy", matrix)
+        with open(f"{path}.json", "w", encoding="utf-8") as f:
+            json.dump({"ids": self.ids, "saved_at": saved_at}, f)
+        return saved_at
+
+    @classmethod
+    def load(cls, path):
+        """Anlık görüntüyü bellek eşlemeli (copy-on-write) açar; yoksa (None, None) döner."""
+        if not (os.path.exists(f"{path}.npy") and os.path.exists(f"{path}.json")):
+            return None, None
+        with open(f"{path}.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        matrix = np.load(f"{path}.npy", mmap_mode="c")
+        index = cls()
+        if matrix.size:
+            index.dim = matrix.shape[1]
+            index.matrix = matrix
+            index.ids = list(meta["ids"])
+            index.rows = {item_id: row for row, item_id in enumerate(index.ids)}
+        return index, meta["saved_at"]
@@ -0,0 +1,148 @@
+import base64
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("bson")
+pytest.importorskip("pymongo")
+
+from bson import json_util
+
+from helpers.changes import (
+    PENDING_SEQ_TTL,
+    change_cursor_state,
+    changes_query,
+    encode_change_cursor,
+    high_water_mark,
+    next_change_state,
+    snapshot_state,
+)
+
+NOW = datetime(2024, 5, 1, tzinfo=timezone.utc)
+
+
+def _matches(doc, query):
+    # Testte kullanılan sorgu alt kümesi: eşitlik, $lte/$gt/$ne ve $or
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(_matches(doc, branch) for branch in condition):
+                return False
+            continue
+        value = doc.get(key)
+        if not isinstance(condition, dict):
+            if value != condition:
+                return False
+            continue
+        for op, operand in condition.items():
+            if op == "$ne" and value == operand:
+                return False
+            if op == "$lte" and not (value is not None and value <= operand):
+                return False
+            if op == "$gt" and not (value is not None and value > operand):
+                return False
+    return True
+
+
+class ChangeFeed:
+    """note_changes endpoint'inin bellek içi karşılığı: notlar, sıra sayacı ve sıkıştırma sınırı."""
+
+    def __init__(self):
+        self.notes = {}
+        self.seq = 0
+        self.compacted_seq = 0
+
+    def write(self, note_id, deleted=False):
+        self.seq += 1
+        self.notes[note_id] = {"_id": note_id, "change_seq": self.seq, "deleted": deleted}
+
+    def compact(self, upto):
+        # Saklama süresini aşan tombstone'lar: sıra numarası upto'ya kadar olanlar
+        tombstones = [doc for doc in self.notes.values() if doc["deleted"] and doc["change_seq"] <= upto]
+        self.compacted_seq = max([self.compacted_seq, *(doc["change_seq"] for doc in tombstones)])
+        for doc in tombstones:
+            del self.notes[doc["_id"]]
+
+    def page(self, cursor, limit):
+        high_water = self.seq
+        if cursor:
+            state = change_cursor_state(json_util.loads(base64.urlsafe_b64decode(cursor)))
+            if state["mode"] == "delta" and state["seq"] < self.compacted_seq:
+                return 410, None, None, False
+        else:
+            state = snapshot_state(high_water)
+        query, sort = changes_query(state, high_water)
+        docs = sorted((doc for doc in self.notes.values() if _matches(doc, query)),
+                      key=lambda doc: tuple(doc[field] for field, _ in sort))[:limit]
+        next_state, has_more = next_change_state(state, docs, limit)
+        return 200, [doc["_id"] for doc in docs], encode_change_cursor(next_state), has_more
+
+
+def test_high_water_mark_stops_below_the_oldest_live_pending_seq():
+    meta = {"seq": 7, "pending": [{"seq": 6, "at": NOW}, {"seq": 5, "at": NOW}]}
+    assert high_water_mark(meta, NOW) == 4
+    assert high_water_mark({"seq": 7, "pending": []}, NOW) == 7
+    assert high_water_mark(None, NOW) == 0
+
+
+def test_abandoned_pending_seq_does_not_block_the_feed():
+    stale = NOW - PENDING_SEQ_TTL - timedelta(seconds=1)
+    meta = {"seq": 7, "pending": [{"seq": 5, "at": stale.replace(tzinfo=None)}, {"seq": 7, "at": NOW}]}
+    assert high_water_mark(meta, NOW) == 6
+
+
+def test_legacy_list_cursor_is_a_delta_cursor():
+    assert change_cursor_state([3, "abc"]) == {"mode": "delta", "seq": 3, "id": "abc"}
+    with pytest.raises(ValueError):
+        change_cursor_state({"mode": "bilinmiyor"})
+
+
+def test_initial_sync_survives_compaction_and_picks_up_concurrent_writes():
+    feed = ChangeFeed()
+    for note_id in range(1, 6):
+        feed.write(note_id)
+    feed.write(2, deleted=True)
+
+    status, first, cursor, has_more = feed.page(None, 2)
+    assert (status, first, has_more) == (200, [1, 3], True)
+
+    # İlk senkron sürerken eski tombstone sıkıştırılır, yeni yazma ve silmeler gelir
+    feed.write(7)
+    feed.write(4, deleted=True)
+    feed.compact(upto=6)
+    feed.write(8)
+
+    status, second, cursor, has_more = feed.page(cursor, 2)
+    assert status == 200 and second == [5]
+    assert has_more
+
+    # Snapshot bitti; snapshot sırasında yapılan yazmalar (silme dahil) delta olarak gelir
+    status, delta, cursor, has_more = feed.page(cursor, 10)
+    assert status == 200 and delta == [7, 4, 8]
+    assert not has_more
+
+    status, empty, same_cursor, has_more = feed.page(cursor, 10)
+    assert (status, empty, same_cursor, has_more) == (200, [], cursor, False)
+
+
+def test_delta_cursor_behind_compaction_gets_410():
+    feed = ChangeFeed()
+    feed.write(1)
+    _, _, cursor, _ = feed.page(None, 10)
+    _, _, cursor, _ = feed.page(cursor, 10)
+    feed.write(1, deleted=True)
+    feed.compact(upto=feed.seq)
+    status, *_ = feed.page(cursor, 10)
+    assert status == 410
+
+
+@pytest.mark.parametrize("values", [
+    {"mode": "delta"},
+    {"mode": "delta", "seq": None, "id": None},
+    {"mode": "snapshot", "seq": None, "id": None},
+    {"mode": "delta", "seq": "3", "id": None},
+    [1, 2, 3],
+    "imleç",
+])
+def test_malformed_cursor_states_are_rejected(values):
+    with pytest.raises(ValueError):
+        change_cursor_state(values)
@@ -4,31 +4,53 @@ import requests
 # API URL'si
 API_URL = "http://127.0.0.1:8000"
 
+# Her istekte yüklenecek öğrenci sayısı
+PAGE_SIZE = 50
+
 # Başlık
 st.title("📚 Öğrenci Yönetim Sistemi")
 
 # Sayfa Seçimi
-page = st.sidebar.selectbox("Sayfa Seçin", ["Öğrencileri Listele", "Yeni Öğrenci Ekle"])
+page = st.sidebar.selectbox("Sayfa Seçin", ["Öğrencileri Listele", "Yeni Öğrenci Ekle", "Analitik"])
 
 # 📋 Öğrencileri Listele Sayfası
 if page == "Öğrencileri Listele":
     st.header("Öğrenciler Listesi")
     
+    # Öğrencileri sayfa sayfa getirir, yüklenenleri session_state'e ekler
+    def load_students_page(cursor=None):
+        params = {"limit": PAGE_SIZE}
+        if cursor:
+            params["cursor"] = cursor
+        response = requests.get(f"{API_URL}/students", params=params)
+        if response.status_code != 200:
+            st.error("🚨 Öğrenciler yüklenirken bir hata oluştu.")
+            return
+        page = response.json()
+        st.session_state["students"].extend(page["students"])
+        st.session_state["students_cursor"] = page["next_cursor"]
+
     if st.button("📋 Öğrencileri Listele"):
-        response = requests.get(f"{API_URL}/students")
-        if response.status_code == 200:
-            students = response.json()["students"]
-            if students:
-                for student in students:
-                    st.write(f"📌 {student['first_name']} {student['last_name']} - {student['age']} yaşında")
-                    st.write("📚 Dersler:")
-                    for course in student["courses"]:
-                        st.write(f"- {course['course_name']} : {course['grade']}")
-                    st.write("----")
-            else:
-                st.warning("📭 Sistemde kayıtlı öğrenci bulunmamaktadır.")
+        st.session_state["students"] = []
+        st.session_state["students_cursor"] = None
+        load_students_page()
+
+    if "students" in st.session_state:
+        students = st.session_state["students"]
+        if students:
+            for student in students:
+                st.write(f"📌 {student['first_name']} {student['last_name']} - {student['age']} yaşında")
+                st.write("📚 Dersler:")
+                for course in student["courses"]:
+                    st.write(f"- {course['course_name']} : {course['grade']}")
+                st.write("----")
+
+            # Sonraki sayfa yalnızca istendiğinde yüklenir
+            if st.session_state["students_cursor"] and st.button("⬇️ Daha Fazla Yükle"):
+                load_students_page(st.session_state["students_cursor"])
+                st.experimental_rerun()
         else:
-            st.error("🚨 Öğrenciler yüklenirken bir hata oluştu.")
+            st.warning("📭 Sistemde kayıtlı öğrenci bulunmamaktadır.")
 
 # 🆕 Yeni Öğrenci Ekle Sayfası
 elif page == "Yeni Öğrenci Ekle":
@@ -99,3 +121,25 @@ elif page == "Öğrenci Sil":
                 st.error("⚠️ Öğrenci silinemedi! Öğrencinin ID'si yanlış olabilir.")
         else:
             st.warning("⚠️ Lütfen bir ID girin!")
+
+# 📊 Analitik Sayfası (özetler sunucuda hazır tutulur, öğrenci listesi çekilmez)
+elif page == "Analitik":
+    st.header("Not Analitiği")
+
+    courses = requests.get(f"{API_URL}/analytics/courses").json()["courses"]
+    if courses:
+        st.subheader("📚 Ders Bazında Not Dağılımı")
+        for course in courses:
+            average = course["average_points"]
+            st.write(f"**{course['course_name']}** - {course['count']} not, ortalama: {average if average is not None else '-'}")
+            st.bar_chart(course["grades"])
+    else:
+        st.warning("📭 Henüz analiz edilecek not bulunmamaktadır.")
+
+    st.subheader("🎓 En Yüksek Ortalamaya Sahip Öğrenciler")
+    for student in requests.get(f"{API_URL}/analytics/students", params={"limit": 10}).json()["students"]:
+        st.write(f"📌 {student['first_name']} {student['last_name']} - GNO: {student['gpa']}")
+
+    st.subheader("📅 Yaş Grupları")
+    for cohort in requests.get(f"{API_URL}/analytics/cohorts").json()["cohorts"]:
+        st.write(f"{cohort['label']} yaş: {cohort['count']} öğrenci, ortalama GNO: {cohort['average_gpa']}")
@@ -0,0 +1,292 @@
+import threading
+import uuid
+from bisect import bisect_right
+from contextlib import contextmanager
+
+from pymongo import DeleteOne, UpdateOne
+
+# Harf notlarının 4'lük sistemdeki karşılıkları (hem A-F hem AA-FF kullanılabiliyor)
+GRADE_POINTS = {
+    "A": 4.0, "B": 3.0, "C": 2.0, "D": 1.0, "F": 0.0,
+    "AA": 4.0, "BA": 3.5, "BB": 3.0, "CB": 2.5, "CC": 2.0, "DC": 1.5, "DD": 1.0, "FD": 0.5, "FF": 0.0,
+}
+
+# Yaş gruplarının alt sınırları; son değer üst sınırdır ($bucket ile aynı anlam)
+AGE_COHORT_BOUNDARIES = [0, 18, 21, 24, 27, 30, 40, 150]
+OTHER_COHORT = "other"
+
+
+def grade_point(grade):
+    return GRADE_POINTS.get(str(grade).strip().upper())
+
+
+def grade_key(grade):
+    # Not, özet dokümanında alan adı olarak kullanılır; "." iç içe alan anlamına gelir
+    return str(grade).strip().upper().replace(".", "_")
+
+
+def student_gpa(student):
+    points = [p for p in (grade_point(c["grade"]) for c in student.get("courses", [])) if p is not None]
+    return round(sum(points) / len(points), 2) if points else None
+
+
+def cohort_bounds(age):
+    """Yaşın düştüğü grubun (alt, üst) sınırlarını döndürür; aralık dışındaysa None."""
+    index = bisect_right(AGE_COHORT_BOUNDARIES, age) - 1
+    if index < 0 or index >= len(AGE_COHORT_BOUNDARIES) - 1:
+        return None
+    return AGE_COHORT_BOUNDARIES[index], AGE_COHORT_BOUNDARIES[index + 1]
+
+
+def _cohort_fields(lower):
+    if lower == OTHER_COHORT:
+        return {"type": "cohort", "label": OTHER_COHORT, "min_age": None, "max_age": None}
+    upper = AGE_COHORT_BOUNDARIES[AGE_COHORT_BOUNDARIES.index(lower) + 1]
+    return {"type": "cohort", "label": f"{lower}-{upper - 1}", "min_age": lower, "max_age": upper - 1}
+
+
+def _student_summary(student):
+    return {
+        "type": "student",
+        "student_id": student["student_id"],
+        "first_name": student["first_name"],
+        "last_name": student["last_name"],
+        "age": student["age"],
+        "course_count": len(student.get("courses", [])),
+        "gpa": student_gpa(student),
+    }
+
+
+def summary_updates(student, sign):
+    """Bir öğrencinin eklenmesi (sign=1) veya silinmesi (sign=-1) için özet koleksiyonu işlemleri.
+
+    Sayaçlar $inc ile güncellenir; böylece özet, Students taranmadan güncel kalır.
+    """
+    operations = []
+    for course in student.get("courses", []):
+        name = course["course_name"]
+        inc = {"count": sign, f"grades.{grade_key(course['grade'])}": sign}
+        point = grade_point(course["grade"])
+        if point is not None:
+            inc.update({"points_sum": sign * point, "points_count": sign})
+        operations.append(UpdateOne(
+            {"_id": f"course:{name}"},
+            {"$inc": inc, "$set": {"type": "course", "course_name": name}},
+            upsert=True,
+        ))
+
+    gpa = student_gpa(student)
+    bounds = cohort_bounds(student["age"])
+    lower = bounds[0] if bounds else OTHER_COHORT
+    inc = {"count": sign}
+    if gpa is not None:
+        inc.update({"gpa_sum": sign * gpa, "gpa_count": sign})
+    operations.append(UpdateOne({"_id": f"cohort:{lower}"}, {"$inc": inc, "$set": _cohort_fields(lower)}, upsert=True))
+
+    student_key = f"student:{student['student_id']}"
+    if sign > 0:
+        operations.append(UpdateOne({"_id": student_key}, {"$set": _student_summary(student)}, upsert=True))
+    else:
+        operations.append(DeleteOne({"_id": student_key}))
+    return operations
+
+
+def apply_student(summary, student, sign):
+    summary.bulk_write(summary_updates(student, sign), ordered=False)
+
+
+def apply_changes(summary, changes):
+    """(eski, yeni) öğrenci çiftlerini tek bir toplu yazmayla özete yansıtır.
+
+    Eski kayıt (varsa) düşülür, yeni kayıt eklenir. Aynı öğrencinin özet dokümanı
+    önce silinip sonra yazıldığı için işlemler sıralı (ordered) uygulanır.
+    """
+    operations = []
+    for old, new in changes:
+        if old is not None:
+            operations += summary_updates(old, -1)
+        if new is not None:
+            operations += summary_updates(new, 1)
+    if operations:
+        summary.bulk_write(operations, ordered=True)
+
+
+def _grade_point_expr(grade_expr):
+    return {"$switch": {
+        "branches": [{"case": {"$eq": [grade_expr, grade]}, "then": point} for grade, point in GRADE_POINTS.items()],
+        "default": None,
+    }}
+
+
+SUMMARY_INDEXES = [[("type", 1), ("gpa", -1)]]
+
+
+def rebuild_summary(students, summary):
+    """Özet koleksiyonunu aggregation pipeline'larıyla baştan oluşturur.
+
+    Özet boşken, mükerrer kayıt temizliğinden sonra veya elle çağrılır;
+    ekleme/silme ve toplu içe aktarmalar delta'larla (apply_student/apply_changes) yansıtılır.
+    Yeni özet geçici bir koleksiyonda hazırlanıp rename ile tek adımda yerine
+    konur; okuyucular hiçbir zaman boş veya yarım özet görmez.
+    """
+    target = summary
+    summary = target.database[f"{target.name}_rebuild_{uuid.uuid4().hex[:8]}"]
+    try:
+        _build_summary(students, summary)
+        for keys in SUMMARY_INDEXES:
+            summary.create_index(keys)
+        summary.rename(target.name, dropTarget=True)
+    except BaseException:
+        summary.drop()
+        raise
+
+
+def _build_summary(students, summary):
+
+    # Öğrenci başına ortalama: hesaplama ve yazma tamamen sunucuda yapılır
+    grade = {"$toUpper": {"$trim": {"input": {"$toString": "$$c.grade"}}}}
+    students.aggregate([
+        {"$project": {
+            "_id": {"$concat": ["student:", "$student_id"]},
+            "type": {"$literal": "student"},
+            "student_id": 1, "first_name": 1, "last_name": 1, "age": 1,
+            "course_count": {"$size": {"$ifNull": ["$courses", []]}},
+            "gpa": {"$round": [{"$avg": {"$map": {
+                "input": {"$ifNull": ["$courses", []]}, "as": "c", "in": _grade_point_expr(grade),
+            }}}, 2]},
+        }},
+        {"$merge": {"into": summary.name, "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ])
+
+    # Ders başına not dağılımı: grup sayısı küçük olduğundan sonuç Python'da birleştirilir
+    courses = {}
+    grade_field = {"$toUpper": {"$trim": {"input": {"$toString": "$courses.grade"}}}}
+    for row in students.aggregate([
+        {"$unwind": "$courses"},
+        {"$group": {"_id": {"course": "$courses.course_name", "grade": grade_field}, "n": {"$sum": 1}}},
+    ]):
+        name, grade_value, n = row["_id"]["course"], row["_id"]["grade"], row["n"]
+        doc = courses.setdefault(name, {
+            "_id": f"course:{name}", "type": "course", "course_name": name,
+            "count": 0, "grades": {}, "points_sum": 0.0, "points_count": 0,
+        })
+        doc["count"] += n
+        key = grade_key(grade_value)
+        doc["grades"][key] = doc["grades"].get(key, 0) + n
+        point = grade_point(grade_value)
+        if point is not None:
+            doc["points_sum"] += point * n
+            doc["points_count"] += n
+
+    # Yaş grupları, yeni oluşturulan öğrenci özetlerinden hesaplanır
+    cohorts = []
+    for row in summary.aggregate([
+        {"$match": {"type": "student"}},
+        {"$bucket": {
+            "groupBy": "$age",
+            "boundaries": AGE_COHORT_BOUNDARIES,
+            "default": OTHER_COHORT,
+            "output": {
+                "count": {"$sum": 1},
+                "gpa_sum": {"$sum": "$gpa"},
+                "gpa_count": {"$sum": {"$cond": [{"$eq": [{"$type": "$gpa"}, "double"]}, 1, 0]}},
+            },
+        }},
+    ]):
+        lower = row.pop("_id")
+        cohorts.append({"_id": f"cohort:{lower}", **_cohort_fields(lower), **row})
+
+    if courses or cohorts:
+        summary.insert_many(list(courses.values()) + cohorts)
+
+
+class StudentSummary:
+    """Artımlı güncellemeler (apply) ile tam yeniden hesaplamayı (rebuild) koordine eder.
+
+    Students'a yazma ve delta'sı writing() bloğu içinde birlikte yapılır; bloklar
+    birbirini beklemez ama yeniden hesaplama hepsini dışlar. Böylece bir delta
+    ya hesaplamanın taramasından önce tamamen (özete yazılmış ve yeni özette de
+    görülmüş) ya da hesaplama bittikten sonra uygulanır; hiçbir yazma iki kez
+    sayılmaz veya kaybolmaz. Bekleyen bir hesaplama yeni yazmaların önüne geçer,
+    yani sürekli trafik hesaplamayı aç bırakmaz. Koordinasyon süreç içidir;
+    uygulama tek süreçte çalışır.
+    """
+
+    def __init__(self, students, summary):
+        self.students = students
+        self.summary = summary
+        self._cond = threading.Condition()
+        self._writers = 0
+        self._rebuilding = False
+        self._rebuild_waiting = 0
+
+    @contextmanager
+    def writing(self):
+        with self._cond:
+            while self._rebuilding or self._rebuild_waiting:
+                self._cond.wait()
+            self._writers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writers -= 1
+                self._cond.notify_all()
+
+    def apply(self, student, sign):
+        """writing() bloğu içinde, Students'a yazıldıktan sonra çağrılır."""
+        apply_student(self.summary, student, sign)
+
+    def apply_changes(self, changes):
+        """writing() bloğu içinde çağrılır; bkz. apply_changes."""
+        apply_changes(self.summary, changes)
+
+    def rebuild(self):
+        with self._cond:
+            self._rebuild_waiting += 1
+            while self._rebuilding or self._writers:
+                self._cond.wait()
+            self._rebuild_waiting -= 1
+            self._rebuilding = True
+        try:
+            rebuild_summary(self.students, self.summary)
+        finally:
+            with self._cond:
+                self._rebuilding = False
+                self._cond.notify_all()
+
+
+def _average(total, count):
+    return round(total / count, 2) if count else None
+
+
+def course_stats(summary):
+    rows = summary.find({"type": "course", "count": {"$gt": 0}}).sort("course_name", 1)
+    return [
+        {
+            "course_name": row["course_name"],
+            "count": row["count"],
+            "grades": {g: n for g, n in row.get("grades", {}).items() if n > 0},
+            "average_points": _average(row.get("points_sum", 0), row.get("points_count", 0)),
+        }
+        for row in rows
+    ]
+
+
+def cohort_stats(summary):
+    rows = summary.find({"type": "cohort", "count": {"$gt": 0}}).sort("min_age", 1)
+    return [
+        {
+            "label": row["label"],
+            "min_age": row["min_age"],
+            "max_age": row["max_age"],
+            "count": row["count"],
+            "average_gpa": _average(row.get("gpa_sum", 0), row.get("gpa_count", 0)),
+        }
+        for row in rows
+    ]
+
+
+def student_stats(summary, limit, descending=True):
+    rows = summary.find({"type": "student"}, {"_id": 0, "type": 0})
+    return list(rows.sort([("gpa", -1 if descending else 1), ("student_id", 1)]).limit(limit))
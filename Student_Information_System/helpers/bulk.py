@@ -0,0 +1,138 @@
+import codecs
+import json
+
+from pydantic import ValidationError
+from pymongo import DeleteOne, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from common.json_stream import JsonArrayElements
+
+# Tek bulk_write çağrısında gönderilecek en fazla işlem sayısı
+BATCH_SIZE = 1000
+# Yanıtta döndürülecek en fazla satır hatası
+MAX_REPORTED_ERRORS = 1000
+
+
+async def iter_raw_records(chunks, ndjson):
+    """Gelen byte parçalarından kayıt metinlerini (ham metin, girdi satırı) olarak sırayla üretir."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    elements = None if ndjson else JsonArrayElements()
+    pending = ""
+    line_no = 0
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if ndjson:
+            pending += text
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                line_no += 1
+                if line.strip():
+                    yield line, line_no
+        else:
+            for element in elements.feed(text):
+                yield element
+    text = decoder.decode(b"", final=True)
+    if ndjson:
+        pending += text
+        if pending.strip():
+            yield pending, line_no + 1
+    else:
+        for element in elements.feed(text) + elements.close():
+            yield element
+
+
+def parse_record(raw, model):
+    """Metni modele göre doğrular; (doküman, None) veya (None, hata mesajı) döner."""
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError as e:
+        return None, f"Geçersiz JSON: {e.msg}"
+    if not isinstance(data, dict):
+        return None, f"Kayıt bir JSON nesnesi olmalı ({type(data).__name__} geldi)"
+    try:
+        return model(**data).dict(), None
+    except (ValidationError, TypeError) as e:
+        return None, str(e)
+
+
+def upsert_batch(collection, batch):
+    """(kayıt konumu, doküman) listesini student_id anahtarıyla sırasız toplu upsert eder.
+
+    Kayıt konumu {"record": n, "line": l} sözlüğüdür; satır hataları bununla raporlanır.
+    Dönen "changes", başarılı her yazma için (eski kayıt veya None, yeni kayıt)
+    çiftleridir; özet tam yeniden hesaplama yerine bunlarla güncellenir.
+    """
+    ids = list({doc["student_id"] for _, doc in batch})
+    current = {doc["student_id"]: doc for doc in collection.find({"student_id": {"$in": ids}}, {"_id": 0})}
+    operations = [
+        UpdateOne({"student_id": doc["student_id"]}, {"$set": doc}, upsert=True)
+        for _, doc in batch
+    ]
+    errors = []
+    failed = set()
+    try:
+        result = collection.bulk_write(operations, ordered=False)
+        details = result.bulk_api_result
+    except BulkWriteError as e:
+        details = e.details
+        for write_error in details.get("writeErrors", []):
+            failed.add(write_error["index"])
+            errors.append({**batch[write_error["index"]][0], "error": write_error.get("errmsg", "")})
+
+    changes = []
+    for index, (_, doc) in enumerate(batch):
+        if index in failed:
+            continue
+        old = current.get(doc["student_id"])
+        new = {**(old or {}), **doc}
+        current[doc["student_id"]] = new
+        changes.append((old, new))
+    return {
+        "inserted": details.get("nUpserted", 0),
+        "updated": details.get("nModified", 0),
+        "errors": errors,
+        "changes": changes,
+    }
+
+
+def export_cursor(collection, ndjson, batch_size=BATCH_SIZE):
+    """Koleksiyonu imleçle dolaşıp NDJSON satırları veya JSON dizisi parçaları üretir."""
+    cursor = collection.find({}, {"_id": 0}).sort("student_id", 1).batch_size(batch_size)
+    if not ndjson:
+        yield "["
+    first = True
+    for student in cursor:
+        line = json.dumps(student, ensure_ascii=False)
+        if ndjson:
+            yield line + "\n"
+        else:
+            yield ("" if first else ",") + line
+        first = False
+    if not ndjson:
+        yield "]"
+
+
+def dedupe_students(collection, archive):
+    """Aynı student_id'ye sahip mükerrer kayıtları tekilleştirir (tekil index'ten önce bir kez).
+
+    Her student_id için en son yazılan kayıt (en büyük _id) kalır; diğerleri
+    silinmeden önce archive koleksiyonuna kopyalanır. Tekilleştirilen
+    student_id'lerin listesi döner. student_id'si olmayan (veya metin olmayan)
+    kayıtlar tek bir "None" grubunda birleşip arşivlenmesin diye gruplamaya alınmaz.
+    """
+    groups = collection.aggregate(
+        [
+            {"$match": {"student_id": {"$type": "string"}}},
+            {"$group": {"_id": "$student_id", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}},
+        ],
+        allowDiskUse=True,
+    )
+    deduped = []
+    for group in groups:
+        stale = sorted(group["ids"])[:-1]
+        docs = list(collection.find({"_id": {"$in": stale}}))
+        archive.bulk_write([InsertOne({**doc, "archived_from": doc.pop("_id")}) for doc in docs], ordered=False)
+        collection.bulk_write([DeleteOne({"_id": doc_id}) for doc_id in stale], ordered=False)
+        deduped.append(group["_id"])
+    return deduped
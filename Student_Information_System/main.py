@@ -1,14 +1,70 @@
-from fastapi import FastAPI, HTTPException
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError, OperationFailure
 from pydantic import BaseModel
 from typing import List
 
-app = FastAPI()
+from common.metrics import install_metrics, mongo_command_metrics
+from common.pagination import build_projection, keyset_query, next_cursor
+from Student_Information_System.helpers.analytics import (
+    SUMMARY_INDEXES,
+    StudentSummary,
+    cohort_stats,
+    course_stats,
+    student_stats,
+)
+from Student_Information_System.helpers.bulk import (
+    BATCH_SIZE,
+    MAX_REPORTED_ERRORS,
+    dedupe_students,
+    export_cursor,
+    iter_raw_records,
+    parse_record,
+    upsert_batch,
+)
 
 # MongoDB Bağlantısı
-client = MongoClient("mongodb://localhost:27017/")
+client = MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017/"), event_listeners=[mongo_command_metrics])
 db = client["School"]
 students_collection = db["Students"]
+# Analitik özetleri; ekleme/silmede artımlı güncellenir, okumalar Students'ı taramaz
+stats_collection = db["StudentStats"]
+student_summary = StudentSummary(students_collection, stats_collection)
+# Tekil index öncesi tekilleştirmede ayıklanan mükerrer kayıtlar (silinmez, buraya taşınır)
+duplicates_collection = db["StudentDuplicates"]
+
+# Listeleme ve sıralama için gereken index'ler uygulama açılırken oluşturulur
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Tekrarlanan istekler mükerrer kayıt oluşturmasın diye student_id tekil tutulur.
+    # Index yokken oluşmuş mükerrer kayıtlar önce tekilleştirilir; yine de oluşturulamazsa
+    # (ör. eşzamanlı yazma) uygulama açılır ve çakışan id'ler loglanır.
+    deduped = []
+    if "student_id_1" not in students_collection.index_information():
+        deduped = dedupe_students(students_collection, duplicates_collection)
+        if deduped:
+            print(f"{len(deduped)} student_id için mükerrer kayıtlar StudentDuplicates'e taşındı:", deduped[:20])
+    try:
+        students_collection.create_index("student_id", unique=True)
+    except (DuplicateKeyError, OperationFailure) as e:
+        print("student_id tekil index'i oluşturulamadı; mükerrer kayıtlar var:", e)
+    students_collection.create_index([("last_name", 1), ("_id", 1)])
+    for keys in SUMMARY_INDEXES:
+        stats_collection.create_index(keys)
+    # Özet hiç oluşturulmamışsa (veya mükerrer kayıtlar ayıklandıysa) mevcut kayıtlardan hesaplanır
+    if deduped or (stats_collection.estimated_document_count() == 0 and students_collection.estimated_document_count() > 0):
+        student_summary.rebuild()
+    yield
+
+app = FastAPI(lifespan=lifespan)
+install_metrics(app)
+
+# GET /students'ta projection ile istenebilecek alanlar
+STUDENT_FIELDS = {"student_id", "first_name", "last_name", "age", "courses"}
 
 # Veri Modeli (Pydantic Kullanımı)
 class Course(BaseModel):
@@ -23,19 +79,108 @@ class Student(BaseModel):
     courses: List[Course]
 
 @app.get("/students")
-def get_students():
-    students = list(students_collection.find({}, {"_id": 0}))  # MongoDB'den gelen verileri liste olarak al
-    return {"students": students}  # Liste olarak döndür
+def get_students(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str = None,
+    fields: str = None,  # Örn. "student_id,first_name,last_name"
+    sort: str = Query("_id", pattern="^(_id|student_id|last_name)$"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+):
+    projection = build_projection(fields, allowed=STUDENT_FIELDS, required=[sort])
+    query, sort_spec = keyset_query({}, sort, order, cursor)
+    students = list(students_collection.find(query, projection).sort(sort_spec).limit(limit))
+    cursor_out = next_cursor(students, sort, limit)  # İmleç _id silinmeden önce üretilmeli
+    for student in students:
+        student.pop("_id", None)
+    return {"students": students, "next_cursor": cursor_out}
 
 @app.post("/add_student")
 def add_student(student: Student):
     student_dict = student.dict()  # Pydantic nesnesini dict() ile MongoDB'ye ekle
-    students_collection.insert_one(student_dict)
+    with student_summary.writing():
+        try:
+            students_collection.insert_one(student_dict)
+        except DuplicateKeyError:
+            raise HTTPException(status_code=409, detail=f"'{student.student_id}' ID'li öğrenci zaten kayıtlı!")
+        student_summary.apply(student_dict, 1)
     return {"message": f"Öğrenci '{student.first_name} {student.last_name}' başarıyla eklendi!"}
 
 @app.delete("/delete_student/{student_id}")
 def delete_student(student_id: str):
-    result = students_collection.delete_one({"student_id": student_id})
-    if result.deleted_count == 1:
+    # Silinen dokümanın notları özetten düşülebilsin diye silme işlemi dokümanı döndürür
+    with student_summary.writing():
+        student = students_collection.find_one_and_delete({"student_id": student_id})
+        if student:
+            student_summary.apply(student, -1)
+    if student:
         return {"message": f"Öğrenci '{student_id}' başarıyla silindi!"}
     raise HTTPException(status_code=404, detail="Öğrenci bulunamadı!")
+
+
+@app.post("/students/import")
+async def import_students(request: Request):
+    """NDJSON veya JSON dizisi gövdesini akış halinde okuyup toplu upsert eder.
+
+    Her kayıt Student modeliyle doğrulanır; hatalı kayıtlar atlanıp sıra numarası
+    (record) ve girdideki satırıyla (line) raporlanır, geçerli olanlar BATCH_SIZE'lık
+    gruplar halinde yazılır.
+    """
+    ndjson = "ndjson" in request.headers.get("content-type", "")
+    summary = {"total": 0, "inserted": 0, "updated": 0, "failed": 0, "errors": []}
+
+    def report(errors):
+        summary["failed"] += len(errors)
+        room = MAX_REPORTED_ERRORS - len(summary["errors"])
+        summary["errors"].extend(errors[:max(room, 0)])
+
+    def write(batch):
+        # Yazma ve özet delta'sı birlikte yapılır; tam yeniden hesaplama gerekmez
+        with student_summary.writing():
+            result = upsert_batch(students_collection, batch)
+            student_summary.apply_changes(result.pop("changes"))
+        return result
+
+    async def flush(batch):
+        result = await run_in_threadpool(write, batch)
+        summary["inserted"] += result["inserted"]
+        summary["updated"] += result["updated"]
+        report(result["errors"])
+
+    batch = []
+    async for raw, line in iter_raw_records(request.stream(), ndjson):
+        summary["total"] += 1
+        position = {"record": summary["total"], "line": line}
+        doc, error = parse_record(raw, Student)
+        if error:
+            report([{**position, "error": error}])
+            continue
+        batch.append((position, doc))
+        if len(batch) >= BATCH_SIZE:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+    return summary
+
+@app.get("/students/export")
+def export_students(format: str = Query("ndjson", pattern="^(ndjson|json)$")):
+    ndjson = format == "ndjson"
+    media_type = "application/x-ndjson" if ndjson else "application/json"
+    return StreamingResponse(export_cursor(students_collection, ndjson), media_type=media_type)
+
+@app.get("/analytics/courses")
+def get_course_analytics():
+    return {"courses": course_stats(stats_collection)}
+
+@app.get("/analytics/students")
+def get_student_analytics(limit: int = Query(50, ge=1, le=500), order: str = Query("desc", pattern="^(asc|desc)$")):
+    return {"students": student_stats(stats_collection, limit, descending=order == "desc")}
+
+@app.get("/analytics/cohorts")
+def get_cohort_analytics():
+    return {"cohorts": cohort_stats(stats_collection)}
+
+@app.post("/analytics/rebuild")
+def rebuild_analytics():
+    student_summary.rebuild()
+    return {"message": "Analitik özetleri yeniden hesaplandı."}
@@ -1,27 +1,74 @@
 import datetime
 import json
-import requests
-from fastapi import FastAPI, HTTPException
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
 from pymongo import MongoClient
 import uvicorn
 
-# Ollama'nın çalıştığı URL (varsayılan olarak localhost:11434)
-OLLAMA_URL = "http://localhost:11434"
+# Repo kökündeki ortak modüller (common/) için import yolu
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from common.documents import DocumentExtractor, receive_upload
+from common.metrics import install_metrics, mongo_command_metrics
+from common.mongo import AsyncMongo
+from common.ollama import OllamaError, ollama_client, select_model
+from common.scheduler import install_scheduler, set_priority
 
 # MongoDB bağlantısı (URI, veritabanı ve collection adlarını ihtiyacınıza göre güncelleyin)
-client = MongoClient("mongodb://localhost:27017/")
+client = MongoClient("mongodb://localhost:27017/", event_listeners=[mongo_command_metrics])
 db = client["test_planning_db"]
 collection = db["test_plans"]
 
-app = FastAPI()
+# Yüklenen dokümanlardan çıkarılan metinler içerik hash'iyle Mongo'da saklanır; böylece
+# istemcinin tuttuğu document_id yeniden başlatmadan ve bellek içi LRU'dan taşmadan etkilenmez.
+# Cache event loop'tan okunduğu için thread havuzlu AsyncMongo üzerinden erişilir.
+document_mongo = AsyncMongo("test_planning_db", uri="mongodb://localhost:27017/")
+document_extractor = DocumentExtractor(cache=document_mongo.collection("document_extractions"))
+
+# Ollama istemcisinin bağlantı havuzu uygulama ömrü boyunca açık kalır
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await document_mongo.connect()
+    await ollama_client.start()
+    await document_extractor.start()
+    yield
+    await document_extractor.close()
+    await ollama_client.close()
+    await document_mongo.close()
+
+app = FastAPI(lifespan=lifespan)
+install_metrics(app)
+install_scheduler(app, ollama_client.scheduler, ollama_client.router)
 
 # İstek veri modeli
 class TestPlanRequest(BaseModel):
-    content: str  # Kullanıcının yüklediği dosya içeriği
+    content: Optional[str] = None  # Kullanıcının yüklediği dosya içeriği
+    document_id: Optional[str] = None  # Ya da /documents'a yüklenmiş dokümanın kimliği
+
+# TXT/PDF/DOCX dosyasını boyut sınırıyla akış halinde alır ve metnini süreç havuzunda çıkarır
+@app.post("/documents")
+async def upload_document(request: Request):
+    upload = await receive_upload(request)
+    try:
+        return await document_extractor.ingest(upload)
+    finally:
+        await upload.close()
 
 @app.post("/generate_test_plan")
 async def generate_test_plan(request: TestPlanRequest):
+    set_priority("batch")
+    if request.document_id:
+        content = await document_extractor.get_text(request.document_id)
+        if content is None:
+            raise HTTPException(status_code=404, detail="Doküman bulunamadı; dosyayı yeniden yükleyin")
+    elif request.content:
+        content = request.content
+    else:
+        raise HTTPException(status_code=400, detail="content veya document_id gerekli")
     # Güncel tarihi alıyoruz
     today = datetime.date.today().strftime("%Y-%m-%d")
     
@@ -81,28 +128,18 @@ Below is an example JSON structure to follow:
     """
     
     # Tam prompt, dosya içeriği ile birleştiriliyor.
-    full_prompt = prompt_template + "\n\nDocument Content:\n" + request.content
+    full_prompt = prompt_template + "\n\nDocument Content:\n" + content
 
     # Ollama üzerinden llama3:8b modelini çağırıyoruz.
     try:
-        response = requests.post(
-            f"{OLLAMA_URL}/api/generate",
-            json={
-                "model": "llama3:8b",
-                "prompt": full_prompt,
-                "stream": False
-            }
-        )
-        if response.status_code == 200:
-            generated_output = response.json().get("response", "").strip()
-        else:
-            raise HTTPException(status_code=500, detail=f"Ollama API hatası: {response.status_code} - {response.text}")
-    except requests.exceptions.RequestException as e:
-        raise HTTPException(status_code=500, detail=f"Ollama'ya bağlanılamadı: {e}")
+        result = await ollama_client.generate(full_prompt, model=select_model("test_plan"))
+    except OllamaError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    generated_output = result.get("response", "").strip()
 
     # Üretilen veriyi MongoDB'ye kaydediyoruz.
     record = {
-        "input_content": request.content,
+        "input_content": content,
         "generated_output": generated_output,
         "timestamp": datetime.datetime.now(datetime.UTC)
     }
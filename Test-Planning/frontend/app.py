@@ -1,30 +1,45 @@
 import streamlit as st
 import requests
+import uuid
+
+API_URL = "http://localhost:8000"
+
+# Ollama kuyruğu istemci başına adil sıralama yapar; her tarayıcı oturumu kendi kimliğini gönderir
+CLIENT_HEADERS = {"X-Client-Id": st.session_state.setdefault("client_id", uuid.uuid4().hex)}
+
+# Dosya ham haliyle multipart olarak yüklenir; TXT/PDF/DOCX metni sunucuda çıkarılır
+def upload_document(uploaded_file):
+    uploads = st.session_state.setdefault("documents", {})
+    if uploaded_file.file_id not in uploads:
+        files = {"file": (uploaded_file.name, uploaded_file, uploaded_file.type or "application/octet-stream")}
+        response = requests.post(f"{API_URL}/documents", files=files, headers=CLIENT_HEADERS)
+        response.raise_for_status()
+        uploads[uploaded_file.file_id] = response.json()
+    return uploads[uploaded_file.file_id]
 
 st.title("Test Planning Document Generator")
 
-# Dosya yükleme bileşeni: TXT, PDF veya DOCX dosya türlerini destekleyebilirsiniz.
+# Dosya yükleme bileşeni: TXT, PDF ve DOCX dosyaları desteklenir.
 uploaded_file = st.file_uploader("Test planning için gerekli dosyayı yükleyin", type=["txt", "pdf", "docx"])
 
 if uploaded_file is not None:
+    document = None
     try:
-        # Örneğin, TXT dosyası için içerik okuma:
-        content = uploaded_file.read().decode("utf-8")
+        document = upload_document(uploaded_file)
+    except requests.exceptions.HTTPError as e:
+        st.error("Dosya okunurken hata oluştu: " + e.response.text)
     except Exception as e:
-        st.error("Dosya okunurken hata oluştu: " + str(e))
-        content = ""
-    
-    st.subheader("Yüklenen Dosya İçeriği")
-    st.text_area("Dosya İçeriği", content, height=300)
-
-    if st.button("Test Planı Oluştur"):
-        if content.strip() == "":
-            st.error("Lütfen geçerli bir dosya yükleyin.")
-        else:
-            payload = {"content": content}
+        st.error("Sunucuya bağlanırken hata oluştu: " + str(e))
+
+    if document is not None:
+        st.subheader("Yüklenen Dosya İçeriği")
+        st.text_area("Dosya İçeriği", document["preview"], height=300)
+
+        if st.button("Test Planı Oluştur"):
+            payload = {"document_id": document["document_id"]}
             try:
                 # FastAPI sunucusunun çalıştığı adresi kontrol edin.
-                response = requests.post("http://localhost:8000/generate_test_plan", json=payload)
+                response = requests.post(f"{API_URL}/generate_test_plan", json=payload, headers=CLIENT_HEADERS)
                 if response.status_code == 200:
                     result = response.json()
                     st.subheader("Oluşturulan Test Planı (JSON Formatında)")
@@ -1,147 +1,371 @@
+import asyncio
 import datetime
 import json
-import requests
-from fastapi import FastAPI, HTTPException
+import sys
+import time
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
-from pymongo import MongoClient
+from starlette.background import BackgroundTask
 import uvicorn
-import pandas as pd
-from fastapi.responses import FileResponse
 import os
 
-# Ollama'nın çalıştığı URL (varsayılan olarak localhost:11434)
-OLLAMA_URL = "http://localhost:11434"
+# Proje kökü (helpers/) ve repo kökü (common/) için import yolu
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(BASE_DIR), str(BASE_DIR.parent.parent)]
+
+from common.documents import DocumentExtractor, receive_upload
+from common.metrics import install_metrics
+from common.mongo import AsyncMongo
+from common.pagination import keyset_query, next_cursor
+from common.ollama import OllamaError, ollama_client, ollama_stats, select_model
+from common.scheduler import QueueFullError, install_scheduler, set_priority
+from helpers.blobs import get_text, put_blob
+from helpers.artifacts import iter_artifact, open_artifact, save_plan_artifacts
+from helpers.exports import EXPORT_MEDIA_TYPES, PLAN_COLUMNS, export_to_tempfile, iter_csv, iter_plan_rows, plan_tasks
+from helpers.jobs import TERMINAL_STATES, JobError, JobQueue, dedupe_key, serialize_job
+from helpers.prompts import ISTQB_TEST_PLAN
+from helpers.task_stream import TaskStreamParser
 
 # MongoDB bağlantısı (URI, veritabanı ve collection adlarını ihtiyacınıza göre güncelleyin)
-client = MongoClient("mongodb://localhost:27017/")
-db = client["test_planning_db"]
-collection = db["test_plans"]
+mongo = AsyncMongo.from_env("test_planning_db")
+collection = mongo.collection("test_plans")
+jobs_collection = mongo.collection("test_plan_jobs")
+
+# Yüklenen dokümanlardan çıkarılan metinler içerik hash'iyle saklanır
+document_extractor = DocumentExtractor(cache=mongo.collection("document_extractions"))
+
+# İndirme linklerinde kullanılan dış adres
+PUBLIC_URL = os.getenv("PUBLIC_URL", "http://localhost:8000")
+
+# Test planları büyük modelle üretilir (OLLAMA_MODEL_TEST_PLAN ile değiştirilebilir)
+TEST_PLAN_MODEL = select_model("test_plan")
+
+# Aynı anda çalışabilecek test planı üretimi sayısı
+TEST_PLAN_WORKERS = int(os.getenv("TEST_PLAN_WORKERS", "2"))
+
+# Ollama kuyruğu dolu kaldığında bir işin en fazla bekleyeceği süre (saniye); sonra iş başarısız sayılır
+QUEUE_FULL_TIMEOUT = float(os.getenv("TEST_PLAN_QUEUE_FULL_TIMEOUT", "300"))
 
-app = FastAPI()
+# MongoDB, Ollama ve iş kuyruğu uygulama ömrü boyunca açık kalır
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await mongo.connect()
+    await ollama_client.start()
+    await document_extractor.start()
+    # Model ve ISTQB system prompt'u arka planda ısıtılır; Ollama kapalıysa açılış engellenmez
+    warm_up_task = asyncio.create_task(warm_up_model())
+    await job_queue.start()
+    # Geçmiş sorguları zaman aralığına göre yapılır; aynı girdinin planları hash ile bulunur
+    await collection.create_index([("timestamp", -1), ("_id", -1)])
+    await collection.create_index([("input_sha256", 1), ("timestamp", -1)])
+    await collection.create_index("plan_id", unique=True, sparse=True)
+    yield
+    warm_up_task.cancel()
+    await job_queue.stop()
+    await document_extractor.close()
+    await ollama_client.close()
+    await mongo.close()
+
+app = FastAPI(lifespan=lifespan)
+install_metrics(app)
+install_scheduler(app, ollama_client.scheduler, ollama_client.router)
+
+async def warm_up_model():
+    set_priority("background")
+    try:
+        stats = await ollama_client.warm_up(model=TEST_PLAN_MODEL, system=ISTQB_TEST_PLAN.system)
+        print("Model ısıtıldı:", stats)
+    except OllamaError as e:
+        print("Model ısıtılamadı:", e)
 
 # İstek veri modeli
 class TestPlanRequest(BaseModel):
-    content: str  # Kullanıcının yüklediği dosya içeriği
+    content: Optional[str] = None  # Kullanıcının yüklediği dosya içeriği
+    document_id: Optional[str] = None  # Ya da /documents'a yüklenmiş dokümanın kimliği
 
-@app.post("/generate_test_plan")
-async def generate_test_plan(request: TestPlanRequest):
+# İstekteki içeriği döndürür; doküman kimliği verildiyse metin cache'ten okunur
+async def resolve_content(request: TestPlanRequest) -> str:
+    if request.document_id:
+        text = await document_extractor.get_text(request.document_id)
+        if text is None:
+            raise HTTPException(status_code=404, detail="Doküman bulunamadı; dosyayı yeniden yükleyin")
+        return text
+    if not request.content:
+        raise HTTPException(status_code=400, detail="content veya document_id gerekli")
+    return request.content
+
+# Test planını üretir, kaydeder ve XLSX'e dönüştürür; hem senkron endpoint hem de iş kuyruğu kullanır
+async def run_test_plan(content: str, publish=None) -> dict:
     # Güncel tarihi alıyoruz
     today = datetime.date.today().strftime("%Y-%m-%d")
-    
-    # Test planı oluşturma prompt'unu hazırlıyoruz
-    prompt_template = f"""
-Analyze the following document as an ISTQB expert and use the information provided to generate a comprehensive test planning schedule that adheres strictly to ISTQB standards. Your objective is to produce a detailed test planning document, optimized for creating a Gantt chart. Your analysis should cover all aspects of test planning, including test strategy, resource estimation, scheduling, risk management, and environment/tool requirements. You must focus solely on constructing the test planning schedule, without incorporating the content of the input document verbatim.
-
-When generating dates in your output, use the current date "{today}" as the starting point for scheduling. All planned dates should be calculated relative to today's date.
-
-Your output must be a valid JSON array where each object represents a task in the test planning process. Each object must contain exactly the following keys:
-- "Task Name": A concise title for the task.
-- "Description": A detailed explanation of the task, including all necessary ISTQB-standard test planning elements.
-- "Start Date": The planned start date for the task in the format YYYY-MM-DD.
-- "End Date": The planned end date for the task in the format YYYY-MM-DD.
-- "Duration (days)": The total number of days allocated for the task.
-
-Below is an example JSON structure to follow:
-
-[
-    {{
-        "Task Name": "Test Strategy Definition",
-        "Description": "Define the overall testing strategy, including objectives, scope (in-scope and out-of-scope items), success criteria, and exit conditions, based on ISTQB standards.",
-        "Start Date": "{today}",
-        "End Date": "2025-03-05",
-        "Duration (days)": 5
-    }},
-    {{
-        "Task Name": "Resource Estimation and Scheduling",
-        "Description": "Estimate the required testing resources and develop a realistic schedule that aligns with project deadlines following ISTQB best practices.",
-        "Start Date": "2025-03-06",
-        "End Date": "2025-03-10",
-        "Duration (days)": 5
-    }},
-    {{
-        "Task Name": "Risk Assessment and Mitigation Planning",
-        "Description": "Identify potential risks related to security, performance, and usability. Develop mitigation strategies and contingency plans in line with ISTQB standards.",
-        "Start Date": "2025-03-11",
-        "End Date": "2025-03-15",
-        "Duration (days)": 5
-    }},
-    {{
-        "Task Name": "Test Environment and Tool Setup",
-        "Description": "Define and set up the test environment, including hardware, software, network configurations, and necessary test tools, ensuring full compliance with ISTQB guidelines.",
-        "Start Date": "2025-03-16",
-        "End Date": "2025-03-20",
-        "Duration (days)": 5
-    }}
-]
-
-*Additional Instructions:*
-- Ensure that the output JSON array is directly convertible into an XLSX spreadsheet, where each key represents a column header.
-- Do not include any extra keys or unstructured text outside of the JSON array.
-- Your analysis must reflect the expertise of an ISTQB expert and provide a comprehensive test planning schedule that aligns with ISTQB standards.
-- Instead of processing a test planning document, use the content provided (which may be from other types of documents) to generate a test planning schedule.
-- The output should be detailed and cover all essential aspects of the test planning process without including any feedback or recommendations.
-- Use the current date "{today}" as a reference point for all scheduled dates in the generated output.
-    """
-    
-    # Tam prompt, dosya içeriği ile birleştiriliyor.
-    full_prompt = prompt_template + "\n\nDocument Content:\n" + request.content
-
-    # Ollama üzerinden llama3:8b modelini çağırıyoruz.
+    prompt = ISTQB_TEST_PLAN.render(today=today, content=content)
+
+    # Ollama üzerinden llama3:8b modelini akış modunda çağırıyoruz;
+    # her görev nesnesi tamamlandığı anda doğrulanıp yayınlanır.
+    parser = TaskStreamParser()
+    stats = {}
+    json_data = []
+    parts = []
     try:
-        response = requests.post(
-            f"{OLLAMA_URL}/api/generate",
-            json={
-                "model": "llama3:8b",
-                "prompt": full_prompt,
-                "stream": False
-            }
-        )
-        if response.status_code == 200:
-            generated_output = response.json().get("response", "").strip()
-        else:
-            raise HTTPException(status_code=500, detail=f"Ollama API hatası: {response.status_code} - {response.text}")
-    except requests.exceptions.RequestException as e:
-        raise HTTPException(status_code=500, detail=f"Ollama'ya bağlanılamadı: {e}")
-
-    # Üretilen veriyi MongoDB'ye kaydediyoruz.
+        async for chunk in ollama_client.generate_stream(prompt["prompt"], model=TEST_PLAN_MODEL, system=prompt["system"]):
+            if chunk.get("done"):
+                stats = ollama_stats(chunk)
+            token = chunk.get("response", "")
+            parts.append(token)
+            for task in parser.feed(token):
+                json_data.append(task)
+                if publish:
+                    publish({"event": "task", "task": task})
+    except OllamaError as e:
+        raise JobError(str(e))
+    generated_output = "".join(parts).strip()
+
+    # Girdi ve ham çıktı içerik adresli blob olarak bir kez saklanır; plan kaydı yalnızca
+    # hash'lerini ve ayrıştırılmış görevleri tutar. plan_id indirme dosyalarını kayda bağlar.
+    plan_id = uuid.uuid4().hex
+    input_sha256 = await asyncio.to_thread(put_blob, content, "input")
+    output_sha256 = await asyncio.to_thread(put_blob, generated_output, "output")
     record = {
-        "input_content": request.content,
-        "generated_output": generated_output,
+        "plan_id": plan_id,
+        "input_sha256": input_sha256,
+        "input_chars": len(content),
+        "output_sha256": output_sha256,
+        "tasks": json_data,
+        "task_count": len(json_data),
+        "skipped_tasks": parser.skipped,
+        "start_date": min((task["Start Date"] for task in json_data), default=None),
+        "end_date": max((task["End Date"] for task in json_data), default=None),
+        "prompt_template": f"{ISTQB_TEST_PLAN.name}:{ISTQB_TEST_PLAN.version}",
+        "ollama_stats": stats,
         "timestamp": datetime.datetime.now(datetime.timezone.utc)
     }
-    collection.insert_one(record)
+    await collection.insert_one(record)
 
-    # API yanıtını logluyoruz
+    # API yanıtını ve prefill/yükleme maliyetini logluyoruz
     print("Ollama API yanıtı:", generated_output)
+    print("Ollama istatistikleri:", stats)
 
-    # JSON dizisini çıkartmak için yanıtı işliyoruz
-    try:
-        json_start = generated_output.index('[')
-        json_end = generated_output.rindex(']') + 1
-        json_content = generated_output[json_start:json_end]
-        json_data = json.loads(json_content)
-    except (json.JSONDecodeError, ValueError) as e:
-        raise HTTPException(status_code=500, detail=f"Geçersiz JSON formatı: Ollama API'den dönen yanıt geçerli bir JSON içermiyor. Yanıt: {generated_output}")
-
-    # JSON verisini XLSX dosyasına dönüştürüyoruz
-    output_dir = "./tmp"
-    os.makedirs(output_dir, exist_ok=True)
-    xlsx_file = os.path.join(output_dir, "test_plan.xlsx")
-    df = pd.DataFrame(json_data)
-    df.to_excel(xlsx_file, index=False)
-
-    # JSON veri ve indirme linkini içeren yanıtı döndürüyoruz
+    # Bozuk görevler atlandı; hiç geçerli görev çıkmadıysa üretim kullanılamaz
+    if parser.skipped:
+        print(f"{parser.skipped} görev şemaya uymadığı için atlandı")
+    if not json_data:
+        raise JobError(f"Geçersiz JSON formatı: Ollama API'den dönen yanıt geçerli bir JSON içermiyor. Yanıt: {generated_output}")
+
+    # Görevleri XLSX/CSV/Parquet'e akış halinde yazıp her istek için ayrı olarak GridFS'e kaydediyoruz
+    artifacts = await asyncio.to_thread(save_plan_artifacts, json_data, plan_id)
+
+    # JSON veri ve indirme linklerini içeren yanıtı döndürüyoruz
     return {
         "json_data": json_data,
-        "download_url": "http://localhost:8000/download/test_plan.xlsx"
+        "plan_id": artifacts["plan_id"],
+        "download_url": f"{PUBLIC_URL}/download/{artifacts['xlsx']}",
+        "csv_download_url": f"{PUBLIC_URL}/download/{artifacts['csv']}",
+        "parquet_download_url": f"{PUBLIC_URL}/download/{artifacts['parquet']}",
+        "stats": stats,
     }
 
-@app.get("/download/{filename}")
-async def download_file(filename: str):
-    file_path = os.path.join("./tmp", filename)
-    if not os.path.exists(file_path):
+async def test_plan_job_handler(job_id, payload, publish):
+    set_priority("batch")
+    content = payload.get("content")
+    if content is None:
+        content = await asyncio.to_thread(get_text, payload["content_sha256"])
+        if content is None:
+            raise JobError("İş girdisi bulunamadı")
+    # Ollama kuyruğu doluysa beklenip tekrar denenir; ama worker'ı sonsuza kadar tutmamak için
+    # QUEUE_FULL_TIMEOUT dolunca iş başarısız olur (aynı içerik yeniden gönderilebilir)
+    deadline = time.monotonic() + QUEUE_FULL_TIMEOUT
+    while True:
+        try:
+            result = await run_test_plan(content, publish)
+            break
+        except QueueFullError as e:
+            if time.monotonic() + e.retry_after > deadline:
+                raise JobError("Ollama kuyruğu uzun süredir dolu; lütfen daha sonra tekrar deneyin")
+            await asyncio.sleep(e.retry_after)
+    # Görevler plan kaydında zaten var; iş sonucu yalnızca plan_id ve linkleri tutar
+    result.pop("json_data", None)
+    return result
+
+# Test planı üretim işleri Mongo'da tutulur, sınırlı sayıda worker ile çalışır
+job_queue = JobQueue(jobs_collection, test_plan_job_handler, workers=TEST_PLAN_WORKERS)
+
+def test_plan_dedupe_key(content: str) -> str:
+    # Planlar bugünün tarihine göre üretildiği için aynı gün aynı içerik tek işe bağlanır
+    return dedupe_key(datetime.date.today().isoformat(), content)
+
+# İş sonucu plan kaydına referans verir; istemcinin beklediği json_data kayıttan doldurulur
+async def job_response(job):
+    job = serialize_job(job)
+    result = job.get("result")
+    if result and "json_data" not in result and result.get("plan_id"):
+        record = await collection.find_one({"plan_id": result["plan_id"]}, {"tasks": 1, "generated_output": 1})
+        result["json_data"] = plan_tasks(record) if record else []
+    return job
+
+# TXT/PDF/DOCX dosyasını multipart olarak alır, metnini süreç havuzunda çıkarır.
+# Gövde boyut sınırıyla akış halinde okunur; aynı dosya ikinci kez ayrıştırılmaz.
+@app.post("/documents")
+async def upload_document(request: Request):
+    upload = await receive_upload(request)
+    try:
+        return await document_extractor.ingest(upload)
+    finally:
+        await upload.close()
+
+@app.post("/generate_test_plan")
+async def generate_test_plan(request: TestPlanRequest):
+    set_priority("batch")
+    content = await resolve_content(request)
+    try:
+        return await run_test_plan(content)
+    except JobError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# --- Asenkron iş API'si: gönder / sorgula / akış ---
+
+# Test planı işini kuyruğa ekler; aynı içerik için var olan iş döndürülür
+@app.post("/test_plan_jobs", status_code=202)
+async def submit_test_plan_job(request: TestPlanRequest):
+    content = await resolve_content(request)
+    # İş dokümanı içeriği değil, blob deposundaki hash'ini taşır
+    content_sha256 = await asyncio.to_thread(put_blob, content, "input")
+    job = await job_queue.submit({"content_sha256": content_sha256}, test_plan_dedupe_key(content))
+    return await job_response(job)
+
+# İşin güncel durumu ve (bittiyse) sonucu
+@app.get("/test_plan_jobs/{job_id}")
+async def get_test_plan_job(job_id: str):
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="İş bulunamadı")
+    return await job_response(job)
+
+# İş olaylarını NDJSON olarak akıtır; istemci koparsa yeniden bağlanabilir
+@app.get("/test_plan_jobs/{job_id}/stream")
+async def stream_test_plan_job(job_id: str):
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="İş bulunamadı")
+
+    async def events():
+        queue = job_queue.subscribe(job["_id"])
+        try:
+            current = job
+            yield json.dumps({"event": "status", "status": current["status"]}, ensure_ascii=False) + "\n"
+            while current["status"] not in TERMINAL_STATES:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=2)
+                    if event.get("event") != "status":
+                        yield json.dumps(event, ensure_ascii=False, default=str) + "\n"
+                        continue
+                except asyncio.TimeoutError:
+                    pass
+                # Durum her zaman Mongo'dan okunur; iş başka bir replikada çalışıyor olabilir
+                current = await job_queue.get(job_id)
+                if current is None:
+                    # İş bu arada silindi; akış bir hata olayıyla sonlanır
+                    yield json.dumps({"event": "error", "error": "İş bulunamadı"}, ensure_ascii=False) + "\n"
+                    return
+                yield json.dumps({"event": "status", "status": current["status"]}, ensure_ascii=False) + "\n"
+            yield json.dumps({"event": "result", **(await job_response(current))}, ensure_ascii=False, default=str) + "\n"
+        finally:
+            job_queue.unsubscribe(job["_id"], queue)
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+# Tarihler UTC gün olarak yorumlanır; bitiş günü dahildir
+def plan_time_range(start: Optional[datetime.date], end: Optional[datetime.date]) -> dict:
+    if start and end and end < start:
+        raise HTTPException(status_code=400, detail="Bitiş tarihi başlangıçtan önce olamaz")
+    timestamp = {}
+    if start:
+        timestamp["$gte"] = datetime.datetime.combine(start, datetime.time(), datetime.timezone.utc)
+    if end:
+        timestamp["$lt"] = datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time(), datetime.timezone.utc)
+    return {"timestamp": timestamp} if timestamp else {}
+
+# Plan geçmişi, en yeniden eskiye keyset sayfalama ile; büyük içerikler listeye girmez
+@app.get("/test_plans")
+async def list_test_plans(
+    start: Optional[datetime.date] = None,
+    end: Optional[datetime.date] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+):
+    limit = max(1, min(limit, 200))
+    query, sort_spec = keyset_query(plan_time_range(start, end), "timestamp", "desc", cursor)
+    projection = {"input_content": 0, "generated_output": 0, "tasks": 0}
+    docs = await collection.find(query, projection, sort=sort_spec, limit=limit)
+    cursor_out = next_cursor(docs, "timestamp", limit)  # İmleç _id silinmeden önce üretilmeli
+    plans = []
+    for doc in docs:
+        doc["id"] = str(doc.pop("_id"))
+        plans.append(doc)
+    return {"plans": plans, "next_cursor": cursor_out}
+
+# Tarih aralığındaki tüm planları (her satır bir görev) tek dosya olarak dışa aktarır.
+# Kayıtlar Mongo imlecinden tek tek okunur; CSV doğrudan akıtılır, XLSX ve Parquet
+# dosya sonu (zip dizini / footer) gerektirdiği için önce geçici dosyaya akış halinde yazılır.
+@app.get("/test_plans/export")
+async def export_test_plans(
+    format: str = "xlsx",
+    start: Optional[datetime.date] = None,
+    end: Optional[datetime.date] = None,
+):
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Desteklenen formatlar: {', '.join(EXPORT_MEDIA_TYPES)}")
+    query = plan_time_range(start, end)
+    projection = {"input_content": 0, "ollama_stats": 0}
+
+    def rows():
+        # Senkron imleç thread'de tüketilir; batch_size belleği sınırlar
+        cursor = collection.sync.find(query, projection, sort=[("timestamp", 1)], batch_size=200)
+        with cursor:
+            yield from iter_plan_rows(cursor)
+
+    filename = f"test_plans_{start or 'all'}_{end or 'all'}.{format}"
+    if format == "csv":
+        return StreamingResponse(
+            iter_csv(rows(), PLAN_COLUMNS),
+            media_type=EXPORT_MEDIA_TYPES["csv"],
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+    path = await asyncio.to_thread(export_to_tempfile, rows(), format, PLAN_COLUMNS)
+    return FileResponse(
+        path,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        filename=filename,
+        background=BackgroundTask(os.unlink, path),
+    )
+
+# Tek planın kaydı (/test_plans/export'tan sonra tanımlanmalı); include_input ile yüklenen doküman metni de blob deposundan okunur
+@app.get("/test_plans/{plan_id}")
+async def get_test_plan(plan_id: str, include_input: bool = False):
+    doc = await collection.find_one({"plan_id": plan_id})
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Plan bulunamadı")
+    doc["id"] = str(doc.pop("_id"))
+    if include_input and "input_sha256" in doc:
+        doc["input_content"] = await asyncio.to_thread(get_text, doc["input_sha256"])
+    doc.pop("generated_output", None)
+    return doc
+
+# GridFS'teki plan dosyasını chunk chunk akıtır; hangi replika üretmiş olursa olsun indirilebilir
+@app.get("/download/{file_id}")
+async def download_file(file_id: str):
+    grid_out = await asyncio.to_thread(open_artifact, file_id)
+    if grid_out is None:
         raise HTTPException(status_code=404, detail="Dosya bulunamadı")
-    return FileResponse(file_path, media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", filename=filename)
+    headers = {
+        "Content-Disposition": f'attachment; filename="{grid_out.filename}"',
+        "Content-Length": str(grid_out.length),
+    }
+    return StreamingResponse(iter_artifact(grid_out), media_type=grid_out.content_type, headers=headers)
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,61 +1,137 @@
+import datetime
+import json
+from urllib.parse import urlencode
 import streamlit as st
 import requests
+import uuid
 import pandas as pd
 import plotly.express as px
 
+API_URL = "http://localhost:8000"
+
+# Ollama kuyruğu istemci başına adil sıralama yapar; her tarayıcı oturumu kendi kimliğini gönderir
+CLIENT_HEADERS = {"X-Client-Id": st.session_state.setdefault("client_id", uuid.uuid4().hex)}
+
+# İşin olay akışını okur; görevler geldikçe Gantt chart'ı günceller, bitince işin son halini döndürür
+def stream_job(job_id):
+    chart = st.empty()
+    tasks = []
+    with requests.get(f"{API_URL}/test_plan_jobs/{job_id}/stream", stream=True, headers=CLIENT_HEADERS) as response:
+        response.raise_for_status()
+        for line in response.iter_lines(decode_unicode=True):
+            if not line:
+                continue
+            event = json.loads(line)
+            if event["event"] == "task":
+                tasks.append(event["task"])
+                with chart.container():
+                    render_gantt(tasks)
+            elif event["event"] == "result":
+                chart.empty()
+                return event
+            elif event["event"] == "error":
+                # İş sunucuda bulunamadı; tekrar denenmemesi için oturumdan da silinir
+                chart.empty()
+                st.session_state.pop("job_id", None)
+                return {"status": "failed", "error": event["error"]}
+    raise ValueError("Akış sonuç gelmeden kapandı")
+
+def render_gantt(tasks):
+    # Gantt chart oluşturmak için:
+    df = pd.DataFrame(tasks)
+    # Tarih sütunlarını datetime formatına çeviriyoruz
+    df["Start Date"] = pd.to_datetime(df["Start Date"])
+    df["End Date"] = pd.to_datetime(df["End Date"])
+    
+    # Plotly Express timeline kullanarak gantt chart oluşturma
+    fig = px.timeline(
+        df,
+        x_start="Start Date",
+        x_end="End Date",
+        y="Task Name",
+        title="Test Planı Gantt Chart",
+        labels={"Task Name": "Görevler"}
+    )
+    # Görevlerin üst üste binmemesi için y eksenini ters çeviriyoruz.
+    fig.update_yaxes(autorange="reversed")
+    
+    st.plotly_chart(fig, use_container_width=True)
+
+def render_test_plan(result):
+    # {"json_data": ..., "download_url": ...} bekleniyor.
+    st.success("Test planı başarıyla oluşturuldu.")
+    links = f"[Test Planını İndir (XLSX)]({result['download_url']}) | [CSV]({result['csv_download_url']})"
+    if result.get("parquet_download_url"):
+        links += f" | [Parquet]({result['parquet_download_url']})"
+    st.markdown(links)
+    
+    st.subheader("Oluşturulan Test Planı (JSON Formatında)")
+    st.json(result["json_data"])
+    render_gantt(result["json_data"])
+
+# Dosyayı ham haliyle multipart olarak yükler; metin çıkarma (PDF/DOCX dahil) sunucuda yapılır.
+# Sonuç session_state'te tutulur, böylece her yeniden çizimde dosya tekrar gönderilmez.
+def upload_document(uploaded_file):
+    uploads = st.session_state.setdefault("documents", {})
+    if uploaded_file.file_id not in uploads:
+        files = {"file": (uploaded_file.name, uploaded_file, uploaded_file.type or "application/octet-stream")}
+        response = requests.post(f"{API_URL}/documents", files=files, headers=CLIENT_HEADERS)
+        response.raise_for_status()
+        uploads[uploaded_file.file_id] = response.json()
+    return uploads[uploaded_file.file_id]
+
 st.title("Test Planning Document Generator")
 
+# Geçmiş planların toplu dışa aktarımı; dosya tarayıcıya doğrudan backend'den akar
+with st.sidebar:
+    st.subheader("Toplu Dışa Aktarım")
+    today = datetime.date.today()
+    export_range = st.date_input("Tarih aralığı", (today - datetime.timedelta(days=30), today))
+    export_format = st.selectbox("Format", ["xlsx", "csv", "parquet"])
+    if isinstance(export_range, (tuple, list)) and len(export_range) == 2:
+        query = urlencode({"format": export_format, "start": export_range[0], "end": export_range[1]})
+        st.markdown(f"[Planları İndir]({API_URL}/test_plans/export?{query})")
+
 # Dosya yükleme bileşeni
 uploaded_file = st.file_uploader("Test planning için gerekli dosyayı yükleyin", type=["txt", "pdf", "docx"])
 
 if uploaded_file is not None:
+    document = None
     try:
-        content = uploaded_file.read().decode("utf-8")
-    except Exception as e:
-        st.error("Dosya okunurken hata oluştu: " + str(e))
-        content = ""
-    
-    st.subheader("Yüklenen Dosya İçeriği")
-    st.text_area("Dosya İçeriği", content, height=300)
+        document = upload_document(uploaded_file)
+    except requests.exceptions.HTTPError as e:
+        st.error("Dosya okunurken hata oluştu: " + e.response.text)
+    except requests.exceptions.RequestException as e:
+        st.error("Sunucuya bağlanırken hata oluştu: " + str(e))
 
-    if st.button("Test Planı Oluştur"):
-        if content.strip() == "":
-            st.error("Lütfen geçerli bir dosya yükleyin.")
-        else:
-            payload = {"content": content}
+    if document is not None:
+        st.subheader("Yüklenen Dosya İçeriği")
+        st.caption(f"{document['kind'].upper()} · {document['chars']} karakter (ilk 2000 karakter gösteriliyor)")
+        st.text_area("Dosya İçeriği", document["preview"], height=300)
+
+        if st.button("Test Planı Oluştur"):
+            # Metin sunucuda cache'te; yalnızca doküman kimliği gönderilir
+            payload = {"document_id": document["document_id"]}
             try:
-                response = requests.post("http://localhost:8000/generate_test_plan", json=payload)
-                if response.status_code == 200:
-                    result = response.json()  # {"json_data": ..., "download_url": ...} bekleniyor.
-                    st.success("Test planı başarıyla oluşturuldu.")
-                    st.markdown(f"[Test Planını İndir]({result['download_url']})")
-                    
-                    st.subheader("Oluşturulan Test Planı (JSON Formatında)")
-                    st.json(result["json_data"])
-                    
-                    # Gantt chart oluşturmak için:
-                    df = pd.DataFrame(result["json_data"])
-                    # Tarih sütunlarını datetime formatına çeviriyoruz
-                    df["Start Date"] = pd.to_datetime(df["Start Date"])
-                    df["End Date"] = pd.to_datetime(df["End Date"])
-                    
-                    # Plotly Express timeline kullanarak gantt chart oluşturma
-                    fig = px.timeline(
-                        df,
-                        x_start="Start Date",
-                        x_end="End Date",
-                        y="Task Name",
-                        title="Test Planı Gantt Chart",
-                        labels={"Task Name": "Görevler"}
-                    )
-                    # Görevlerin üst üste binmemesi için y eksenini ters çeviriyoruz.
-                    fig.update_yaxes(autorange="reversed")
-                    
-                    st.plotly_chart(fig, use_container_width=True)
-                    
+                # İş kuyruğa eklenir; aynı içerik daha önce gönderildiyse aynı iş döner
+                response = requests.post(f"{API_URL}/test_plan_jobs", json=payload, headers=CLIENT_HEADERS)
+                if response.status_code == 202:
+                    st.session_state["job_id"] = response.json()["job_id"]
                 else:
                     st.error("Test planı oluşturulurken hata: " + response.text)
             except requests.exceptions.RequestException as e:
                 st.error("Sunucuya bağlanırken hata oluştu: " + str(e))
-            except ValueError as e:
-                st.error("Geçersiz JSON formatı: " + str(e))
+
+# İş kimliği session_state'te tutulduğu için sayfa yenilense de sonuç tekrar üretilmeden alınır
+if "job_id" in st.session_state:
+    try:
+        with st.spinner("Test planı oluşturuluyor..."):
+            job = stream_job(st.session_state["job_id"])
+        if job["status"] == "done":
+            render_test_plan(job["result"])
+        else:
+            st.error("Test planı oluşturulurken hata: " + job.get("error", ""))
+    except requests.exceptions.RequestException as e:
+        st.error("Sunucuya bağlanırken hata oluştu: " + str(e))
+    except ValueError as e:
+        st.error("Geçersiz JSON formatı: " + str(e))
@@ -0,0 +1,53 @@
+import tempfile
+import uuid
+
+from bson import ObjectId
+from gridfs.errors import NoFile
+
+from helpers.db import fs
+from helpers.exports import EXPORT_MEDIA_TYPES, write_rows
+
+
+def save_plan_artifacts(tasks, plan_id=None):
+    """Planın XLSX, CSV ve Parquet çıktısını GridFS'e benzersiz bir plan_id ile kaydeder.
+
+    Senkron çalışır; async kodda asyncio.to_thread ile çağrılmalıdır.
+    Her çıktı önce geçici dosyaya akış halinde yazılır, GridFS'e de chunk
+    chunk aktarılır. Dönen sözlük dosya türünden GridFS dosya id'sine eşlenir.
+    """
+    plan_id = plan_id or uuid.uuid4().hex
+    artifacts = {"plan_id": plan_id}
+    for fmt, media_type in EXPORT_MEDIA_TYPES.items():
+        with tempfile.TemporaryFile() as target:
+            write_rows(tasks, fmt, target)
+            target.seek(0)
+            file_id = fs.put(
+                target,
+                filename=f"test_plan_{plan_id}.{fmt}",
+                content_type=media_type,
+                plan_id=plan_id,
+            )
+        artifacts[fmt] = str(file_id)
+    return artifacts
+
+
+def open_artifact(file_id):
+    """GridFS dosyasını açar; bulunamazsa None döner."""
+    if not ObjectId.is_valid(file_id):
+        return None
+    try:
+        return fs.get(ObjectId(file_id))
+    except NoFile:
+        return None
+
+
+def iter_artifact(grid_out):
+    # Dosya GridFS chunk'ları halinde okunur; bellek kullanımı dosya boyutundan bağımsızdır
+    try:
+        while True:
+            chunk = grid_out.readchunk()
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        grid_out.close()
@@ -0,0 +1,88 @@
+import datetime
+import gzip
+import hashlib
+import os
+
+from bson import Binary
+from gridfs.errors import FileExists, NoFile
+from pymongo.errors import DuplicateKeyError
+
+from helpers.db import db, fs
+
+# İçerik adresli blob deposu: aynı içerik (ör. tekrar gönderilen doküman) bir kez saklanır
+blobs = db["blobs"]
+
+# Sıkıştırılmış boyutu bu sınırı aşan blob'lar doküman yerine GridFS'e taşınır
+INLINE_BLOB_BYTES = int(os.getenv("BLOB_INLINE_BYTES", str(256 * 1024)))
+# Bundan küçük içerikte sıkıştırma kazandırmaz; ham saklanır
+COMPRESS_MIN_BYTES = 512
+
+
+def blob_id(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def put_blob(data, kind):
+    """İçeriği SHA-256 anahtarıyla bir kez saklar ve anahtarı döndürür.
+
+    Senkron çalışır; async kodda asyncio.to_thread ile çağrılmalıdır.
+    Var olan içerik için yalnızca hash hesaplanır, sıkıştırma ve yazma yapılmaz.
+    """
+    raw = data.encode("utf-8") if isinstance(data, str) else data
+    digest = blob_id(raw)
+    if blobs.find_one({"_id": digest}, {"_id": 1}) is not None:
+        return digest
+
+    encoding = "identity"
+    payload = raw
+    if len(raw) >= COMPRESS_MIN_BYTES:
+        compressed = gzip.compress(raw, compresslevel=6)
+        if len(compressed) < len(raw):
+            encoding, payload = "gzip", compressed
+
+    doc = {
+        "kind": kind,
+        "size": len(raw),
+        "stored_size": len(payload),
+        "encoding": encoding,
+        "created_at": datetime.datetime.now(datetime.timezone.utc),
+    }
+    if len(payload) > INLINE_BLOB_BYTES:
+        # GridFS dosyası da hash ile adreslenir; eşzamanlı iki yazımdan biri FileExists alır
+        try:
+            fs.put(payload, _id=digest, filename=f"blob_{digest}", kind=kind, encoding=encoding)
+        except FileExists:
+            pass
+        doc["storage"] = "gridfs"
+    else:
+        doc["storage"] = "inline"
+        doc["data"] = Binary(payload)
+
+    try:
+        blobs.update_one({"_id": digest}, {"$setOnInsert": doc}, upsert=True)
+    except DuplicateKeyError:
+        # Aynı içerik başka bir istek tarafından aynı anda yazıldı
+        pass
+    return digest
+
+
+def get_blob(digest):
+    """Blob içeriğini açılmış (decompress) bayt olarak döndürür; bulunamazsa None."""
+    doc = blobs.find_one({"_id": digest})
+    if doc is None:
+        return None
+    if doc["storage"] == "gridfs":
+        try:
+            payload = fs.get(digest).read()
+        except NoFile:
+            return None
+    else:
+        payload = bytes(doc["data"])
+    return gzip.decompress(payload) if doc["encoding"] == "gzip" else payload
+
+
+def get_text(digest):
+    data = get_blob(digest)
+    return data.decode("utf-8") if data is not None else None
@@ -1,6 +1,9 @@
+import os
 from pymongo import MongoClient
 import gridfs
 
-client = MongoClient("mongodb://localhost:27017/")
+from common.metrics import mongo_command_metrics
+
+client = MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017/"), event_listeners=[mongo_command_metrics])
 db = client["test_planner"]
 fs = gridfs.GridFS(db)
\ No newline at end of file
@@ -0,0 +1,141 @@
+import csv
+import datetime
+import io
+import os
+import tempfile
+
+from helpers.task_stream import TASK_FIELDS, TaskStreamParser
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CSV_MEDIA_TYPE = "text/csv"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+
+EXPORT_MEDIA_TYPES = {"xlsx": XLSX_MEDIA_TYPE, "csv": CSV_MEDIA_TYPE, "parquet": PARQUET_MEDIA_TYPE}
+
+# Toplu dışa aktarımda her satır bir görevdir; planı tanımlayan sütunlar başa eklenir
+PLAN_COLUMNS = ["Plan ID", "Created At", "Prompt Template", *TASK_FIELDS]
+
+# Parquet satır grubu ve CSV akışındaki parça büyüklüğü (satır)
+ROW_BATCH_SIZE = 1000
+
+
+class XlsxExportWriter:
+    """openpyxl'in write-only modu: satırlar eklendikçe diske yazılır, çalışma kitabı bellekte tutulmaz."""
+
+    def __init__(self, target, columns):
+        from openpyxl import Workbook
+
+        self.target = target
+        self.columns = columns
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet("Test Plan")
+        self.sheet.append(columns)
+
+    def write(self, row):
+        self.sheet.append([row.get(column) for column in self.columns])
+
+    def close(self):
+        self.workbook.save(self.target)
+
+
+class CsvExportWriter:
+    def __init__(self, target, columns):
+        self.text = io.TextIOWrapper(target, encoding="utf-8", newline="")
+        self.writer = csv.DictWriter(self.text, fieldnames=columns, extrasaction="ignore")
+        self.writer.writeheader()
+
+    def write(self, row):
+        self.writer.writerow(row)
+
+    def close(self):
+        self.text.flush()
+        # Alttaki dosya çağırana aittir; wrapper kapanırken onu kapatmamalı
+        self.text.detach()
+
+
+class ParquetExportWriter:
+    """Satırları ROW_BATCH_SIZE'lık satır grupları halinde yazar; bellekte en fazla bir grup tutulur."""
+
+    def __init__(self, target, columns):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        fields = [pa.field(column, pa.int64() if column == "Duration (days)" else pa.string()) for column in columns]
+        self.schema = pa.schema(fields)
+        self.columns = columns
+        self.writer = pq.ParquetWriter(target, self.schema, compression="zstd")
+        self.rows = []
+
+    def write(self, row):
+        self.rows.append({column: row.get(column) for column in self.columns})
+        if len(self.rows) >= ROW_BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        self.writer.write_table(self.pa.Table.from_pylist(self.rows, schema=self.schema))
+        self.rows = []
+
+    def close(self):
+        if self.rows:
+            self._flush()
+        self.writer.close()
+
+
+EXPORT_WRITERS = {"xlsx": XlsxExportWriter, "csv": CsvExportWriter, "parquet": ParquetExportWriter}
+
+
+def write_rows(rows, fmt, target, columns=TASK_FIELDS):
+    """Satır sözlüklerini verilen formatta ikili (binary) dosya nesnesine akış halinde yazar."""
+    writer = EXPORT_WRITERS[fmt](target, columns)
+    for row in rows:
+        writer.write(row)
+    writer.close()
+
+
+def export_to_tempfile(rows, fmt, columns=TASK_FIELDS):
+    """Dışa aktarımı geçici bir dosyaya yazar ve yolunu döndürür; dosyayı silmek çağırana aittir."""
+    with tempfile.NamedTemporaryFile(prefix="export-", suffix=f".{fmt}", delete=False) as target:
+        try:
+            write_rows(rows, fmt, target, columns)
+        except BaseException:
+            target.close()
+            os.unlink(target.name)
+            raise
+    return target.name
+
+
+def iter_csv(rows, columns):
+    """CSV'yi ROW_BATCH_SIZE satırlık parçalar halinde üretir; StreamingResponse doğrudan akıtabilir."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % ROW_BATCH_SIZE == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def plan_tasks(record):
+    """Kayıttaki görev listesi; eski kayıtlarda ham model çıktısından yeniden ayrıştırılır."""
+    if record.get("tasks") is not None:
+        return record["tasks"]
+    return TaskStreamParser().feed(record.get("generated_output") or "")
+
+
+def iter_plan_rows(records):
+    """Plan kayıtlarını (ör. Mongo imleci) görev satırlarına açar; kayıtlar tek tek tüketilir."""
+    for record in records:
+        timestamp = record.get("timestamp")
+        plan = {
+            "Plan ID": str(record.get("plan_id") or record["_id"]),
+            "Created At": timestamp.isoformat() if isinstance(timestamp, datetime.datetime) else None,
+            "Prompt Template": record.get("prompt_template"),
+        }
+        for task in plan_tasks(record):
+            yield {**plan, **task}
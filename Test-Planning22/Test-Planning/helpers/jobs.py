@@ -0,0 +1,224 @@
+import asyncio
+import hashlib
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+# Bir işin alabileceği durumlar
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+TERMINAL_STATES = {DONE, FAILED}
+
+# Çalışan işin sahipliği bu süre boyunca geçerlidir; worker çalışırken düzenli olarak yeniler.
+# Süresi dolan (sahibi çökmüş) işler herhangi bir replika tarafından yeniden sahiplenilebilir.
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))
+# Mongo hatasından sonra worker'ın en fazla bekleyeceği süre (saniye)
+MAX_WORKER_BACKOFF = 30
+
+
+class JobError(Exception):
+    """İş çalışırken kullanıcıya gösterilebilir bir hata oluştuğunda fırlatılır."""
+
+
+def dedupe_key(*parts: str) -> str:
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+def serialize_job(job):
+    if job is None:
+        return None
+    job = dict(job)
+    job["job_id"] = str(job.pop("_id"))
+    job.pop("dedupe_key", None)
+    job.pop("payload", None)
+    job.pop("content", None)
+    return job
+
+
+class JobQueue:
+    """Mongo'da kalıcı durum tutan, sınırlı sayıda worker ile çalışan iş kuyruğu.
+
+    Aynı dedupe anahtarıyla gelen istekler tek bir işe bağlanır. İşler
+    find_one_and_update ile atomik olarak sahiplenildiği için birden fazla
+    replika aynı koleksiyonu paylaşabilir. İş dokümanı büyük veriyi taşımaz:
+    payload ve sonuç yalnızca referans (blob hash'i, plan_id) içermelidir. Sahiplik (owner) süreli bir kiradır
+    (lease); çalışan worker kirayı yeniler, yalnızca süresi dolmuş işler başka
+    bir replika tarafından yeniden çalıştırılır. Canlı olaylar süreç içi
+    dinleyicilere iletilir; istemci yeniden bağlandığında durum Mongo'dan okunur.
+    """
+
+    def __init__(self, collection, handler, workers=2, lease_seconds=JOB_LEASE_SECONDS):
+        self.collection = collection
+        self.handler = handler  # async handler(job_id, payload, publish) -> dict
+        self.workers = workers
+        self.lease = timedelta(seconds=lease_seconds)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue = asyncio.Queue()
+        self._queued_ids = set()
+        self._tasks = []
+        self._listeners = {}
+
+    async def start(self):
+        await self.collection.create_index("dedupe_key", unique=True, sparse=True)
+        await self.collection.create_index([("status", 1), ("created_at", 1)])
+        await self.collection.create_index([("status", 1), ("lease_expires_at", 1)])
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        # Sahipsiz kalan işler (çökmüş replika, kaybolan kuyruk) periyodik olarak toplanır
+        self._tasks.append(asyncio.create_task(self._reclaim_loop()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, payload, key):
+        """İşi kuyruğa ekler; aynı anahtarla bekleyen/çalışan/biten iş varsa onu döndürür."""
+        now = datetime.now(timezone.utc)
+        try:
+            result = await self.collection.update_one(
+                {"dedupe_key": key},
+                {"$setOnInsert": {
+                    "dedupe_key": key,
+                    "payload": payload,
+                    "status": QUEUED,
+                    "created_at": now,
+                    "updated_at": now,
+                }},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # Başka bir istek aynı işi aynı anda oluşturdu
+            result = None
+        if result is not None and result.upserted_id is not None:
+            self._enqueue(result.upserted_id)
+        return await self.collection.find_one({"dedupe_key": key})
+
+    async def get(self, job_id):
+        if not ObjectId.is_valid(job_id):
+            return None
+        return await self.collection.find_one({"_id": ObjectId(job_id)})
+
+    def subscribe(self, job_id):
+        queue = asyncio.Queue()
+        self._listeners.setdefault(str(job_id), set()).add(queue)
+        return queue
+
+    def unsubscribe(self, job_id, queue):
+        listeners = self._listeners.get(str(job_id))
+        if listeners:
+            listeners.discard(queue)
+            if not listeners:
+                del self._listeners[str(job_id)]
+
+    def publish(self, job_id, event):
+        for queue in self._listeners.get(str(job_id), ()):
+            queue.put_nowait(event)
+
+    def _enqueue(self, job_id):
+        if job_id not in self._queued_ids:
+            self._queued_ids.add(job_id)
+            self._queue.put_nowait(job_id)
+
+    def _claimable(self, now):
+        # Bekleyen işler ya da kirası dolmuş (veya kira alanı olmayan eski) çalışan işler
+        return {"$or": [
+            {"status": QUEUED},
+            {"status": RUNNING, "lease_expires_at": {"$not": {"$gte": now}}},
+        ]}
+
+    async def reclaim(self):
+        """Sahiplenilebilir işleri yerel kuyruğa ekler; sahiplenme yine _run'da atomik yapılır."""
+        now = datetime.now(timezone.utc)
+        query = self._claimable(now)
+        # Yeni gönderilen işler zaten gönderildiği replikanın kuyruğunda; yalnızca bir kira
+        # süresinden eski bekleyenler toplanır (ör. gönderen replika çöktü)
+        query["$or"][0]["created_at"] = {"$lt": now - self.lease}
+        for job in await self.collection.find(query, {"_id": 1}, sort=[("created_at", 1)]):
+            self._enqueue(job["_id"])
+
+    async def _reclaim_loop(self):
+        first = True
+        while True:
+            try:
+                if first:
+                    # Açılışta önceki süreçten kalan tüm bekleyen işler hemen alınır
+                    for job in await self.collection.find({"status": QUEUED}, {"_id": 1}, sort=[("created_at", 1)]):
+                        self._enqueue(job["_id"])
+                    first = False
+                await self.reclaim()
+            except Exception as e:
+                print("Sahipsiz işler toplanamadı:", e)
+            await asyncio.sleep(self.lease.total_seconds())
+
+    async def _worker(self):
+        failures = 0
+        while True:
+            job_id = await self._queue.get()
+            self._queued_ids.discard(job_id)
+            try:
+                await self._run(job_id)
+                failures = 0
+            except Exception as e:
+                # Mongo hatası worker'ı öldürmemeli; iş kirası dolunca yeniden toplanır
+                failures += 1
+                print(f"İş işlenirken hata ({job_id}):", e)
+                await asyncio.sleep(min(2 ** failures, MAX_WORKER_BACKOFF))
+            finally:
+                self._queue.task_done()
+
+    async def _heartbeat(self, job_id):
+        while True:
+            await asyncio.sleep(self.lease.total_seconds() / 3)
+            try:
+                await self.collection.update_one(
+                    {"_id": job_id, "owner": self.owner, "status": RUNNING},
+                    {"$set": {"lease_expires_at": datetime.now(timezone.utc) + self.lease}},
+                )
+            except Exception as e:
+                print(f"İş kirası yenilenemedi ({job_id}):", e)
+
+    async def _finish(self, job_id, **fields):
+        # Kira başka bir replikaya geçtiyse sonucu o yazar; bu worker'ınki atılır
+        fields["updated_at"] = datetime.now(timezone.utc)
+        update = {"$set": fields, "$unset": {"owner": "", "lease_expires_at": ""}}
+        if fields.get("status") == FAILED:
+            # Başarısız işlerin anahtarı kaldırılır ki aynı içerik yeniden gönderilebilsin
+            update["$unset"]["dedupe_key"] = ""
+        result = await self.collection.update_one({"_id": job_id, "owner": self.owner}, update)
+        if result.matched_count:
+            self.publish(job_id, {"event": "status", "status": fields["status"]})
+
+    async def _run(self, job_id):
+        # İşi atomik olarak sahiplen; başka bir worker/replika aldıysa (ve kirası sürüyorsa) atla
+        now = datetime.now(timezone.utc)
+        job = await self.collection.find_one_and_update(
+            {"_id": job_id, **self._claimable(now)},
+            {
+                "$set": {"status": RUNNING, "owner": self.owner, "lease_expires_at": now + self.lease, "started_at": now},
+                "$inc": {"attempts": 1},
+            },
+            return_document=True,
+        )
+        if job is None:
+            return
+        self.publish(job_id, {"event": "status", "status": RUNNING})
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            # Eski işler içeriği doğrudan "content" alanında tutar
+            payload = job.get("payload") or {"content": job.get("content")}
+            result = await self.handler(job_id, payload, lambda event: self.publish(job_id, event))
+        except Exception as e:
+            print(f"İş başarısız oldu ({job_id}):", e)
+            message = str(e) if isinstance(e, JobError) else "Test planı oluşturulamadı"
+            await self._finish(job_id, status=FAILED, error=message)
+            return
+        finally:
+            heartbeat.cancel()
+        await self._finish(job_id, status=DONE, result=result)
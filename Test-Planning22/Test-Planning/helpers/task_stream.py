@@ -0,0 +1,100 @@
+import datetime
+import json
+import re
+
+from common.json_stream import JsonArrayElements
+
+TASK_FIELDS = ["Task Name", "Description", "Start Date", "End Date", "Duration (days)"]
+
+# Anahtar eşleştirmesi büyük/küçük harf, boşluk ve noktalama farklarını yok sayar
+_NORMALIZED_FIELDS = {re.sub(r"[^a-z]", "", field.lower()): field for field in TASK_FIELDS}
+_NORMALIZED_FIELDS["duration"] = "Duration (days)"
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+def _parse_date(value):
+    try:
+        return datetime.date.fromisoformat(str(value).strip()[:10])
+    except ValueError:
+        return None
+
+
+def validate_task(raw):
+    """Görev nesnesini şemaya göre doğrular ve onarır; kurtarılamıyorsa None döner.
+
+    Fazla anahtarlar atılır, anahtar yazım farkları düzeltilir, eksik
+    bitiş tarihi veya süre diğer alanlardan hesaplanır.
+    """
+    if not isinstance(raw, dict):
+        return None
+    task = {}
+    for key, value in raw.items():
+        field = _NORMALIZED_FIELDS.get(re.sub(r"[^a-z]", "", str(key).lower()))
+        if field:
+            task[field] = value
+
+    name = str(task.get("Task Name", "")).strip()
+    start = _parse_date(task.get("Start Date"))
+    if not name or start is None:
+        return None
+
+    end = _parse_date(task.get("End Date"))
+    duration = task.get("Duration (days)")
+    if not isinstance(duration, int):
+        match = re.search(r"\d+", str(duration)) if duration is not None else None
+        duration = int(match.group()) if match else None
+
+    if end is None and duration is not None:
+        end = start + datetime.timedelta(days=max(duration - 1, 0))
+    if end is None or end < start:
+        return None
+    if duration is None:
+        duration = (end - start).days + 1
+
+    return {
+        "Task Name": name,
+        "Description": str(task.get("Description", "")).strip(),
+        "Start Date": start.isoformat(),
+        "End Date": end.isoformat(),
+        "Duration (days)": duration,
+    }
+
+
+def _loads_lenient(text):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        # LLM'lerin sık yaptığı sondaki virgül hatası onarılıp tekrar denenir
+        try:
+            return json.loads(_TRAILING_COMMA.sub(r"\1", text))
+        except json.JSONDecodeError:
+            return None
+
+
+class TaskStreamParser:
+    """Ollama token akışından görev nesnelerini tamamlandıkları anda çıkaran artımlı ayrıştırıcı.
+
+    İlk '[' karakterinden önceki metin yok sayılır; dizinin üst seviyesindeki
+    her eleman tamamlandığı anda ayrıştırılıp doğrulanır. Bozuk (veya nesne
+    olmayan) bir eleman yalnızca kendisini düşürür, üretimin geri kalanı
+    kullanılmaya devam eder.
+    """
+
+    def __init__(self):
+        self.elements = JsonArrayElements()
+        self.skipped = 0
+
+    @property
+    def finished(self):
+        return self.elements.finished
+
+    def feed(self, text):
+        """Yeni gelen metin parçasını işler ve tamamlanan geçerli görevleri döndürür."""
+        tasks = []
+        for raw, _ in self.elements.feed(text):
+            task = validate_task(_loads_lenient(raw))
+            if task is None:
+                self.skipped += 1
+            else:
+                tasks.append(task)
+        return tasks
@@ -0,0 +1,10 @@
+import sys
+from pathlib import Path
+
+# Backend'deki gibi proje kökü (helpers/) ve repo kökü (common/) import yolunun başına eklenir
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(BASE_DIR), str(BASE_DIR.parent.parent)]
+
+# Diğer uygulamaların da "helpers" paketi var; aynı oturumda yüklenmiş olan bırakılır
+for name in [name for name in sys.modules if name == "helpers" or name.startswith("helpers.")]:
+    del sys.modules[name]
@@ -0,0 +1,92 @@
+import gzip
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("prometheus_client")
+pytest.importorskip("gridfs")
+
+from gridfs.errors import FileExists, NoFile
+
+from helpers import blobs
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = {}
+        self.writes = 0
+
+    def find_one(self, query, projection=None):
+        doc = self.docs.get(query["_id"])
+        return dict(doc) if doc is not None else None
+
+    def update_one(self, query, update, upsert=False):
+        self.writes += 1
+        if query["_id"] not in self.docs:
+            self.docs[query["_id"]] = {"_id": query["_id"], **update["$setOnInsert"]}
+
+
+class FakeFile:
+    def __init__(self, data):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+
+class FakeGridFS:
+    def __init__(self):
+        self.files = {}
+
+    def put(self, data, _id, **metadata):
+        if _id in self.files:
+            raise FileExists()
+        self.files[_id] = data
+
+    def get(self, file_id):
+        if file_id not in self.files:
+            raise NoFile()
+        return FakeFile(self.files[file_id])
+
+
+@pytest.fixture
+def store(monkeypatch):
+    collection, fs = FakeCollection(), FakeGridFS()
+    monkeypatch.setattr(blobs, "blobs", collection)
+    monkeypatch.setattr(blobs, "fs", fs)
+    return collection, fs
+
+
+def test_same_content_is_stored_once(store):
+    collection, _ = store
+    text = "Ödeme modülü test edilecek. " * 100
+    digest = blobs.put_blob(text, "input")
+    assert blobs.put_blob(text.encode("utf-8"), "input") == digest
+    assert list(collection.docs) == [digest]
+    assert collection.writes == 1
+    assert blobs.get_text(digest) == text
+
+
+def test_small_content_is_kept_raw_and_large_content_compressed(store):
+    collection, _ = store
+    small = blobs.put_blob("kısa", "input")
+    large = blobs.put_blob("tekrar eden içerik " * 200, "output")
+    assert collection.docs[small]["encoding"] == "identity"
+    assert collection.docs[large]["encoding"] == "gzip"
+    assert gzip.decompress(bytes(collection.docs[large]["data"])).decode("utf-8") == "tekrar eden içerik " * 200
+
+
+def test_content_over_inline_limit_goes_to_gridfs(store, monkeypatch):
+    collection, fs = store
+    monkeypatch.setattr(blobs, "INLINE_BLOB_BYTES", 16)
+    data = bytes(range(256)) * 4
+    digest = blobs.put_blob(data, "output")
+    assert collection.docs[digest]["storage"] == "gridfs"
+    assert "data" not in collection.docs[digest]
+    assert digest in fs.files
+    assert blobs.get_blob(digest) == data
+
+
+def test_missing_blob_returns_none(store):
+    assert blobs.get_blob("0" * 64) is None
+    assert blobs.get_text("0" * 64) is None
@@ -0,0 +1,42 @@
+from helpers.task_stream import TaskStreamParser, validate_task
+
+OUTPUT = """Test planı aşağıdadır:
+[
+  {"Task Name": "Gereksinim analizi", "Description": "Kapsam, ] belirlenir", "Start Date": "2024-05-01", "End Date": "2024-05-03", "Duration (days)": 3},
+  {"task_name": "Test tasarımı", "start date": "2024-05-04", "duration": "5 gün",},
+  "nesne değil",
+  {"Task Name": "Bozuk", "Start Date": "tarih yok"},
+  {"Task Name": "Yürütme", "Start Date": "2024-05-09", "End Date": "2024-05-12"}
+]"""
+
+
+def parse(text, size):
+    parser = TaskStreamParser()
+    tasks = []
+    for start in range(0, len(text), size):
+        tasks.extend(parser.feed(text[start:start + size]))
+    return tasks, parser.skipped, parser.finished
+
+
+def test_tasks_do_not_depend_on_chunk_boundaries():
+    expected = parse(OUTPUT, len(OUTPUT))
+    for size in (1, 2, 5, 17):
+        assert parse(OUTPUT, size) == expected, size
+
+
+def test_invalid_elements_are_skipped_and_counted():
+    tasks, skipped, finished = parse(OUTPUT, 3)
+    assert [task["Task Name"] for task in tasks] == ["Gereksinim analizi", "Test tasarımı", "Yürütme"]
+    assert skipped == 2
+    assert finished
+
+
+def test_missing_fields_are_repaired():
+    tasks, _, _ = parse(OUTPUT, 4)
+    assert tasks[1]["End Date"] == "2024-05-08"
+    assert tasks[1]["Duration (days)"] == 5
+    assert tasks[2]["Duration (days)"] == 4
+
+
+def test_end_before_start_is_rejected():
+    assert validate_task({"Task Name": "Ters", "Start Date": "2024-05-10", "End Date": "2024-05-01"}) is None
@@ -0,0 +1 @@
+# Çevrimdışı yük testi / benchmark paketi (sahte Ollama sunucusu + yük sürücüsü)
@@ -0,0 +1,143 @@
+"""Yerel, deterministik Ollama yerine geçeni.
+
+/api/generate (stream açık/kapalı), /api/embed ve /api/tags uçlarını
+uygular. Token başına gecikme ve üretilen metin ortam değişkenleri veya
+komut satırı argümanları ile ayarlanır:
+
+    python -m bench.fake_ollama --port 11500 --token-latency 0.02 --tokens 64
+"""
+import argparse
+import asyncio
+import datetime
+import hashlib
+import json
+import os
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+TOKEN_LATENCY = float(os.getenv("FAKE_OLLAMA_TOKEN_LATENCY", "0.01"))
+LOAD_LATENCY = float(os.getenv("FAKE_OLLAMA_LOAD_LATENCY", "0"))
+TOKENS = int(os.getenv("FAKE_OLLAMA_TOKENS", "48"))
+OUTPUT_FILE = os.getenv("FAKE_OLLAMA_OUTPUT_FILE")
+EMBED_DIM = int(os.getenv("FAKE_OLLAMA_EMBED_DIM", "64"))
+# /api/tags'te bildirilen modeller; yönlendiricinin model seçimini denemek için değiştirilebilir
+MODELS = os.getenv("FAKE_OLLAMA_MODELS", "llama3:8b,llama3.2:3b,nomic-embed-text").split(",")
+
+app = FastAPI(title="Fake Ollama")
+
+
+def test_plan_output():
+    # Test planı endpoint'lerinin ayrıştırabileceği geçerli bir görev dizisi
+    start = datetime.date.today()
+    tasks = []
+    for i, name in enumerate(["Test Strategy Definition", "Resource Estimation", "Risk Assessment", "Environment Setup"]):
+        begin = start + datetime.timedelta(days=i * 5)
+        tasks.append({
+            "Task Name": name,
+            "Description": f"{name} according to ISTQB.",
+            "Start Date": begin.isoformat(),
+            "End Date": (begin + datetime.timedelta(days=4)).isoformat(),
+            "Duration (days)": 5,
+        })
+    return json.dumps(tasks, indent=2)
+
+
+def quiz_output():
+    # JSON format modundaki quiz isteği için şemaya uygun bir çıktı
+    questions = [
+        {"question": f"Soru {i}?", "options": ["Birinci", "İkinci", "Üçüncü", "Dördüncü"], "answer": "ABCD"[i % 4]}
+        for i in range(5)
+    ]
+    return json.dumps({"questions": questions}, ensure_ascii=False)
+
+
+def output_for(payload):
+    if OUTPUT_FILE:
+        with open(OUTPUT_FILE, encoding="utf-8") as f:
+            return f.read()
+    if isinstance(payload.get("format"), dict) and "questions" in payload["format"].get("properties", {}):
+        return quiz_output()
+    if "ISTQB" in payload.get("system", "") + payload.get("prompt", "")[:2000]:
+        return test_plan_output()
+    return " ".join(f"kelime{i}" for i in range(TOKENS))
+
+
+def split_tokens(text):
+    # Gerçek tokenizer yerine ~4 karakterlik parçalar
+    return [text[i:i + 4] for i in range(0, len(text), 4)] or [""]
+
+
+def stats(prompt, tokens, started):
+    elapsed = int((time.perf_counter() - started) * 1e9)
+    return {
+        "total_duration": elapsed,
+        "load_duration": int(LOAD_LATENCY * 1e9),
+        "prompt_eval_count": max(1, len(prompt) // 4),
+        "prompt_eval_duration": 0,
+        "eval_count": len(tokens),
+        "eval_duration": elapsed,
+    }
+
+
+@app.post("/api/generate")
+async def generate(request: Request):
+    payload = await request.json()
+    started = time.perf_counter()
+    prompt = payload.get("system", "") + payload.get("prompt", "")
+    tokens = split_tokens(output_for(payload))
+    if payload.get("options", {}).get("num_predict") == 1:
+        tokens = tokens[:1]
+    model = payload.get("model", "llama3:8b")
+
+    if not payload.get("stream", True):
+        await asyncio.sleep(LOAD_LATENCY + TOKEN_LATENCY * len(tokens))
+        return {"model": model, "response": "".join(tokens), "done": True, **stats(prompt, tokens, started)}
+
+    async def chunks():
+        await asyncio.sleep(LOAD_LATENCY)
+        for token in tokens:
+            await asyncio.sleep(TOKEN_LATENCY)
+            yield json.dumps({"model": model, "response": token, "done": False}) + "\n"
+        yield json.dumps({"model": model, "response": "", "done": True, **stats(prompt, tokens, started)}) + "\n"
+
+    return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+
+@app.post("/api/embed")
+async def embed(request: Request):
+    payload = await request.json()
+    inputs = payload.get("input", [])
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    await asyncio.sleep(TOKEN_LATENCY)
+    embeddings = []
+    for text in inputs:
+        # Aynı metin her zaman aynı vektörü üretir
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        embeddings.append([(digest[i % len(digest)] - 128) / 128 for i in range(EMBED_DIM)])
+    return JSONResponse({"model": payload.get("model"), "embeddings": embeddings})
+
+
+@app.get("/api/tags")
+async def tags():
+    return {"models": [{"name": name} for name in MODELS]}
+
+
+def main():
+    global TOKEN_LATENCY, TOKENS, LOAD_LATENCY
+    parser = argparse.ArgumentParser(description="Sahte Ollama sunucusu")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--token-latency", type=float, default=TOKEN_LATENCY)
+    parser.add_argument("--load-latency", type=float, default=LOAD_LATENCY)
+    parser.add_argument("--tokens", type=int, default=TOKENS)
+    args = parser.parse_args()
+    TOKEN_LATENCY, TOKENS, LOAD_LATENCY = args.token_latency, args.tokens, args.load_latency
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""Üç FastAPI backend'i için çevrimdışı yük testi.
+
+Sahte Ollama sunucusunu ve seçilen backend'leri alt süreç olarak başlatır,
+her endpoint'i artan eşzamanlılık seviyelerinde belirli bir süre boyunca
+yükler ve throughput ile p50/p95/p99 gecikmelerini raporlar. Sonuçlar
+bench/baselines/ altına kaydedilebilir ve sonraki koşular bunlarla
+karşılaştırılarak gerilemeler (regression) yakalanır.
+
+Repo kökünden:
+
+    python -m bench.run --apps notes students --concurrency 1 8 32 --duration 10
+    python -m bench.run --save-baseline          # mevcut sonuçları baseline yap
+    python -m bench.run --compare                # baseline'a göre gerileme varsa çıkış kodu 1
+    python -m bench.run --ollama-hosts 3         # yönlendiriciyi üç sahte Ollama ile dene
+
+Gereksinim: erişilebilir bir MongoDB. Backend'ler text index, $merge ve
+GridFS kullandığından bellek içi bir yerine geçen (mongomock) yeterli değildir.
+--start-mongod PATH'teki mongod ile geçici bir örnek açar; aksi halde
+--mongo-uri (veya MONGO_URI) adresine bağlanılır. Mongo'ya ulaşılamazsa koşu
+başlamadan hata verir. Ağ erişimi gerekmez.
+
+Her yük worker'ı kendi X-Client-Id'siyle istek atar; yanıtlardaki 429'lar
+(Ollama kuyruğu dolu) hatalardan ayrı olarak "429" sütununda raporlanır.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+import httpx
+
+from bench.scenarios import SCENARIOS
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+
+APPS = {
+    "notes": {"app": "main:app", "app_dir": "LLM-Not-Defteri/backend", "port": 8101},
+    "test_planning": {"app": "main:app", "app_dir": "Test-Planning22/Test-Planning/backend", "port": 8102},
+    "students": {"app": "Student_Information_System.main:app", "app_dir": ".", "port": 8103},
+}
+FAKE_OLLAMA_PORT = 11500
+
+
+def start_process(args, env):
+    return subprocess.Popen(args, cwd=ROOT, env=env)
+
+
+def wait_until_ready(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} {timeout} saniyede hazır olmadı")
+
+
+def wait_for_mongo(uri, timeout=15):
+    # Bench pymongo'ya bağımlı olmasın diye yalnızca TCP bağlantısı denenir
+    parsed = urlparse(uri)
+    host, port = parsed.hostname or "localhost", parsed.port or 27017
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(
+        f"MongoDB'ye ulaşılamadı ({host}:{port}). Bench gerçek bir mongod gerektirir: "
+        "--start-mongod kullanın veya --mongo-uri ile çalışan bir örnek verin."
+    )
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+async def load_endpoint(client, endpoint, ctx, concurrency, duration):
+    latencies = []
+    errors = 0
+    throttled = 0
+    stop_at = time.perf_counter() + duration
+
+    async def worker(index):
+        nonlocal errors, throttled
+        # Her worker ayrı bir istemci gibi davranır (zamanlayıcının istemci başı adaleti için)
+        worker_ctx = {**ctx, "headers": {"X-Client-Id": f"bench-{concurrency}-{index}"}}
+        while time.perf_counter() < stop_at:
+            request_ctx = worker_ctx
+            if endpoint.prepare:
+                try:
+                    request_ctx = await endpoint.prepare(client, worker_ctx)
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+            started = time.perf_counter()
+            try:
+                response = await endpoint.call(client, request_ctx)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = None
+            if status is not None and status < 400:
+                latencies.append(time.perf_counter() - started)
+            elif status == 429:
+                throttled += 1
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throttled": throttled,
+        "rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": _ms(percentile(latencies, 50)),
+        "p95_ms": _ms(percentile(latencies, 95)),
+        "p99_ms": _ms(percentile(latencies, 99)),
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+async def bench_app(name, levels, duration):
+    setup, endpoints = SCENARIOS[name]
+    base_url = f"http://127.0.0.1:{APPS[name]['port']}"
+    limits = httpx.Limits(max_connections=max(levels) * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        ctx = await setup(client)
+        results = {}
+        for endpoint in endpoints:
+            results[endpoint.name] = {}
+            for level in levels:
+                stats = await load_endpoint(client, endpoint, ctx, level, duration)
+                results[endpoint.name][str(level)] = stats
+                print(
+                    f"{name:14} {endpoint.name:40} c={level:<4} "
+                    f"rps={stats['rps']:<8} p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms "
+                    f"p99={stats['p99_ms']}ms hata={stats['errors']} 429={stats['throttled']}"
+                )
+        return results
+
+
+def compare(name, results, tolerance):
+    """Baseline'a göre p95'i tolerans oranından fazla artan veya throughput'u düşen ölçümleri döndürür."""
+    path = BASELINE_DIR / f"{name}.json"
+    if not path.exists():
+        print(f"{name}: baseline yok, karşılaştırma atlandı")
+        return []
+    baseline = json.loads(path.read_text(encoding="utf-8"))
+    regressions = []
+    for endpoint, levels in results.items():
+        for level, stats in levels.items():
+            old = baseline.get(endpoint, {}).get(level)
+            if not old or not old.get("p95_ms") or stats["p95_ms"] is None:
+                continue
+            if stats["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{name} {endpoint} c={level}: p95 {old['p95_ms']}ms -> {stats['p95_ms']}ms")
+            if stats["rps"] < old["rps"] * (1 - tolerance):
+                regressions.append(f"{name} {endpoint} c={level}: rps {old['rps']} -> {stats['rps']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend yük testi (sahte Ollama ile)")
+    parser.add_argument("--apps", nargs="+", choices=list(APPS), default=list(APPS))
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16, 64])
+    parser.add_argument("--duration", type=float, default=10, help="Her seviye için saniye")
+    parser.add_argument("--token-latency", type=float, default=0.01)
+    parser.add_argument("--tokens", type=int, default=48)
+    parser.add_argument("--ollama-hosts", type=int, default=1, help="Başlatılacak sahte Ollama sunucusu sayısı")
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--start-mongod", action="store_true", help="Geçici bir mongod örneği başlat")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--output", help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    processes = []
+    mongod_dir = None
+    try:
+        mongo_uri = args.mongo_uri
+        if args.start_mongod:
+            mongod_dir = tempfile.mkdtemp(prefix="bench-mongod-")
+            processes.append(start_process(
+                ["mongod", "--dbpath", mongod_dir, "--port", "27099", "--bind_ip", "127.0.0.1", "--quiet"],
+                os.environ.copy(),
+            ))
+            mongo_uri = "mongodb://127.0.0.1:27099"
+        wait_for_mongo(mongo_uri)
+
+        ollama_ports = [FAKE_OLLAMA_PORT + i for i in range(args.ollama_hosts)]
+        env = os.environ.copy()
+        env.update({
+            "OLLAMA_URL": f"http://127.0.0.1:{FAKE_OLLAMA_PORT}",
+            "OLLAMA_URLS": ",".join(f"http://127.0.0.1:{port}" for port in ollama_ports),
+            "MONGO_URI": mongo_uri,
+            "FAKE_OLLAMA_TOKEN_LATENCY": str(args.token_latency),
+            "FAKE_OLLAMA_TOKENS": str(args.tokens),
+        })
+        for port in ollama_ports:
+            processes.append(start_process([sys.executable, "-m", "bench.fake_ollama", "--port", str(port)], env))
+        for port in ollama_ports:
+            wait_until_ready(f"http://127.0.0.1:{port}/api/tags")
+
+        for name in args.apps:
+            spec = APPS[name]
+            processes.append(start_process([
+                sys.executable, "-m", "uvicorn", spec["app"],
+                "--app-dir", spec["app_dir"], "--port", str(spec["port"]), "--log-level", "warning",
+            ], env))
+            wait_until_ready(f"http://127.0.0.1:{spec['port']}/docs")
+
+        all_results = {name: asyncio.run(bench_app(name, args.concurrency, args.duration)) for name in args.apps}
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if mongod_dir:
+            shutil.rmtree(mongod_dir, ignore_errors=True)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(all_results, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    if args.save_baseline:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        for name, results in all_results.items():
+            (BASELINE_DIR / f"{name}.json").write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Baseline kaydedildi: {BASELINE_DIR}")
+
+    if args.compare:
+        regressions = [r for name, results in all_results.items() for r in compare(name, results, args.tolerance)]
+        for regression in regressions:
+            print("GERİLEME:", regression)
+        if regressions:
+            sys.exit(1)
+        print("Baseline'a göre gerileme yok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Her backend için ölçülen endpoint senaryoları.
+
+Her senaryo bir kurulum (setup) fonksiyonu ve httpx.AsyncClient ile tek
+istek atan bir fonksiyondan oluşur. Kurulum, istekler için gereken
+kimlikleri (ör. örnek not id'leri) hazırlar. ctx["headers"] her yük
+worker'ına ayrı bir X-Client-Id taşır; böylece zamanlayıcının istemci başı
+kuyruk sınırı tek bir istemciye değil, gerçekçi biçimde dağıtılmış yüke uygulanır.
+"""
+import itertools
+import random
+import uuid
+
+SAMPLE_NOTE = (
+    "Fotosentez, bitkilerin ışık enerjisini kimyasal enerjiye dönüştürdüğü süreçtir. "
+    "Klorofil bu süreçte ışığı emer. Karbondioksit ve su kullanılarak glikoz ve oksijen üretilir. "
+)
+
+SAMPLE_SPEC = (
+    "The system shall allow users to register, log in and reset passwords. "
+    "Reports must be exported as PDF. Response times must stay under two seconds. "
+)
+
+
+class Endpoint:
+    def __init__(self, name, call, prepare=None):
+        self.name = name
+        self.call = call  # async call(client, ctx) -> httpx.Response
+        # Ölçülmeyen hazırlık adımı: async prepare(client, ctx) -> o isteğe özel ctx
+        self.prepare = prepare
+
+
+# --- LLM-Not-Defteri ---
+
+async def setup_notes(client):
+    note_ids = []
+    for i in range(20):
+        response = await client.post("/notes", json={"title": f"Bench Not {i}", "content": SAMPLE_NOTE * (i + 1)})
+        response.raise_for_status()
+        note_ids.append(response.json()["id"])
+    return {"note_ids": note_ids}
+
+
+def _note_id(ctx):
+    return random.choice(ctx["note_ids"])
+
+
+async def fresh_note(client, ctx):
+    # Her istek için benzersiz içerikli yeni not: özet/quiz önbelleğe düşmez, LLM gecikmesi ölçülür
+    response = await client.post(
+        "/notes",
+        json={"title": "Bench Soğuk", "content": f"{SAMPLE_NOTE} {uuid.uuid4().hex}"},
+        headers=ctx["headers"],
+    )
+    response.raise_for_status()
+    return {**ctx, "note_ids": [response.json()["id"]]}
+
+
+NOTES_ENDPOINTS = [
+    Endpoint("GET /notes", lambda c, ctx: c.get("/notes", params={"limit": 20}, headers=ctx["headers"])),
+    Endpoint("GET /notes/{id}", lambda c, ctx: c.get(f"/notes/{_note_id(ctx)}", headers=ctx["headers"])),
+    Endpoint("POST /notes", lambda c, ctx: c.post(
+        "/notes", json={"title": "Yük", "content": SAMPLE_NOTE}, headers=ctx["headers"]
+    )),
+    Endpoint("GET /notes/search", lambda c, ctx: c.get("/notes/search", params={"q": "fotosentez"}, headers=ctx["headers"])),
+    # "önbellek" varyantları aynı 20 notu tekrar ister (ilk turdan sonra önbellekten döner);
+    # "soğuk" varyantlar her istekte yeni not kullanır ve Ollama çağrısını ölçer
+    Endpoint("POST /notes/{id}/summarize önbellek", lambda c, ctx: c.post(
+        f"/notes/{_note_id(ctx)}/summarize", headers=ctx["headers"]
+    )),
+    Endpoint("POST /notes/{id}/summarize soğuk", lambda c, ctx: c.post(
+        f"/notes/{_note_id(ctx)}/summarize", headers=ctx["headers"]
+    ), prepare=fresh_note),
+    Endpoint("POST /translate", lambda c, ctx: c.post(
+        "/translate", json={"text": f"{SAMPLE_NOTE} {uuid.uuid4().hex}", "target_language": "İngilizce"},
+        headers=ctx["headers"],
+    )),
+    Endpoint("POST /notes/{id}/quiz önbellek", lambda c, ctx: c.post(f"/notes/{_note_id(ctx)}/quiz", headers=ctx["headers"])),
+    Endpoint("POST /notes/{id}/quiz soğuk", lambda c, ctx: c.post(
+        f"/notes/{_note_id(ctx)}/quiz", headers=ctx["headers"]
+    ), prepare=fresh_note),
+]
+
+
+# --- Test-Planning22 ---
+
+async def setup_test_planning(client):
+    return {"counter": itertools.count()}
+
+
+def _unique_spec(ctx):
+    # Tekilleştirme (dedupe) ölçümü bozmasın diye her istek farklı içerik gönderir
+    return {"content": f"{SAMPLE_SPEC} #{next(ctx['counter'])}-{uuid.uuid4().hex}"}
+
+
+TEST_PLANNING_ENDPOINTS = [
+    Endpoint("POST /generate_test_plan", lambda c, ctx: c.post(
+        "/generate_test_plan", json=_unique_spec(ctx), headers=ctx["headers"]
+    )),
+    Endpoint("POST /test_plan_jobs", lambda c, ctx: c.post("/test_plan_jobs", json=_unique_spec(ctx), headers=ctx["headers"])),
+]
+
+
+# --- Student_Information_System ---
+
+async def setup_students(client):
+    return {"counter": itertools.count()}
+
+
+def _student(ctx):
+    n = next(ctx["counter"])
+    return {
+        "student_id": f"B{uuid.uuid4().hex[:10]}{n}",
+        "first_name": "Bench",
+        "last_name": f"Öğrenci{n}",
+        "age": 20 + n % 10,
+        "courses": [{"course_name": "Matematik", "grade": random.choice("ABCDF")}],
+    }
+
+
+STUDENT_ENDPOINTS = [
+    Endpoint("GET /students", lambda c, ctx: c.get("/students", params={"limit": 50}, headers=ctx["headers"])),
+    Endpoint("POST /add_student", lambda c, ctx: c.post("/add_student", json=_student(ctx), headers=ctx["headers"])),
+]
+
+
+SCENARIOS = {
+    "notes": (setup_notes, NOTES_ENDPOINTS),
+    "test_planning": (setup_test_planning, TEST_PLANNING_ENDPOINTS),
+    "students": (setup_students, STUDENT_ENDPOINTS),
+}
@@ -0,0 +1 @@
+# Üç backend'in (LLM-Not-Defteri, Test-Planning, Student_Information_System) ortak kullandığı modüller
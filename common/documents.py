@@ -0,0 +1,235 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+
+from fastapi import HTTPException, Request
+
+# Yüklenebilecek en büyük dosya ve dokümandan çıkarılabilecek en uzun metin
+MAX_UPLOAD_BYTES = int(os.getenv("DOCUMENT_MAX_BYTES", str(20 * 1024 * 1024)))
+MAX_TEXT_CHARS = int(os.getenv("DOCUMENT_MAX_TEXT_CHARS", "2000000"))
+EXTRACT_WORKERS = int(os.getenv("DOCUMENT_EXTRACT_WORKERS", "2"))
+EXTRACT_TIMEOUT = float(os.getenv("DOCUMENT_EXTRACT_TIMEOUT", "60"))
+# Multipart sınırları ve başlıkları için dosya boyutunun üzerine tanınan pay
+MULTIPART_OVERHEAD = 64 * 1024
+COPY_CHUNK_SIZE = 1024 * 1024
+
+SUPPORTED_KINDS = ("txt", "pdf", "docx")
+
+
+def detect_kind(filename, head):
+    """Dosya türünü önce içeriğin ilk baytlarından, sonra uzantıdan belirler."""
+    if head.startswith(b"%PDF"):
+        return "pdf"
+    extension = os.path.splitext(filename or "")[1].lower().lstrip(".")
+    if head.startswith(b"PK\x03\x04") and extension == "docx":
+        return "docx"
+    if extension == "txt" or (extension not in SUPPORTED_KINDS and b"\x00" not in head):
+        return "txt"
+    return None
+
+
+def _extract_txt(path):
+    with open(path, "rb") as f:
+        raw = f.read()
+    # Türkçe Windows kaynaklı dosyalar için cp1254 denenir; son çare latin-1 her zaman çözer
+    for encoding in ("utf-8-sig", "cp1254", "latin-1"):
+        try:
+            return raw.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+
+
+def _extract_pdf(path):
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    return "\n\n".join((page.extract_text() or "").strip() for page in reader.pages).strip()
+
+
+def _extract_docx(path):
+    import docx
+
+    document = docx.Document(path)
+    parts = [paragraph.text for paragraph in document.paragraphs if paragraph.text.strip()]
+    for table in document.tables:
+        for row in table.rows:
+            cells = [cell.text.strip() for cell in row.cells if cell.text.strip()]
+            if cells:
+                parts.append(" | ".join(cells))
+    return "\n".join(parts)
+
+
+def extract_text(path, kind):
+    """Süreç havuzunda çalışır; dokümanın düz metnini döndürür."""
+    extractors = {"txt": _extract_txt, "pdf": _extract_pdf, "docx": _extract_docx}
+    return extractors[kind](path)
+
+
+async def receive_upload(request: Request, field="file", max_bytes=MAX_UPLOAD_BYTES):
+    """Multipart gövdeyi boyut sınırı altında akış halinde okur ve yüklenen dosyayı döndürür.
+
+    Gövde FastAPI'nin UploadFile parametresiyle değil burada okunur; böylece sınır
+    aşıldığı anda (Content-Length yoksa bile) okuma kesilip 413 döndürülür.
+    Starlette dosyayı 1 MB'tan sonra diske taşıdığı için bellek kullanımı sınırlı kalır.
+    """
+    limit = max_bytes + MULTIPART_OVERHEAD
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > limit:
+        raise HTTPException(status_code=413, detail=f"Dosya en fazla {max_bytes // (1024 * 1024)} MB olabilir")
+
+    received = 0
+
+    async def limited_receive():
+        nonlocal received
+        message = await request.receive()
+        received += len(message.get("body", b""))
+        if received > limit:
+            raise HTTPException(status_code=413, detail=f"Dosya en fazla {max_bytes // (1024 * 1024)} MB olabilir")
+        return message
+
+    form = await Request(request.scope, limited_receive).form(max_files=1, max_fields=10)
+    upload = form.get(field)
+    if upload is None or isinstance(upload, str):
+        raise HTTPException(status_code=400, detail=f"'{field}' alanında dosya bulunamadı")
+    return upload
+
+
+class DocumentExtractor:
+    """Yüklenen PDF/DOCX/TXT dosyalarından metin çıkaran servis.
+
+    Ayrıştırma süreç havuzunda yapılır; event loop hiçbir zaman doküman işlemez.
+    Sonuçlar içeriğin SHA-256 hash'iyle önce süreç içi bir LRU'da, cache
+    koleksiyonu verilmişse Mongo'da saklanır; aynı dosya tekrar ayrıştırılmaz.
+    """
+
+    def __init__(self, cache=None, workers=EXTRACT_WORKERS, timeout=EXTRACT_TIMEOUT, memory_cache_size=32,
+                 ttl_seconds=30 * 24 * 3600):
+        self.cache = cache
+        self.workers = workers
+        self.timeout = timeout
+        self.memory_cache_size = memory_cache_size
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()
+        self._pool = None
+
+    async def start(self):
+        if self.cache is not None:
+            await self.cache.create_index("created_at", expireAfterSeconds=self.ttl_seconds)
+        self._pool = self._new_pool()
+
+    def _new_pool(self):
+        # fork yerine spawn: açık Mongo/HTTP bağlantıları ve thread'ler alt süreçlere kopyalanmaz
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def _reset_pool(self, pool):
+        """Zaman aşımında havuz yenilenir; takılan worker'lar sonlandırılır.
+
+        wait_for yalnızca beklemeyi bırakır, süreç ayrıştırmaya devam eder; havuz
+        yenilenmezse birkaç yavaş/kötü niyetli PDF tüm worker'ları kalıcı olarak doldurur.
+        """
+        if pool is not self._pool:
+            return  # Eşzamanlı başka bir zaman aşımı havuzu zaten yeniledi
+        self._pool = self._new_pool()
+        for process in list((pool._processes or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _remember(self, doc):
+        self._memory[doc["_id"]] = doc
+        self._memory.move_to_end(doc["_id"])
+        while len(self._memory) > self.memory_cache_size:
+            self._memory.popitem(last=False)
+
+    async def get(self, document_id):
+        doc = self._memory.get(document_id)
+        if doc is None and self.cache is not None:
+            doc = await self.cache.find_one({"_id": document_id})
+            if doc is not None:
+                self._remember(doc)
+        return doc
+
+    async def get_text(self, document_id):
+        doc = await self.get(document_id)
+        return doc["text"] if doc else None
+
+    async def ingest(self, upload):
+        """Yüklenen dosyayı geçici dosyaya kopyalarken hash'ler, gerekirse metnini çıkarır."""
+        path, digest, size, head = await asyncio.to_thread(self._spool, upload.file)
+        try:
+            doc = await self.get(digest)
+            cache_status = "hit"
+            if doc is None:
+                cache_status = "miss"
+                doc = await self._extract(path, digest, size, upload.filename, head)
+        finally:
+            os.unlink(path)
+        return {
+            "document_id": doc["_id"],
+            "filename": upload.filename,
+            "kind": doc["kind"],
+            "size": doc["size"],
+            "chars": len(doc["text"]),
+            "preview": doc["text"][:2000],
+            "cache": cache_status,
+        }
+
+    @staticmethod
+    def _spool(source):
+        digest = hashlib.sha256()
+        size = 0
+        head = b""
+        with tempfile.NamedTemporaryFile(prefix="upload-", delete=False) as target:
+            while chunk := source.read(COPY_CHUNK_SIZE):
+                if not head:
+                    head = chunk[:8]
+                digest.update(chunk)
+                size += len(chunk)
+                target.write(chunk)
+        return target.name, digest.hexdigest(), size, head
+
+    async def _extract(self, path, digest, size, filename, head):
+        kind = detect_kind(filename, head)
+        if kind is None:
+            raise HTTPException(status_code=415, detail="Yalnızca TXT, PDF ve DOCX dosyaları desteklenir")
+        if self._pool is None:
+            await self.start()
+        loop = asyncio.get_running_loop()
+        pool = self._pool
+        try:
+            try:
+                text = await asyncio.wait_for(loop.run_in_executor(pool, extract_text, path, kind), self.timeout)
+            except BrokenProcessPool:
+                # Başka bir isteğin zaman aşımı havuzu yeniledi; bu istek yeni havuzda bir kez denenir
+                if pool is self._pool:
+                    raise
+                pool = self._pool
+                text = await asyncio.wait_for(loop.run_in_executor(pool, extract_text, path, kind), self.timeout)
+        except asyncio.TimeoutError:
+            self._reset_pool(pool)
+            raise HTTPException(status_code=422, detail="Doküman zaman sınırı içinde ayrıştırılamadı")
+        except Exception as e:
+            print("Doküman ayrıştırılamadı:", e)
+            raise HTTPException(status_code=422, detail=f"Doküman okunamadı ({kind})")
+
+        text = (text or "").strip()
+        if not text:
+            raise HTTPException(status_code=422, detail="Dokümandan metin çıkarılamadı")
+        if len(text) > MAX_TEXT_CHARS:
+            raise HTTPException(status_code=413, detail=f"Doküman metni en fazla {MAX_TEXT_CHARS} karakter olabilir")
+
+        doc = {"_id": digest, "kind": kind, "size": size, "text": text, "created_at": datetime.now(timezone.utc)}
+        self._remember(doc)
+        if self.cache is not None:
+            await self.cache.update_one({"_id": digest}, {"$set": {k: v for k, v in doc.items() if k != "_id"}}, upsert=True)
+        return doc
@@ -0,0 +1,56 @@
+import hashlib
+import json
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Response
+
+
+def make_etag(*parts):
+    """Verilen parçalardan (sürüm, sorgu, doküman vb.) tırnaklı bir ETag üretir."""
+    digest = hashlib.sha1()
+    for part in parts:
+        if not isinstance(part, (str, bytes)):
+            part = json.dumps(part, sort_keys=True, default=str, ensure_ascii=False)
+        digest.update(part.encode("utf-8") if isinstance(part, str) else part)
+        digest.update(b"\x00")
+    return f'"{digest.hexdigest()[:20]}"'
+
+
+def http_date(value):
+    # Mongo'dan gelen naive datetime'lar UTC kabul edilir; HTTP tarihleri saniye hassasiyetindedir
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+
+def cache_headers(etag, last_modified=None):
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def is_not_modified(request, etag, last_modified=None):
+    """İstemcinin elindeki kopya hâlâ geçerliyse True döner.
+
+    If-None-Match varsa yalnızca ona bakılır (RFC 9110); yoksa If-Modified-Since kullanılır.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in candidates or etag in candidates
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return parsedate_to_datetime(http_date(last_modified)) <= since
+    return False
+
+
+def not_modified_response(etag, last_modified=None):
+    return Response(status_code=304, headers=cache_headers(etag, last_modified))
@@ -0,0 +1,95 @@
+class JsonArrayElements:
+    """Parça parça gelen bir JSON dizisinin üst seviye elemanlarını tamamlandıkça döndürür.
+
+    İlk '[' karakterinden önceki metin yok sayılır (LLM çıktısındaki açıklamalar
+    gibi), kapanış ']' görüldüğünde ayrıştırma biter. Yalnızca o anda okunan
+    eleman tamponlanır; her eleman (ham metin, başladığı satır) olarak döner.
+    Elemanlar ayrıştırılmaz: nesne, dizi veya skaler olabilir, bozuk da olabilir;
+    doğrulama çağırana aittir.
+    """
+
+    def __init__(self):
+        self.started = False
+        self.finished = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.scalar = False
+        self.buffer = []
+        self.line = 1
+        self.start_line = 1
+
+    def _emit(self):
+        element = ("".join(self.buffer), self.start_line)
+        self.buffer = []
+        return element
+
+    def feed(self, text):
+        """Yeni metin parçasını işler ve tamamlanan elemanları döndürür."""
+        elements = []
+        for char in text:
+            if self.finished:
+                break
+            if char == "\n":
+                self.line += 1
+            if not self.started:
+                if char == "[":
+                    self.started = True
+                continue
+
+            if self.scalar:
+                # Sayı/true/false/null: ayırıcıya kadar sürer
+                if char == "," or char == "]" or char.isspace():
+                    self.scalar = False
+                    elements.append(self._emit())
+                    if char == "]":
+                        self.finished = True
+                else:
+                    self.buffer.append(char)
+                continue
+
+            if self.depth == 0 and not self.in_string:
+                # Elemanlar arası: boşluk ve virgüller atlanır
+                if char == "," or char.isspace():
+                    continue
+                if char == "]":
+                    self.finished = True
+                    continue
+                self.buffer = [char]
+                self.start_line = self.line
+                if char in "{[":
+                    self.depth = 1
+                elif char == '"':
+                    self.in_string = True
+                else:
+                    self.scalar = True
+                continue
+
+            self.buffer.append(char)
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                    if self.depth == 0:
+                        elements.append(self._emit())
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+            elif char in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    elements.append(self._emit())
+        return elements
+
+    def close(self):
+        """Girdi bittiğinde çağrılır; sonda yarım kalmış eleman varsa onu döndürür."""
+        if self.scalar:
+            self.scalar = False
+            return [self._emit()]
+        if self.buffer:
+            return [self._emit()]
+        return []
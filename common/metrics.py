@@ -0,0 +1,147 @@
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+
+from fastapi import Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from pymongo import monitoring
+
+# LLM çağrıları saniyeler-dakikalar sürebildiği için kovalar geniş tutulur
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP istek süresi", ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Şu anda işlenen istek sayısı", ["method"])
+
+MONGO_LATENCY = Histogram(
+    "mongo_operation_duration_seconds", "MongoDB komut süresi", ["command", "collection"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+MONGO_FAILURES = Counter("mongo_operation_failures_total", "Başarısız MongoDB komutları", ["command", "collection"])
+
+OLLAMA_LATENCY = Histogram("ollama_request_duration_seconds", "Ollama çağrı süresi", ["model", "endpoint"], buckets=LLM_BUCKETS)
+OLLAMA_TTFT = Histogram("ollama_time_to_first_token_seconds", "İlk token'a kadar geçen süre", ["model"], buckets=LLM_BUCKETS)
+OLLAMA_TOKENS_PER_SECOND = Histogram(
+    "ollama_tokens_per_second", "Üretim hızı (eval_count / eval_duration)", ["model"],
+    buckets=(1, 2, 5, 10, 15, 20, 30, 40, 60, 80, 120, 200),
+)
+OLLAMA_PROMPT_TOKENS = Counter("ollama_prompt_tokens_total", "Prompt token sayısı (prompt_eval_count)", ["model"])
+OLLAMA_COMPLETION_TOKENS = Counter("ollama_completion_tokens_total", "Üretilen token sayısı (eval_count)", ["model"])
+OLLAMA_LOAD_SECONDS = Counter("ollama_load_duration_seconds_total", "Model yükleme süresi (load_duration)", ["model"])
+OLLAMA_ERRORS = Counter("ollama_errors_total", "Başarısız Ollama çağrıları", ["model", "endpoint"])
+OLLAMA_QUEUE_DEPTH = Gauge("ollama_queue_depth", "Ollama için sırada bekleyen çağrılar", ["priority"])
+OLLAMA_ACTIVE_REQUESTS = Gauge("ollama_active_requests", "Ollama'da çalışan çağrı sayısı")
+OLLAMA_QUEUE_REJECTIONS = Counter("ollama_queue_rejections_total", "Kuyruk dolu olduğu için reddedilen çağrılar", ["priority"])
+OLLAMA_HOST_HEALTHY = Gauge("ollama_host_healthy", "Ollama sunucusu havuzda mı (1/0)", ["host"])
+OLLAMA_HOST_OUTSTANDING = Gauge("ollama_host_outstanding_requests", "Sunucuda bekleyen istek sayısı", ["host"])
+
+
+def record_ollama_response(model, endpoint, response, elapsed, ttft=None):
+    """Ollama'nın son yanıtındaki sayaçları ve ölçülen süreleri metriklere işler."""
+    OLLAMA_LATENCY.labels(model, endpoint).observe(elapsed)
+    if ttft is not None:
+        OLLAMA_TTFT.labels(model).observe(ttft)
+    if "prompt_eval_count" in response:
+        OLLAMA_PROMPT_TOKENS.labels(model).inc(response["prompt_eval_count"])
+    if "eval_count" in response:
+        OLLAMA_COMPLETION_TOKENS.labels(model).inc(response["eval_count"])
+        if response.get("eval_duration"):
+            OLLAMA_TOKENS_PER_SECOND.labels(model).observe(response["eval_count"] / (response["eval_duration"] / 1e9))
+    if response.get("load_duration"):
+        OLLAMA_LOAD_SECONDS.labels(model).inc(response["load_duration"] / 1e9)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo komut olaylarından süre ölçer; MongoClient(event_listeners=[...]) ile bağlanır."""
+
+    def __init__(self):
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(event):
+        return (event.request_id, event.connection_id)
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        with self._lock:
+            self._collections[self._key(event)] = collection if isinstance(collection, str) else ""
+
+    def _pop(self, event):
+        with self._lock:
+            return self._collections.pop(self._key(event), "")
+
+    def succeeded(self, event):
+        MONGO_LATENCY.labels(event.command_name, self._pop(event)).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._pop(event)
+        MONGO_LATENCY.labels(event.command_name, collection).observe(event.duration_micros / 1e6)
+        MONGO_FAILURES.labels(event.command_name, collection).inc()
+
+
+mongo_command_metrics = MongoCommandMetrics()
+
+# --- İsteğe bağlı (opt-in) profil çıkarma ---
+# PROFILING_ENABLED=1 iken "X-Profile: 1" başlığıyla gelen istek cProfile ile profillenir,
+# en pahalı 30 fonksiyon PROFILE_DIR altına yazılır. Aynı anda tek istek profillenir.
+# Dikkat: cProfile event loop thread'inin tamamında çalışır; profil yalnızca o isteği değil,
+# istek sürerken aynı süreçte çalışan tüm eşzamanlı istekleri de içerir (süreç geneli).
+# Temiz ölçüm için profil yükün olmadığı bir anda alınmalıdır.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+_profile_lock = threading.Lock()
+
+
+def _write_profile(profiler, method, path):
+    """Profil özetini dosyaya yazar; event loop'u bloklamamak için thread'de çağrılır."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(30)
+    name = f"{int(time.time() * 1000)}_{method}_{path.strip('/').replace('/', '_') or 'root'}.txt"
+    file_path = os.path.join(PROFILE_DIR, name)
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write(output.getvalue())
+    return file_path
+
+
+def install_metrics(app):
+    """Uygulamaya ölçüm middleware'ini ve Prometheus formatında /metrics endpoint'ini ekler."""
+
+    @app.middleware("http")
+    async def metrics_middleware(request: Request, call_next):
+        method = request.method
+        profiler = None
+        if PROFILING_ENABLED and request.headers.get("x-profile") == "1" and _profile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        HTTP_IN_FLIGHT.labels(method).inc()
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.labels(method).dec()
+            # Yüksek kardinaliteyi önlemek için gerçek path yerine route şablonu kullanılır
+            route = request.scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            HTTP_LATENCY.labels(method, route_path, str(status)).observe(elapsed)
+            if profiler is not None:
+                profiler.disable()
+                _profile_lock.release()
+                file_path = await asyncio.to_thread(_write_profile, profiler, method, route_path)
+                print("Profil kaydedildi (süreç geneli):", file_path)
+        return response
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,149 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from pymongo import MongoClient
+
+from common.metrics import mongo_command_metrics
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+
+
+class AsyncCollection:
+    """pymongo koleksiyonunun async karşılığı.
+
+    Her çağrı sınırlı bir thread havuzunda çalıştırılır; event loop hiçbir
+    zaman Mongo ağ trafiğini beklemez. Koleksiyon ilk kullanımda çözülür,
+    böylece modül seviyesinde tanımlanıp bağlantı lifespan'de açılabilir.
+    """
+
+    def __init__(self, mongo, name):
+        self._mongo = mongo
+        self.name = name
+
+    @property
+    def sync(self):
+        return self._mongo.db[self.name]
+
+    async def _run(self, method, *args, **kwargs):
+        return await self._mongo.run(partial(getattr(self.sync, method), *args, **kwargs))
+
+    async def find_one(self, *args, **kwargs):
+        return await self._run("find_one", *args, **kwargs)
+
+    async def find(self, filter=None, projection=None, sort=None, limit=0, skip=0):
+        # İmleç thread içinde tüketilir; sonuç liste olarak döner
+        def fetch():
+            cursor = self.sync.find(filter or {}, projection, skip=skip, limit=limit)
+            if sort:
+                cursor = cursor.sort(sort)
+            return list(cursor)
+        return await self._mongo.run(fetch)
+
+    async def insert_one(self, *args, **kwargs):
+        return await self._run("insert_one", *args, **kwargs)
+
+    async def insert_many(self, *args, **kwargs):
+        return await self._run("insert_many", *args, **kwargs)
+
+    async def update_one(self, *args, **kwargs):
+        return await self._run("update_one", *args, **kwargs)
+
+    async def update_many(self, *args, **kwargs):
+        return await self._run("update_many", *args, **kwargs)
+
+    async def find_one_and_update(self, *args, **kwargs):
+        return await self._run("find_one_and_update", *args, **kwargs)
+
+    async def delete_one(self, *args, **kwargs):
+        return await self._run("delete_one", *args, **kwargs)
+
+    async def delete_many(self, *args, **kwargs):
+        return await self._run("delete_many", *args, **kwargs)
+
+    async def count_documents(self, *args, **kwargs):
+        return await self._run("count_documents", *args, **kwargs)
+
+    async def bulk_write(self, *args, **kwargs):
+        return await self._run("bulk_write", *args, **kwargs)
+
+    async def aggregate(self, pipeline, **kwargs):
+        return await self._mongo.run(lambda: list(self.sync.aggregate(pipeline, **kwargs)))
+
+    async def create_index(self, *args, **kwargs):
+        return await self._run("create_index", *args, **kwargs)
+
+
+class AsyncMongo:
+    """Bağlantı havuzu ayarlı MongoClient + sınırlı thread havuzu.
+
+    connect() uygulama lifespan'inde çağrılır. Testlerde client_factory ile
+    mongomock.MongoClient gibi bellek içi bir yerine geçen verilebilir.
+    """
+
+    def __init__(
+        self,
+        db_name,
+        uri=MONGO_URI,
+        max_pool_size=50,
+        min_pool_size=0,
+        server_selection_timeout_ms=5000,
+        max_workers=None,
+        client_factory=MongoClient,
+    ):
+        self.db_name = db_name
+        self.uri = uri
+        self.max_pool_size = max_pool_size
+        self.min_pool_size = min_pool_size
+        self.server_selection_timeout_ms = server_selection_timeout_ms
+        # Thread sayısı havuz boyutunu aşmamalı; fazlası zaten bağlantı bekler
+        self.max_workers = max_workers or min(max_pool_size, 32)
+        self.client_factory = client_factory
+        self.client = None
+        self.db = None
+        self._executor = None
+
+    @classmethod
+    def from_env(cls, db_name, **kwargs):
+        return cls(
+            db_name,
+            uri=MONGO_URI,
+            max_pool_size=int(os.getenv("MONGO_MAX_POOL_SIZE", "50")),
+            server_selection_timeout_ms=int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+            **kwargs,
+        )
+
+    async def connect(self):
+        if self.client is not None:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="mongo")
+        if self.client_factory is MongoClient:
+            self.client = MongoClient(
+                self.uri,
+                maxPoolSize=self.max_pool_size,
+                minPoolSize=self.min_pool_size,
+                serverSelectionTimeoutMS=self.server_selection_timeout_ms,
+                event_listeners=[mongo_command_metrics],
+            )
+        else:
+            self.client = self.client_factory()
+        self.db = self.client[self.db_name]
+
+    async def close(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+            self.db = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def run(self, func):
+        if self._executor is None:
+            raise RuntimeError("MongoDB bağlantısı açılmadı; önce connect() çağrılmalı")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func)
+
+    def collection(self, name):
+        return AsyncCollection(self, name)
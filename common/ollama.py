@@ -0,0 +1,278 @@
+import asyncio
+import json
+import os
+import random
+import time
+
+import httpx
+
+from common.metrics import OLLAMA_ERRORS, record_ollama_response
+from common.ollama_router import OllamaRouter
+from common.scheduler import PriorityScheduler
+
+# Ollama'nın çalıştığı URL (varsayılan olarak localhost:11434)
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+# Birden fazla sunucu için virgülle ayrılmış liste; verilmezse yalnızca OLLAMA_URL kullanılır
+OLLAMA_URLS = [url.strip() for url in os.getenv("OLLAMA_URLS", OLLAMA_URL).split(",") if url.strip()]
+DEFAULT_MODEL = os.getenv("OLLAMA_MODEL", "llama3:8b")
+# Model bellekte ne kadar süre sıcak tutulacak (Ollama keep_alive)
+KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+# Isınma isteğinin kullanıcı mesajı; system ön ekinin prefill edilmesi için boş olmamalı
+WARM_UP_PROMPT = "Merhaba"
+# Gömme (embedding) vektörleri için kullanılan model
+EMBED_MODEL = os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
+
+# Kısa çeviriler küçük modelle yapılır; OLLAMA_SMALL_MODEL boş bırakılırsa devre dışı kalır
+SMALL_MODEL = os.getenv("OLLAMA_SMALL_MODEL", "llama3.2:3b")
+SMALL_INPUT_CHARS = int(os.getenv("OLLAMA_SMALL_INPUT_CHARS", "400"))
+# Görev başına model; OLLAMA_MODEL_<GÖREV> (ör. OLLAMA_MODEL_QUIZ) ile değiştirilebilir
+TASK_MODELS = {
+    task: os.getenv(f"OLLAMA_MODEL_{task.upper()}", DEFAULT_MODEL)
+    for task in ("summary", "translate", "quiz", "test_plan")
+}
+
+
+def select_model(task, text=""):
+    """Görev ve girdi boyutuna göre kullanılacak modeli seçer."""
+    if task == "translate" and SMALL_MODEL and len(text) <= SMALL_INPUT_CHARS:
+        return SMALL_MODEL
+    return TASK_MODELS.get(task, DEFAULT_MODEL)
+
+# Ollama'nın son yanıt parçasında döndürdüğü performans alanları
+STAT_FIELDS = ("total_duration", "load_duration", "prompt_eval_count", "prompt_eval_duration", "eval_count", "eval_duration")
+
+
+def ollama_stats(response):
+    """Ollama yanıtından (veya son akış parçasından) sayaç ve süre alanlarını ayıklar."""
+    return {field: response[field] for field in STAT_FIELDS if field in response}
+
+# Geçici kabul edilen ve tekrar denenen HTTP durum kodları
+RETRY_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class OllamaError(Exception):
+    """Ollama'ya ulaşılamadığında veya hata yanıtı döndüğünde fırlatılır."""
+
+    def __init__(self, message, status_code=None, text=""):
+        super().__init__(message)
+        self.status_code = status_code
+        self.text = text
+
+
+class OllamaClient:
+    """Tüm LLM endpoint'lerinin paylaştığı, bağlantı havuzlu async Ollama istemcisi.
+
+    Tek bir httpx.AsyncClient keep-alive bağlantılarını yeniden kullanır,
+    öncelikli zamanlayıcı (scheduler) aynı anda Ollama'ya giden istek sayısını
+    sınırlar ve bekleyenleri sıraya koyar, yönlendirici (router) istekleri
+    sunucu havuzuna dağıtır; geçici hatalar üstel geri çekilme (backoff) ile
+    mümkünse başka bir sunucuda tekrar denenir.
+    """
+
+    def __init__(
+        self,
+        urls=(OLLAMA_URL,),
+        connect_timeout=5.0,
+        read_timeout=300.0,
+        max_concurrency=4,
+        max_connections=20,
+        max_keepalive=10,
+        max_retries=2,
+        backoff=0.5,
+        max_queue=32,
+        max_queue_per_client=8,
+        health_interval=10.0,
+        max_host_failures=3,
+    ):
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+        )
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.scheduler = PriorityScheduler(max_concurrency, max_queue, max_queue_per_client)
+        self.router = OllamaRouter(urls, max_failures=max_host_failures, health_interval=health_interval)
+        self._client = None
+
+    @classmethod
+    def from_env(cls):
+        # Ayarlar ortam değişkenlerinden okunur, yoksa varsayılanlar kullanılır
+        return cls(
+            urls=OLLAMA_URLS,
+            connect_timeout=float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5")),
+            read_timeout=float(os.getenv("OLLAMA_READ_TIMEOUT", "300")),
+            max_concurrency=int(os.getenv("OLLAMA_MAX_CONCURRENCY", "4")),
+            max_connections=int(os.getenv("OLLAMA_MAX_CONNECTIONS", "20")),
+            max_retries=int(os.getenv("OLLAMA_MAX_RETRIES", "2")),
+            backoff=float(os.getenv("OLLAMA_RETRY_BACKOFF", "0.5")),
+            max_queue=int(os.getenv("OLLAMA_MAX_QUEUE", "32")),
+            max_queue_per_client=int(os.getenv("OLLAMA_MAX_QUEUE_PER_CLIENT", "8")),
+            health_interval=float(os.getenv("OLLAMA_HEALTH_INTERVAL", "10")),
+            max_host_failures=int(os.getenv("OLLAMA_MAX_HOST_FAILURES", "3")),
+        )
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+            self.router.start(self._client)
+
+    async def close(self):
+        if self._client is not None:
+            await self.router.stop()
+            await self._client.aclose()
+            self._client = None
+
+    async def _sleep_before_retry(self, attempt):
+        # Üstel geri çekilme + küçük rastgele sapma (jitter)
+        delay = self.backoff * (2 ** attempt)
+        await asyncio.sleep(delay + random.uniform(0, delay / 2))
+
+    async def post(self, path, payload, host=None):
+        """Ollama'ya JSON POST atar, geçici hatalarda tekrar dener ve yanıt JSON'unu döndürür."""
+        model = payload.get("model", "")
+        started = time.perf_counter()
+        try:
+            result = await self._post(path, payload, host)
+        except OllamaError:
+            OLLAMA_ERRORS.labels(model, path).inc()
+            raise
+        record_ollama_response(model, path, result, time.perf_counter() - started)
+        return result
+
+    async def _post(self, path, payload, host=None):
+        await self.start()
+        tried = []
+        async with self.scheduler.slot():
+            for attempt in range(self.max_retries + 1):
+                last_attempt = attempt == self.max_retries
+                connect_error = None
+                async with self.router.lease(payload.get("model"), exclude=tried, host=host) as target:
+                    try:
+                        response = await self._client.post(target.url + path, json=payload)
+                    except (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError) as e:
+                        self.router.report_failure(target)
+                        connect_error = e
+                    except httpx.HTTPError as e:
+                        # Okuma zaman aşımı gibi hatalar tekrar denenmez; üretim zaten uzun sürmüştür
+                        raise OllamaError(f"Ollama'ya bağlanılamadı ({target.url}): {e}") from e
+
+                # Tekrar deneme mümkünse başka bir sunucuya gider
+                tried.append(target)
+                if connect_error is not None:
+                    if last_attempt:
+                        raise OllamaError(f"Ollama'ya bağlanılamadı ({target.url}): {connect_error}") from connect_error
+                    await self._sleep_before_retry(attempt)
+                    continue
+
+                self.router.report_status(target, response.status_code)
+                if response.status_code == 200:
+                    return response.json()
+                if response.status_code in RETRY_STATUS_CODES and not last_attempt:
+                    await self._sleep_before_retry(attempt)
+                    continue
+                raise OllamaError(
+                    f"Ollama API hatası: {response.status_code} - {response.text}",
+                    status_code=response.status_code,
+                    text=response.text,
+                )
+
+    async def generate(self, prompt, model=DEFAULT_MODEL, **options):
+        """/api/generate çağrısı (stream kapalı); Ollama'nın tam yanıt JSON'unu döndürür."""
+        payload = {"model": model, "prompt": prompt, "stream": False, "keep_alive": KEEP_ALIVE}
+        payload.update(options)
+        return await self.post("/api/generate", payload)
+
+    async def stream(self, path, payload):
+        """Ollama'nın NDJSON akışını parça parça (dict olarak) döndüren async generator.
+
+        Bağlantı hataları yalnızca ilk bayt gelmeden önce tekrar denenir;
+        akış başladıktan sonra yarıda kalan üretim tekrar başlatılmaz.
+        İlk token süresi (TTFT) kuyrukta bekleme dahil ölçülür.
+        """
+        model = payload.get("model", "")
+        started = time.perf_counter()
+        ttft = None
+        try:
+            async for chunk in self._stream(path, payload):
+                if ttft is None and chunk.get("response"):
+                    ttft = time.perf_counter() - started
+                if chunk.get("done"):
+                    record_ollama_response(model, path, chunk, time.perf_counter() - started, ttft)
+                yield chunk
+        except OllamaError:
+            OLLAMA_ERRORS.labels(model, path).inc()
+            raise
+
+    async def _stream(self, path, payload):
+        await self.start()
+        tried = []
+        async with self.scheduler.slot():
+            for attempt in range(self.max_retries + 1):
+                last_attempt = attempt == self.max_retries
+                connect_error = None
+                # Sunucu akış bitene kadar kiralanır; bekleyen istek sayısı buna göre tutulur
+                async with self.router.lease(payload.get("model"), exclude=tried) as target:
+                    try:
+                        async with self._client.stream("POST", target.url + path, json=payload) as response:
+                            self.router.report_status(target, response.status_code)
+                            if response.status_code != 200:
+                                text = (await response.aread()).decode("utf-8", errors="replace")
+                                if response.status_code not in RETRY_STATUS_CODES or last_attempt:
+                                    raise OllamaError(
+                                        f"Ollama API hatası: {response.status_code} - {text}",
+                                        status_code=response.status_code,
+                                        text=text,
+                                    )
+                            else:
+                                async for line in response.aiter_lines():
+                                    if line.strip():
+                                        yield json.loads(line)
+                                return
+                    except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                        self.router.report_failure(target)
+                        connect_error = e
+                    except httpx.HTTPError as e:
+                        raise OllamaError(f"Ollama'ya bağlanılamadı ({target.url}): {e}") from e
+
+                tried.append(target)
+                if connect_error is not None and last_attempt:
+                    raise OllamaError(f"Ollama'ya bağlanılamadı ({target.url}): {connect_error}") from connect_error
+                await self._sleep_before_retry(attempt)
+
+    async def generate_stream(self, prompt, model=DEFAULT_MODEL, **options):
+        """/api/generate çağrısı (stream açık); her token parçasını dict olarak üretir."""
+        payload = {"model": model, "prompt": prompt, "stream": True, "keep_alive": KEEP_ALIVE}
+        payload.update(options)
+        async for chunk in self.stream("/api/generate", payload):
+            yield chunk
+
+    async def embed(self, texts, model=EMBED_MODEL):
+        """/api/embed çağrısı; birden fazla metni tek istekte vektöre çevirir."""
+        result = await self.post("/api/embed", {"model": model, "input": list(texts), "keep_alive": KEEP_ALIVE})
+        return result["embeddings"]
+
+    async def warm_up(self, model=DEFAULT_MODEL, system=None, prompt=WARM_UP_PROMPT):
+        """Modeli havuzdaki her sunucuda belleğe yükler; system verilirse ön ekini de bir kez prefill eder.
+
+        Boş prompt Ollama'da yalnızca yükleme yapar (done_reason "load"), hiçbir token
+        değerlendirilmez. Bu yüzden kısa ama boş olmayan bir kullanıcı mesajı, gerçek
+        isteklerle aynı model şablonundan (raw olmadan) geçirilip tek token üretilir.
+        """
+        payload = {"model": model, "prompt": prompt, "stream": False, "keep_alive": KEEP_ALIVE, "options": {"num_predict": 1}}
+        if system:
+            payload["system"] = system
+        await self.start()
+        results = await asyncio.gather(
+            *(self.post("/api/generate", payload, host=host) for host in self.router.hosts),
+            return_exceptions=True,
+        )
+        warmed = [ollama_stats(result) for result in results if not isinstance(result, BaseException)]
+        if not warmed:
+            raise results[0]
+        return warmed[0]
+
+
+# Uygulama genelinde paylaşılan istemci
+ollama_client = OllamaClient.from_env()
@@ -0,0 +1,125 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import httpx
+
+from common.metrics import OLLAMA_HOST_HEALTHY, OLLAMA_HOST_OUTSTANDING
+
+
+class OllamaHost:
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        self.healthy = True
+        self.failures = 0
+        self.models = None  # /api/tags'ten öğrenilen modeller; henüz bilinmiyorsa None
+        OLLAMA_HOST_HEALTHY.labels(self.url).set(1)
+
+    def has_model(self, model):
+        return self.models is None or model in self.models or f"{model}:latest" in self.models
+
+
+class OllamaRouter:
+    """Birden fazla Ollama sunucusu arasında istek dağıtan yönlendirici.
+
+    Her istek, modeli barındıran sağlıklı sunucular arasından üzerinde en az
+    bekleyen istek olana (least outstanding requests) gönderilir. Art arda
+    max_failures kez ulaşılamayan sunucu havuzdan çıkarılır; arka plandaki
+    sağlık kontrolü /api/tags yanıt verdiğinde sunucuyu yeniden havuza alır.
+    Tüm sunucular düşmüşse istekler yine de denenir (fail open).
+    """
+
+    def __init__(self, urls, max_failures=3, health_interval=10.0, health_timeout=2.0):
+        self.hosts = [OllamaHost(url) for url in urls]
+        self.max_failures = max_failures
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self._turn = 0
+        self._task = None
+
+    def pick(self, model=None, exclude=()):
+        candidates = [h for h in self.hosts if h not in exclude] or self.hosts
+        candidates = [h for h in candidates if h.healthy] or candidates
+        if model:
+            candidates = [h for h in candidates if h.has_model(model)] or candidates
+        least = min(h.outstanding for h in candidates)
+        tied = [h for h in candidates if h.outstanding == least]
+        # Eşitlikte sırayla dağıtılır; aksi halde hep ilk sunucu seçilirdi
+        self._turn += 1
+        return tied[self._turn % len(tied)]
+
+    @asynccontextmanager
+    async def lease(self, model=None, exclude=(), host=None):
+        host = host or self.pick(model, exclude)
+        host.outstanding += 1
+        OLLAMA_HOST_OUTSTANDING.labels(host.url).set(host.outstanding)
+        try:
+            yield host
+        finally:
+            host.outstanding -= 1
+            OLLAMA_HOST_OUTSTANDING.labels(host.url).set(host.outstanding)
+
+    def report_success(self, host):
+        host.failures = 0
+        if not host.healthy:
+            host.healthy = True
+            OLLAMA_HOST_HEALTHY.labels(host.url).set(1)
+            print("Ollama sunucusu yeniden havuza alındı:", host.url)
+
+    def report_failure(self, host):
+        host.failures += 1
+        if host.healthy and host.failures >= self.max_failures:
+            host.healthy = False
+            OLLAMA_HOST_HEALTHY.labels(host.url).set(0)
+            print("Ollama sunucusu havuzdan çıkarıldı:", host.url)
+
+    def report_status(self, host, status_code):
+        """HTTP yanıtına göre sunucu sağlığını günceller.
+
+        Yalnızca 200 başarı sayılır; sürekli 500 dönen bir sunucu havuzda kalmamalı.
+        4xx (ör. model yok) istekle ilgilidir, sunucunun sağlığını değiştirmez.
+        """
+        if status_code == 200:
+            self.report_success(host)
+        elif status_code >= 500:
+            self.report_failure(host)
+
+    async def check(self, client):
+        """Tüm sunuculara /api/tags ile sağlık kontrolü yapar ve model listelerini günceller."""
+
+        async def check_host(host):
+            try:
+                response = await client.get(f"{host.url}/api/tags", timeout=self.health_timeout)
+                response.raise_for_status()
+                names = {model["name"] for model in response.json().get("models", [])}
+            except (httpx.HTTPError, ValueError):
+                self.report_failure(host)
+                return
+            host.models = names
+            self.report_success(host)
+
+        await asyncio.gather(*(check_host(host) for host in self.hosts))
+
+    def start(self, client):
+        if self._task is None and self.health_interval > 0:
+            self._task = asyncio.create_task(self._run(client))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, client):
+        while True:
+            try:
+                await self.check(client)
+            except Exception as e:
+                print("Ollama sağlık kontrolü hatası:", e)
+            await asyncio.sleep(self.health_interval)
+
+    def snapshot(self):
+        return [
+            {"url": h.url, "healthy": h.healthy, "outstanding": h.outstanding, "models": sorted(h.models or [])}
+            for h in self.hosts
+        ]
@@ -0,0 +1,70 @@
+import base64
+
+from bson import json_util
+from fastapi import HTTPException
+from pymongo import ASCENDING, DESCENDING
+
+
+def encode_cursor(doc, sort_field):
+    """Sayfanın son dokümanından opak (base64) bir imleç üretir."""
+    values = [doc.get(sort_field), doc["_id"]] if sort_field != "_id" else [doc["_id"]]
+    raw = json_util.dumps(values).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor):
+    try:
+        return json_util.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Geçersiz imleç (cursor)")
+
+
+def keyset_query(base_filter, sort_field, order, cursor):
+    """Keyset (imleç) sayfalama için filtre ve sıralamayı döndürür.
+
+    Sıralama her zaman _id ile tamamlanır; böylece aynı değere sahip
+    dokümanlar da sayfalar arasında kaybolmaz veya tekrar etmez.
+    """
+    direction = DESCENDING if order == "desc" else ASCENDING
+    op = "$lt" if direction == DESCENDING else "$gt"
+    query = dict(base_filter or {})
+
+    if cursor:
+        values = decode_cursor(cursor)
+        # Başka bir sıralamaya ait (veya bozuk) imleç 500 yerine 400 ile reddedilir
+        if not isinstance(values, list) or len(values) != (1 if sort_field == "_id" else 2):
+            raise HTTPException(status_code=400, detail="Geçersiz imleç (cursor)")
+        if sort_field == "_id":
+            query["_id"] = {op: values[0]}
+        else:
+            last_value, last_id = values
+            query["$or"] = [
+                {sort_field: {op: last_value}},
+                {sort_field: last_value, "_id": {op: last_id}},
+            ]
+
+    sort = [(sort_field, direction)]
+    if sort_field != "_id":
+        sort.append(("_id", direction))
+    return query, sort
+
+
+def build_projection(fields, allowed, required=()):
+    """'title,timestamp' gibi virgüllü alan listesini Mongo projection'ına çevirir."""
+    if not fields:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Bilinmeyen alan(lar): {', '.join(unknown)}")
+    projection = {f: 1 for f in requested}
+    for f in required:
+        projection[f] = 1
+    return projection
+
+
+def next_cursor(docs, sort_field, limit):
+    # Sayfa dolu geldiyse devamı olabilir; boş veya eksik sayfada imleç yok
+    if len(docs) < limit or not docs:
+        return None
+    return encode_cursor(docs[-1], sort_field)
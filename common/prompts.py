@@ -0,0 +1,31 @@
+# Prompt şablonu kayıt defteri.
+# Statik talimatlar system prompt olarak sabit tutulur; istekten isteğe değişen
+# değerler (tarih, doküman vb.) yalnızca kullanıcı mesajına yazılır. Böylece
+# Ollama ortak ön eki tekrar tekrar prefill etmek zorunda kalmaz.
+
+class PromptTemplate:
+    def __init__(self, name, version, system, user):
+        self.name = name
+        self.version = version
+        self.system = system.strip()
+        self.user = user
+
+    def render(self, **values):
+        """Ollama /api/generate için system ve prompt alanlarını döndürür."""
+        return {"system": self.system, "prompt": self.user.format(**values)}
+
+
+_registry = {}
+
+
+def register(template):
+    _registry[template.name] = template
+    return template
+
+
+def get_template(name):
+    return _registry[name]
+
+
+def registered_templates():
+    return list(_registry.values())
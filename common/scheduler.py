@@ -0,0 +1,192 @@
+import asyncio
+import contextvars
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from common.metrics import OLLAMA_ACTIVE_REQUESTS, OLLAMA_QUEUE_DEPTH, OLLAMA_QUEUE_REJECTIONS
+
+# Öncelik sınıfları, yüksekten düşüğe: kısa etkileşimli işler (çeviri, özet),
+# toplu işler (quiz, test planı, toplu çeviri) ve arka plan işleri (gömme, ısınma)
+PRIORITIES = ("interactive", "batch", "background")
+
+# Ollama çağrısını başlatan isteğin sınıfı ve istemcisi; endpoint'ler/worker'lar ayarlar
+current_priority = contextvars.ContextVar("ollama_priority", default="interactive")
+current_client = contextvars.ContextVar("ollama_client_id", default="anonymous")
+
+
+def set_priority(priority):
+    if priority not in PRIORITIES:
+        raise ValueError(f"Bilinmeyen öncelik sınıfı: {priority}")
+    current_priority.set(priority)
+
+
+class QueueFullError(Exception):
+    """Öncelik sınıfının (veya istemcinin) kuyruğu dolduğunda fırlatılır; HTTP 429'a çevrilir."""
+
+    def __init__(self, priority, retry_after):
+        super().__init__(f"Ollama kuyruğu dolu ({priority}); {retry_after} saniye sonra tekrar deneyin")
+        self.priority = priority
+        self.retry_after = retry_after
+
+
+class PriorityScheduler:
+    """Ollama'ya giden çağrılar için öncelikli, adil ve sınırlı bekleme kuyruğu.
+
+    Aynı anda en fazla max_concurrency çağrı çalışır. Boşalan yer önce yüksek
+    öncelikli sınıfa verilir; sınıf içinde istemciler sırayla (round-robin)
+    hizmet alır, böylece tek bir istemcinin yığdığı işler diğerlerini bekletmez.
+    Alt sınıflar tamamen aç kalmasın diye üst sınıfa art arda starvation_limit
+    kez yer verildikten sonra bekleyen bir alt sınıf isteği öne alınır.
+    """
+
+    def __init__(self, max_concurrency=4, max_queue=32, max_queue_per_client=8, starvation_limit=8):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_queue_per_client = max_queue_per_client
+        self.starvation_limit = starvation_limit
+        self.active = 0
+        self._queues = {priority: OrderedDict() for priority in PRIORITIES}  # istemci -> bekleyen future'lar
+        self._depth = dict.fromkeys(PRIORITIES, 0)
+        self._passed_over = 0
+        self._avg_service = 5.0  # Ortalama çağrı süresi (saniye, üstel hareketli ortalama)
+
+    def _waiting(self):
+        return sum(self._depth.values())
+
+    def retry_after(self, priority):
+        # Önündeki bekleyenlerin ortalama sürede boşalacağı varsayımıyla kaba bir tahmin
+        ahead = sum(self._depth[p] for p in PRIORITIES[: PRIORITIES.index(priority) + 1])
+        return max(1, math.ceil(self._avg_service * (ahead + 1) / self.max_concurrency))
+
+    def check_admission(self, priority=None, client=None):
+        """İstek kuyruğa alınamayacaksa QueueFullError fırlatır.
+
+        Akış (stream) endpoint'leri yanıt başlıkları gönderilmeden önce çağırır;
+        böylece dolu kuyruk akışın ortasında değil, 429 olarak bildirilir.
+        """
+        priority = priority or current_priority.get()
+        client = client or current_client.get()
+        if self.active < self.max_concurrency and not self._waiting():
+            return
+        if self._depth[priority] >= self.max_queue or len(self._queues[priority].get(client, ())) >= self.max_queue_per_client:
+            OLLAMA_QUEUE_REJECTIONS.labels(priority).inc()
+            raise QueueFullError(priority, self.retry_after(priority))
+
+    @asynccontextmanager
+    async def slot(self, priority=None, client=None):
+        priority = priority or current_priority.get()
+        client = client or current_client.get()
+        await self._acquire(priority, client)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._avg_service = 0.8 * self._avg_service + 0.2 * (time.monotonic() - started)
+            self._release()
+
+    async def _acquire(self, priority, client):
+        if self.active < self.max_concurrency and not self._waiting():
+            self.active += 1
+            OLLAMA_ACTIVE_REQUESTS.set(self.active)
+            return
+        self.check_admission(priority, client)
+        future = asyncio.get_running_loop().create_future()
+        self._queues[priority].setdefault(client, deque()).append(future)
+        self._set_depth(priority, 1)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Yer bu isteğe devredilmişti ama istemci ayrıldı; sıradakine aktarılır
+                self._release()
+            else:
+                self._remove(priority, client, future)
+            raise
+
+    def _release(self):
+        future = self._next_waiter()
+        if future is None:
+            self.active -= 1
+            OLLAMA_ACTIVE_REQUESTS.set(self.active)
+        else:
+            future.set_result(None)  # Yer doğrudan devredilir; active değişmez
+
+    def _next_waiter(self):
+        while True:
+            waiting = [p for p in PRIORITIES if self._depth[p]]
+            if not waiting:
+                return None
+            priority = waiting[0]
+            if len(waiting) > 1:
+                if self._passed_over >= self.starvation_limit:
+                    priority = waiting[1]
+                    self._passed_over = 0
+                else:
+                    self._passed_over += 1
+            queue = self._queues[priority]
+            client, waiters = next(iter(queue.items()))
+            future = waiters.popleft()
+            if waiters:
+                queue.move_to_end(client)
+            else:
+                del queue[client]
+            self._set_depth(priority, -1)
+            if not future.cancelled():
+                return future
+
+    def _remove(self, priority, client, future):
+        waiters = self._queues[priority].get(client)
+        if waiters and future in waiters:
+            waiters.remove(future)
+            if not waiters:
+                del self._queues[priority][client]
+            self._set_depth(priority, -1)
+
+    def _set_depth(self, priority, delta):
+        self._depth[priority] += delta
+        OLLAMA_QUEUE_DEPTH.labels(priority).set(self._depth[priority])
+
+    def snapshot(self):
+        return {
+            "active": self.active,
+            "max_concurrency": self.max_concurrency,
+            "queued": dict(self._depth),
+            "max_queue": self.max_queue,
+            "avg_service_seconds": round(self._avg_service, 2),
+        }
+
+
+def install_scheduler(app, scheduler, router=None):
+    """İstemci kimliğini belirleyen middleware'i, 429 yanıtını ve /ollama/queue endpoint'ini ekler.
+
+    router verilirse sunucu havuzunun durumu /ollama/hosts altında gösterilir.
+    """
+
+    @app.middleware("http")
+    async def client_identity_middleware(request: Request, call_next):
+        # Aynı makinedeki farklı arayüzler X-Client-Id ile ayrı istemci olarak sayılabilir
+        client = request.headers.get("x-client-id") or (request.client.host if request.client else "anonymous")
+        current_client.set(client)
+        return await call_next(request)
+
+    @app.exception_handler(QueueFullError)
+    async def queue_full_handler(request: Request, exc: QueueFullError):
+        return JSONResponse(
+            status_code=429,
+            content={"detail": str(exc), "priority": exc.priority},
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+
+    @app.get("/ollama/queue")
+    async def ollama_queue():
+        return scheduler.snapshot()
+
+    if router is not None:
+        @app.get("/ollama/hosts")
+        async def ollama_hosts():
+            return router.snapshot()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Repo kökü (common/) import yolunda olmalı
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,36 @@
+from common.json_stream import JsonArrayElements
+
+DOCUMENT = 'İşte plan:\n[\n  {"a": "x, ]"},\n  "metin \\" [",\n  [1, {"b": 2}],\n  true,\n  42\n] sonrası yok sayılır'
+
+
+def parse(text, size):
+    elements = JsonArrayElements()
+    result = []
+    for start in range(0, len(text), size):
+        result.extend(elements.feed(text[start:start + size]))
+    result.extend(elements.close())
+    return result, elements.finished
+
+
+def test_elements_do_not_depend_on_chunk_boundaries():
+    expected = [
+        ('{"a": "x, ]"}', 3),
+        ('"metin \\" ["', 4),
+        ('[1, {"b": 2}]', 5),
+        ("true", 6),
+        ("42", 7),
+    ]
+    for size in (1, 2, 3, 7, len(DOCUMENT)):
+        assert parse(DOCUMENT, size) == (expected, True), size
+
+
+def test_text_before_the_array_is_ignored():
+    # İlk '[' diziyi başlatır; öncesindeki açıklama eleman sayılmaz
+    assert parse('model çıktısı: [{"x": 1}]', 4) == ([('{"x": 1}', 1)], True)
+
+
+def test_close_returns_the_unfinished_element():
+    elements = JsonArrayElements()
+    assert elements.feed('[{"a": 1}, {"b"') == [('{"a": 1}', 1)]
+    assert elements.close() == [('{"b"', 1)]
+    assert not elements.finished
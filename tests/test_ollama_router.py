@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("prometheus_client")
+pytest.importorskip("pymongo")
+httpx = pytest.importorskip("httpx")
+
+from common.ollama_router import OllamaRouter
+
+URLS = ["http://ollama-a:11434", "http://ollama-b:11434", "http://ollama-c:11434"]
+
+
+def tags_transport(models_by_host, down=()):
+    """Sahte Ollama sunucuları: /api/tags her sunucunun model listesini döndürür."""
+
+    def handler(request):
+        url = f"{request.url.scheme}://{request.url.host}:{request.url.port}"
+        if url in down:
+            raise httpx.ConnectError("bağlantı reddedildi", request=request)
+        models = [{"name": name} for name in models_by_host.get(url, [])]
+        return httpx.Response(200, json={"models": models})
+
+    return httpx.MockTransport(handler)
+
+
+async def check(router, transport):
+    async with httpx.AsyncClient(transport=transport) as client:
+        await router.check(client)
+
+
+def test_pick_prefers_least_outstanding_host():
+    router = OllamaRouter(URLS)
+    router.hosts[0].outstanding = 2
+    router.hosts[1].outstanding = 0
+    router.hosts[2].outstanding = 1
+    assert router.pick() is router.hosts[1]
+
+
+def test_ties_are_distributed_round_robin():
+    router = OllamaRouter(URLS)
+    picked = [router.pick().url for _ in range(6)]
+    assert sorted(picked) == sorted(URLS * 2)
+    assert picked[:3] == picked[3:]
+
+
+def test_lease_counts_outstanding_requests():
+    async def scenario():
+        router = OllamaRouter(URLS[:2])
+        async with router.lease() as first:
+            async with router.lease() as second:
+                assert first is not second
+                assert first.outstanding == second.outstanding == 1
+        return router
+
+    router = asyncio.run(scenario())
+    assert all(host.outstanding == 0 for host in router.hosts)
+
+
+def test_host_is_removed_after_max_failures_and_restored_by_check():
+    router = OllamaRouter(URLS[:2], max_failures=2)
+    bad = router.hosts[0]
+    router.report_failure(bad)
+    assert bad.healthy
+    router.report_failure(bad)
+    assert not bad.healthy
+    assert all(router.pick() is router.hosts[1] for _ in range(4))
+
+    asyncio.run(check(router, tags_transport({url: ["llama3:8b"] for url in URLS})))
+    assert bad.healthy and bad.failures == 0
+
+
+def test_check_marks_unreachable_hosts():
+    router = OllamaRouter(URLS[:2], max_failures=1)
+    asyncio.run(check(router, tags_transport({}, down={URLS[0]})))
+    assert not router.hosts[0].healthy
+    assert router.hosts[1].healthy
+
+
+def test_all_hosts_down_fails_open():
+    router = OllamaRouter(URLS[:2], max_failures=1)
+    for host in router.hosts:
+        router.report_failure(host)
+    assert router.pick() in router.hosts
+
+
+def test_pick_filters_by_model():
+    router = OllamaRouter(URLS)
+    asyncio.run(check(router, tags_transport({
+        URLS[0]: ["llama3:8b"],
+        URLS[1]: ["llama3:70b", "nomic-embed-text:latest"],
+        URLS[2]: ["llama3:8b"],
+    })))
+    assert router.pick("llama3:70b") is router.hosts[1]
+    assert router.pick("nomic-embed-text") is router.hosts[1]
+    assert {router.pick("llama3:8b").url for _ in range(4)} == {URLS[0], URLS[2]}
+    # Hiçbir sunucuda olmayan model yine de bir sunucuya gönderilir
+    assert router.pick("mistral") in router.hosts
+
+
+def test_server_errors_count_as_failures():
+    router = OllamaRouter(URLS[:1], max_failures=2)
+    host = router.hosts[0]
+    router.report_status(host, 500)
+    router.report_status(host, 404)
+    assert host.failures == 1
+    router.report_status(host, 503)
+    assert not host.healthy
+    router.report_status(host, 200)
+    assert host.healthy and host.failures == 0
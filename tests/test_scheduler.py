@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("prometheus_client")
+pytest.importorskip("pymongo")
+
+from common.scheduler import PriorityScheduler, QueueFullError, install_scheduler
+
+
+async def _hold(scheduler, priority, client, order, release):
+    async with scheduler.slot(priority, client):
+        order.append((priority, client))
+        await release.wait()
+
+
+def test_higher_priority_waiters_are_served_first():
+    async def scenario():
+        scheduler = PriorityScheduler(max_concurrency=1)
+        order = []
+        release = asyncio.Event()
+        first = asyncio.create_task(_hold(scheduler, "batch", "a", order, release))
+        await asyncio.sleep(0)
+        waiters = [
+            asyncio.create_task(_hold(scheduler, "background", "b", order, release)),
+            asyncio.create_task(_hold(scheduler, "batch", "c", order, release)),
+            asyncio.create_task(_hold(scheduler, "interactive", "d", order, release)),
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(first, *waiters)
+        return order
+
+    order = asyncio.run(scenario())
+    assert [priority for priority, _ in order] == ["batch", "interactive", "batch", "background"]
+
+
+def test_clients_are_served_round_robin_within_a_priority():
+    async def scenario():
+        scheduler = PriorityScheduler(max_concurrency=1)
+        order = []
+        release = asyncio.Event()
+        first = asyncio.create_task(_hold(scheduler, "batch", "x", order, release))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(_hold(scheduler, "batch", client, order, release)) for client in "aab"]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(first, *waiters)
+        return order
+
+    order = asyncio.run(scenario())
+    assert [client for _, client in order] == ["x", "a", "b", "a"]
+
+
+def test_full_client_queue_is_rejected():
+    async def scenario():
+        scheduler = PriorityScheduler(max_concurrency=1, max_queue_per_client=2)
+        release = asyncio.Event()
+        order = []
+        tasks = [asyncio.create_task(_hold(scheduler, "batch", "a", order, release)) for _ in range(3)]
+        await asyncio.sleep(0)
+        with pytest.raises(QueueFullError) as error:
+            scheduler.check_admission("batch", "a")
+        # Başka bir istemcinin kuyruğu ayrı sayılır
+        scheduler.check_admission("batch", "b")
+        release.set()
+        await asyncio.gather(*tasks)
+        return error.value
+
+    error = asyncio.run(scenario())
+    assert error.priority == "batch"
+    assert error.retry_after >= 1
+
+
+def test_cancelled_waiter_releases_its_place():
+    async def scenario():
+        scheduler = PriorityScheduler(max_concurrency=1)
+        order = []
+        release = asyncio.Event()
+        first = asyncio.create_task(_hold(scheduler, "batch", "a", order, release))
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(_hold(scheduler, "batch", "b", order, release))
+        await asyncio.sleep(0)
+        assert scheduler.snapshot()["queued"]["batch"] == 1
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        assert scheduler.snapshot()["queued"]["batch"] == 0
+        release.set()
+        await first
+        return scheduler.snapshot(), order
+
+    snapshot, order = asyncio.run(scenario())
+    assert snapshot["active"] == 0
+    assert order == [("batch", "a")]
+
+
+def test_queue_full_error_becomes_429():
+    pytest.importorskip("httpx")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    app = FastAPI()
+    install_scheduler(app, PriorityScheduler())
+
+    @app.get("/busy")
+    async def busy():
+        raise QueueFullError("interactive", 7)
+
+    response = TestClient(app).get("/busy")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "7"
+    assert response.json()["priority"] == "interactive"